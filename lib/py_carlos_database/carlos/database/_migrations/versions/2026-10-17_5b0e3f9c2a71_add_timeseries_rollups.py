@@ -0,0 +1,96 @@
+"""add timeseries rollups
+
+Revision ID: 5b0e3f9c2a71
+Revises: 21a71c15c453
+Create Date: 2026-10-17 09:12:31.482113
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b0e3f9c2a71"
+down_revision = "21a71c15c453"
+branch_labels = None
+depends_on = None
+
+
+ROLLUP_TABLES = {
+    "minute": "carlos.timeseries_rollup_minute",
+    "hour": "carlos.timeseries_rollup_hour",
+    "day": "carlos.timeseries_rollup_day",
+}
+
+
+def upgrade():
+    for period, table_name in ROLLUP_TABLES.items():
+        rollup_ddl = f"""
+            CREATE TABLE {table_name} (
+                timestamp_utc TIMESTAMP WITH TIME ZONE NOT NULL,
+                timeseries_id INTEGER REFERENCES carlos.device_signal(timeseries_id)
+                    ON DELETE CASCADE NOT NULL,
+                min_value REAL,
+                max_value REAL,
+                mean_value REAL,
+                sample_count INTEGER NOT NULL,
+                PRIMARY KEY (timeseries_id, timestamp_utc)
+            );
+            COMMENT ON TABLE {table_name} IS
+                'Holds the timeseries data aggregated into buckets of one {period}.';
+            COMMENT ON COLUMN {table_name}.timestamp_utc IS
+                'The start of the bucket in UTC.';
+            COMMENT ON COLUMN {table_name}.timeseries_id IS
+                'The unique identifier series.';
+            COMMENT ON COLUMN {table_name}.min_value IS
+                'The smallest value within the bucket.';
+            COMMENT ON COLUMN {table_name}.max_value IS
+                'The largest value within the bucket.';
+            COMMENT ON COLUMN {table_name}.mean_value IS
+                'The arithmetic mean of the values within the bucket.';
+            COMMENT ON COLUMN {table_name}.sample_count IS
+                'The number of non null values within the bucket.';
+            """
+        op.execute(rollup_ddl)
+
+    # Backfill the rollups from the existing data. Each rollup is computed from the
+    # next finer one, to avoid scanning the raw data more than once.
+    backfill_dml = """
+        INSERT INTO carlos.timeseries_rollup_minute
+        SELECT
+            date_bin('1 minute', timestamp_utc, '1970-01-01 00:00:00+00'),
+            timeseries_id,
+            min(value),
+            max(value),
+            avg(value),
+            count(value)
+        FROM carlos.timeseries
+        GROUP BY 1, 2;
+
+        INSERT INTO carlos.timeseries_rollup_hour
+        SELECT
+            date_bin('1 hour', timestamp_utc, '1970-01-01 00:00:00+00'),
+            timeseries_id,
+            min(min_value),
+            max(max_value),
+            sum(mean_value * sample_count) / nullif(sum(sample_count), 0),
+            sum(sample_count)
+        FROM carlos.timeseries_rollup_minute
+        GROUP BY 1, 2;
+
+        INSERT INTO carlos.timeseries_rollup_day
+        SELECT
+            date_bin('1 day', timestamp_utc, '1970-01-01 00:00:00+00'),
+            timeseries_id,
+            min(min_value),
+            max(max_value),
+            sum(mean_value * sample_count) / nullif(sum(sample_count), 0),
+            sum(sample_count)
+        FROM carlos.timeseries_rollup_hour
+        GROUP BY 1, 2;
+        """
+    op.execute(backfill_dml)
+
+
+def downgrade():
+    for table_name in reversed(ROLLUP_TABLES.values()):
+        op.execute(f"DROP TABLE {table_name};")
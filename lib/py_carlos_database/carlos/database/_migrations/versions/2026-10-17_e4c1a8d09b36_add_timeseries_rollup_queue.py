@@ -0,0 +1,42 @@
+"""add timeseries rollup queue
+
+Revision ID: e4c1a8d09b36
+Revises: 5b0e3f9c2a71
+Create Date: 2026-10-17 16:05:48.217390
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4c1a8d09b36"
+down_revision = "5b0e3f9c2a71"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollup_queue_ddl = """
+        CREATE TABLE carlos.timeseries_rollup_queue (
+            queue_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+            timeseries_id INTEGER REFERENCES carlos.device_signal(timeseries_id)
+                ON DELETE CASCADE NOT NULL,
+            modified_from TIMESTAMP WITH TIME ZONE NOT NULL,
+            modified_to TIMESTAMP WITH TIME ZONE NOT NULL
+        );
+        COMMENT ON TABLE carlos.timeseries_rollup_queue IS
+            'Holds the ranges of timeseries data whose rollups need to be refreshed.';
+        COMMENT ON COLUMN carlos.timeseries_rollup_queue.queue_id IS
+            'The unique identifier of the entry.';
+        COMMENT ON COLUMN carlos.timeseries_rollup_queue.timeseries_id IS
+            'The unique identifier series.';
+        COMMENT ON COLUMN carlos.timeseries_rollup_queue.modified_from IS
+            'The earliest timestamp of the modified data.';
+        COMMENT ON COLUMN carlos.timeseries_rollup_queue.modified_to IS
+            'The latest timestamp of the modified data.';
+        """
+    op.execute(rollup_queue_ddl)
+
+
+def downgrade():
+    op.execute("DROP TABLE carlos.timeseries_rollup_queue;")
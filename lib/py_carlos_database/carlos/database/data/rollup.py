@@ -0,0 +1,305 @@
+"""This module contains the rollups of the timeseries data.
+
+A rollup holds the minimum, maximum, mean and number of samples of each timeseries
+for fixed buckets of time. The buckets of all rollups are aligned to the unix epoch.
+The rollups are maintained incrementally: Adding timeseries data only queues the
+modified range of each timeseries in the same transaction. A single worker at a
+time, see `refresh_queued_rollups()`, recomputes the buckets touched by the queued
+ranges. Each rollup is computed from the next finer rollup, the finest rollup is
+computed from the raw timeseries data. Hence, the rollups lag behind the raw data
+by up to `ROLLUP_REFRESH_INTERVAL`.
+"""
+
+__all__ = [
+    "ROLLUP_EPOCH",
+    "ROLLUP_REFRESH_INTERVAL",
+    "ROLLUPS",
+    "Rollup",
+    "TimeseriesRollupOrm",
+    "enqueue_rollup_refresh",
+    "find_coarsest_rollup",
+    "refresh_queued_rollups",
+    "refresh_rollups",
+]
+
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Collection, Mapping, Sequence
+
+from sqlalchemy import ColumnElement, Interval, Row, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import InstrumentedAttribute
+
+from carlos.database.context import RequestContext
+from carlos.database.orm import (
+    TimeseriesDayRollupOrm,
+    TimeseriesHourRollupOrm,
+    TimeseriesMinuteRollupOrm,
+    TimeseriesOrm,
+    TimeseriesRollupQueueOrm,
+)
+
+TimeseriesRollupOrm = (
+    TimeseriesMinuteRollupOrm | TimeseriesHourRollupOrm | TimeseriesDayRollupOrm
+)
+
+ROLLUP_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+"""The origin all rollup buckets are aligned to."""
+
+ROLLUP_REFRESH_INTERVAL = timedelta(seconds=10)
+"""The interval in which the queued rollup refreshes are processed."""
+
+_ROLLUP_REFRESH_LOCK_ID = 0x726F6C6C7570
+"""The key of the transaction level advisory lock that serializes the workers
+refreshing the rollups."""
+
+
+@dataclass(slots=True, frozen=True)
+class Rollup:
+    """Describes a single rollup table."""
+
+    table: type[TimeseriesRollupOrm]
+    """The table holding the aggregated data."""
+
+    bucket_size: timedelta
+    """The duration of a single bucket."""
+
+    def bucket_of(self, timestamp: datetime) -> datetime:
+        """Returns the start of the bucket the given timestamp belongs to."""
+
+        return timestamp - (timestamp - ROLLUP_EPOCH) % self.bucket_size
+
+    def bucket_expression(
+        self, timestamp: ColumnElement | InstrumentedAttribute
+    ) -> ColumnElement:
+        """Returns the SQL expression to compute the start of the bucket of the given
+        timestamp column."""
+
+        return func.date_bin(
+            literal(self.bucket_size, Interval()), timestamp, ROLLUP_EPOCH
+        )
+
+
+ROLLUPS: tuple[Rollup, ...] = (
+    Rollup(table=TimeseriesMinuteRollupOrm, bucket_size=timedelta(minutes=1)),
+    Rollup(table=TimeseriesHourRollupOrm, bucket_size=timedelta(hours=1)),
+    Rollup(table=TimeseriesDayRollupOrm, bucket_size=timedelta(days=1)),
+)
+"""All available rollups, ordered from the finest to the coarsest one. Each rollup
+must be a multiple of the previous one."""
+
+
+def find_coarsest_rollup(resolution: timedelta) -> Rollup | None:
+    """Returns the coarsest rollup that can be used to aggregate the data into
+    buckets of the given resolution. A rollup is suitable, if the resolution is a
+    multiple of its bucket size.
+
+    :param resolution: The requested resolution of the data.
+    :return: The coarsest suitable rollup or None if no rollup can be used.
+    """
+
+    for rollup in reversed(ROLLUPS):
+        if resolution % rollup.bucket_size == timedelta(0):
+            return rollup
+
+    return None
+
+
+async def enqueue_rollup_refresh(
+    context: RequestContext, modified: Mapping[int, tuple[datetime, datetime]]
+):
+    """Queues the refresh of the rollups of the modified timeseries data.
+
+    This function is called automatically when timeseries data is added. It does
+    not aggregate any data, so that concurrent writers do not interfere with each
+    other. The caller is responsible to commit the transaction.
+
+    :param context: The request context.
+    :param modified: A mapping of the timeseries_id to the earliest and the latest
+        timestamp of the modified data.
+    """
+
+    if not modified:
+        return
+
+    await context.connection.execute(
+        insert(TimeseriesRollupQueueOrm),
+        [
+            {
+                "timeseries_id": timeseries_id,
+                "modified_from": modified_from,
+                "modified_to": modified_to,
+            }
+            for timeseries_id, (modified_from, modified_to) in modified.items()
+        ],
+    )
+
+
+async def refresh_queued_rollups(context: RequestContext) -> int:
+    """Refreshes the rollups of all queued ranges and removes them from the queue.
+
+    Concurrent calls are serialized with an advisory lock, which is held until the
+    transaction ends. Otherwise, two workers could compute the same bucket from
+    different snapshots and the older one might win. Ranges queued by transactions
+    that commit in the meantime are processed by the next call. The caller is
+    responsible to commit the transaction.
+
+    :param context: The request context.
+    :return: The number of processed queue entries.
+    """
+
+    await context.connection.execute(
+        select(func.pg_advisory_xact_lock(_ROLLUP_REFRESH_LOCK_ID))
+    )
+
+    queued = (
+        await context.connection.execute(
+            delete(TimeseriesRollupQueueOrm).returning(
+                TimeseriesRollupQueueOrm.timeseries_id,
+                TimeseriesRollupQueueOrm.modified_from,
+                TimeseriesRollupQueueOrm.modified_to,
+            )
+        )
+    ).all()
+
+    for timeseries_ids, start_at_utc, end_at_utc in _merge_queued_ranges(queued):
+        await refresh_rollups(
+            context=context,
+            timeseries_ids=timeseries_ids,
+            start_at_utc=start_at_utc,
+            end_at_utc=end_at_utc,
+        )
+
+    return len(queued)
+
+
+def _merge_queued_ranges(
+    queued: Sequence[Row[tuple[int, datetime, datetime]]]
+) -> list[tuple[set[int], datetime, datetime]]:
+    """Merges the queued ranges that overlap or touch the same bucket of the finest
+    rollup, regardless of their timeseries. This way, the data of many devices
+    sending at the same time is refreshed with a few statements.
+
+    :param queued: The timeseries_id, start and end of each queued range.
+    :return: The timeseries_ids, start and end of each merged range.
+    """
+
+    finest = ROLLUPS[0]
+
+    merged: list[tuple[set[int], datetime, datetime]] = []
+    for timeseries_id, start_at_utc, end_at_utc in sorted(
+        queued, key=lambda entry: entry[1]
+    ):
+        if merged and finest.bucket_of(start_at_utc) <= finest.bucket_of(merged[-1][2]):
+            timeseries_ids, merged_start, merged_end = merged[-1]
+            timeseries_ids.add(timeseries_id)
+            merged[-1] = (timeseries_ids, merged_start, max(merged_end, end_at_utc))
+            continue
+
+        merged.append(({timeseries_id}, start_at_utc, end_at_utc))
+
+    return merged
+
+
+async def refresh_rollups(
+    context: RequestContext,
+    timeseries_ids: Collection[int],
+    start_at_utc: datetime,
+    end_at_utc: datetime,
+):
+    """Recomputes all buckets of all rollups that contain any timestamp in between
+    `start_at_utc` and `end_at_utc` (both inclusive) for the given timeseries.
+
+    Use `refresh_queued_rollups()` to process the data added in the meantime. This
+    function must not run concurrently for the same buckets, see there. The caller
+    is responsible to commit the transaction.
+
+    :param context: The request context.
+    :param timeseries_ids: The timeseries to refresh the rollups for.
+    :param start_at_utc: The earliest timestamp of the modified data.
+    :param end_at_utc: The latest timestamp of the modified data.
+    """
+
+    if not timeseries_ids:
+        return
+
+    source: Rollup | None = None
+    for rollup in ROLLUPS:
+        await _refresh_rollup(
+            context=context,
+            rollup=rollup,
+            source=source,
+            timeseries_ids=timeseries_ids,
+            start_at_utc=rollup.bucket_of(start_at_utc),
+            end_at_utc=rollup.bucket_of(end_at_utc) + rollup.bucket_size,
+        )
+        source = rollup
+
+
+async def _refresh_rollup(
+    context: RequestContext,
+    rollup: Rollup,
+    source: Rollup | None,
+    timeseries_ids: Collection[int],
+    start_at_utc: datetime,
+    end_at_utc: datetime,
+):
+    """Recomputes the buckets of the rollup in between `start_at_utc` (inclusive)
+    and `end_at_utc` (exclusive) from the source rollup, or the raw timeseries data
+    if no source is given."""
+
+    if source is None:
+        bucket = rollup.bucket_expression(TimeseriesOrm.timestamp_utc)
+        aggregated = select(
+            bucket,
+            TimeseriesOrm.timeseries_id,
+            func.min(TimeseriesOrm.value),
+            func.max(TimeseriesOrm.value),
+            func.avg(TimeseriesOrm.value),
+            func.count(TimeseriesOrm.value),
+        ).where(
+            TimeseriesOrm.timeseries_id.in_(timeseries_ids),
+            TimeseriesOrm.timestamp_utc >= start_at_utc,
+            TimeseriesOrm.timestamp_utc < end_at_utc,
+        )
+        group_by = (bucket, TimeseriesOrm.timeseries_id)
+    else:
+        src = source.table
+        bucket = rollup.bucket_expression(src.timestamp_utc)
+        aggregated = select(
+            bucket,
+            src.timeseries_id,
+            func.min(src.min_value),
+            func.max(src.max_value),
+            func.sum(src.mean_value * src.sample_count)
+            / func.nullif(func.sum(src.sample_count), 0),
+            func.sum(src.sample_count),
+        ).where(
+            src.timeseries_id.in_(timeseries_ids),
+            src.timestamp_utc >= start_at_utc,
+            src.timestamp_utc < end_at_utc,
+        )
+        group_by = (bucket, src.timeseries_id)
+
+    upsert_stmt = insert(rollup.table).from_select(
+        (
+            "timestamp_utc",
+            "timeseries_id",
+            "min_value",
+            "max_value",
+            "mean_value",
+            "sample_count",
+        ),
+        aggregated.group_by(*group_by),
+    )
+    upsert_stmt = upsert_stmt.on_conflict_do_update(
+        index_elements=rollup.table.__table__.primary_key,
+        set_={
+            "min_value": upsert_stmt.excluded.min_value,
+            "max_value": upsert_stmt.excluded.max_value,
+            "mean_value": upsert_stmt.excluded.mean_value,
+            "sample_count": upsert_stmt.excluded.sample_count,
+        },
+    )
+
+    await context.connection.execute(upsert_stmt)
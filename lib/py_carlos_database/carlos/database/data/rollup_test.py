@@ -0,0 +1,220 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from carlos.database.context import RequestContext
+from carlos.database.device import CarlosDeviceSignal
+from carlos.database.orm import (
+    TimeseriesDayRollupOrm,
+    TimeseriesHourRollupOrm,
+    TimeseriesMinuteRollupOrm,
+)
+
+from .rollup import ROLLUPS, find_coarsest_rollup, refresh_queued_rollups
+from .timeseries import Aggregation, DatetimeRange, add_timeseries, get_timeseries
+
+
+@pytest.mark.parametrize(
+    "resolution, expected_table",
+    [
+        pytest.param(timedelta(seconds=30), None, id="finer than all rollups"),
+        pytest.param(timedelta(seconds=90), None, id="no multiple of any rollup"),
+        pytest.param(timedelta(minutes=1), TimeseriesMinuteRollupOrm, id="1 minute"),
+        pytest.param(timedelta(minutes=15), TimeseriesMinuteRollupOrm, id="15 minutes"),
+        pytest.param(timedelta(hours=1), TimeseriesHourRollupOrm, id="1 hour"),
+        pytest.param(timedelta(hours=6), TimeseriesHourRollupOrm, id="6 hours"),
+        pytest.param(timedelta(days=1), TimeseriesDayRollupOrm, id="1 day"),
+        pytest.param(timedelta(days=7), TimeseriesDayRollupOrm, id="7 days"),
+    ],
+)
+def test_find_coarsest_rollup(resolution: timedelta, expected_table: type | None):
+    """Ensures that the coarsest suitable rollup is selected."""
+
+    rollup = find_coarsest_rollup(resolution)
+
+    if expected_table is None:
+        assert rollup is None
+    else:
+        assert rollup is not None
+        assert rollup.table is expected_table
+
+
+def test_rollup_bucket_of():
+    """Ensures that the timestamps are mapped to the start of their bucket."""
+
+    timestamp = datetime(2024, 3, 5, 13, 47, 21, 123, tzinfo=UTC)
+    minute, hour, day = ROLLUPS
+
+    assert minute.bucket_of(timestamp) == datetime(2024, 3, 5, 13, 47, tzinfo=UTC)
+    assert hour.bucket_of(timestamp) == datetime(2024, 3, 5, 13, tzinfo=UTC)
+    assert day.bucket_of(timestamp) == datetime(2024, 3, 5, tzinfo=UTC)
+
+
+async def _refresh_queued_rollups(context: RequestContext) -> int:
+    """Processes the rollup queue like the background task does."""
+
+    processed = await refresh_queued_rollups(context=context)
+    await context.connection.commit()
+    return processed
+
+
+async def test_rollups_are_maintained(
+    async_carlos_db_context: RequestContext, driver_signals: list[CarlosDeviceSignal]
+):
+    """Ensures that the rollups are updated after timeseries data is added."""
+
+    start_at = datetime(2024, 4, 1, tzinfo=UTC)
+    timeseries_id = driver_signals[0].timeseries_id
+
+    # drains the ranges queued by other tests
+    await _refresh_queued_rollups(async_carlos_db_context)
+
+    # one sample every 30 seconds over 2 hours
+    timestamps = [start_at + timedelta(seconds=30 * i) for i in range(240)]
+    values = [float(i) for i in range(240)]
+    await add_timeseries(
+        context=async_carlos_db_context,
+        timeseries_id=timeseries_id,
+        timestamps=timestamps,
+        values=values,
+    )
+    assert await _refresh_queued_rollups(async_carlos_db_context) == 1
+
+    hour_rollup = (
+        await async_carlos_db_context.connection.execute(
+            select(TimeseriesHourRollupOrm)
+            .where(TimeseriesHourRollupOrm.timeseries_id == timeseries_id)
+            .order_by(TimeseriesHourRollupOrm.timestamp_utc)
+        )
+    ).all()
+    assert [row.timestamp_utc for row in hour_rollup] == [
+        start_at,
+        start_at + timedelta(hours=1),
+    ]
+    assert [row.sample_count for row in hour_rollup] == [120, 120]
+    assert [row.min_value for row in hour_rollup] == [0.0, 120.0]
+    assert [row.max_value for row in hour_rollup] == [119.0, 239.0]
+    assert [row.mean_value for row in hour_rollup] == pytest.approx([59.5, 179.5])
+
+    # overwriting existing samples updates the affected buckets
+    await add_timeseries(
+        context=async_carlos_db_context,
+        timeseries_id=timeseries_id,
+        timestamps=[start_at],
+        values=[1000.0],
+    )
+    assert await _refresh_queued_rollups(async_carlos_db_context) == 1
+    assert await _refresh_queued_rollups(async_carlos_db_context) == 0
+
+    day_rollup = (
+        await async_carlos_db_context.connection.execute(
+            select(TimeseriesDayRollupOrm).where(
+                TimeseriesDayRollupOrm.timeseries_id == timeseries_id
+            )
+        )
+    ).one()
+    assert day_rollup.timestamp_utc == start_at
+    assert day_rollup.sample_count == 240
+    assert day_rollup.min_value == 1.0
+    assert day_rollup.max_value == 1000.0
+    assert day_rollup.mean_value == pytest.approx(
+        (sum(values) - values[0] + 1000.0) / 240, rel=1e-5
+    )
+
+
+@pytest.mark.parametrize(
+    "aggregation", [Aggregation.MIN, Aggregation.MAX, Aggregation.AVG]
+)
+async def test_get_timeseries_from_rollup(
+    async_carlos_db_context: RequestContext,
+    driver_signals: list[CarlosDeviceSignal],
+    aggregation: Aggregation,
+):
+    """Ensures that the data is aggregated correctly via the rollups."""
+
+    start_at = datetime(2024, 5, 1, tzinfo=UTC)
+    datetime_range = DatetimeRange(
+        start_at_utc=start_at, end_at_utc=start_at + timedelta(hours=6)
+    )
+    timeseries_id = driver_signals[0].timeseries_id
+    resolution = timedelta(hours=2)
+
+    timestamps = [start_at + timedelta(seconds=45 * i) for i in range(480)]
+    values = [float(i % 17) for i in range(480)]
+    await add_timeseries(
+        context=async_carlos_db_context,
+        timeseries_id=timeseries_id,
+        timestamps=timestamps,
+        values=values,
+    )
+    await _refresh_queued_rollups(async_carlos_db_context)
+
+    (timeseries,) = await get_timeseries(
+        context=async_carlos_db_context,
+        timeseries_ids=[timeseries_id],
+        datetime_range=datetime_range,
+        resolution=resolution,
+        aggregation=aggregation,
+    )
+
+    buckets: dict[datetime, list[float]] = {}
+    for timestamp, value in zip(timestamps, values):
+        bucket = start_at + (timestamp - start_at) // resolution * resolution
+        buckets.setdefault(bucket, []).append(value)
+
+    aggregate = {
+        Aggregation.MIN: min,
+        Aggregation.MAX: max,
+        Aggregation.AVG: lambda v: sum(v) / len(v),
+    }[aggregation]
+
+    assert timeseries.timestamps == list(buckets.keys())
+    assert timeseries.values == pytest.approx(
+        [aggregate(bucket_values) for bucket_values in buckets.values()], rel=1e-5
+    )
+
+
+async def test_concurrent_ingest_into_same_bucket(
+    async_carlos_db_engine: AsyncEngine, driver_signals: list[CarlosDeviceSignal]
+):
+    """Ensures that the samples of concurrent transactions into the same bucket are
+    all reflected in the rollup, even if the refreshes run concurrently as well."""
+
+    start_at = datetime(2024, 6, 1, tzinfo=UTC)
+    timeseries_id = driver_signals[0].timeseries_id
+
+    async def ingest(offset: int):
+        async with async_carlos_db_engine.connect() as connection:
+            await add_timeseries(
+                context=RequestContext(connection=connection),
+                timeseries_id=timeseries_id,
+                timestamps=[
+                    start_at + timedelta(seconds=offset + 2 * i) for i in range(15)
+                ],
+                values=[float(offset + 2 * i) for i in range(15)],
+            )
+
+    async def refresh():
+        async with async_carlos_db_engine.connect() as connection:
+            await _refresh_queued_rollups(RequestContext(connection=connection))
+
+    await asyncio.gather(ingest(0), ingest(1))
+    await asyncio.gather(refresh(), refresh())
+
+    async with async_carlos_db_engine.connect() as connection:
+        minute_rollup = (
+            await connection.execute(
+                select(TimeseriesMinuteRollupOrm).where(
+                    TimeseriesMinuteRollupOrm.timeseries_id == timeseries_id,
+                    TimeseriesMinuteRollupOrm.timestamp_utc == start_at,
+                )
+            )
+        ).one()
+
+    assert minute_rollup.sample_count == 30
+    assert minute_rollup.min_value == 0.0
+    assert minute_rollup.max_value == 29.0
+    assert minute_rollup.mean_value == pytest.approx(14.5)
@@ -1,27 +1,64 @@
 __all__ = [
+    "Aggregation",
     "DatetimeRange",
+    "IngestMethod",
     "MAX_QUERY_RANGE",
     "TimeseriesData",
     "add_timeseries",
+    "add_timeseries_bulk",
     "get_timeseries",
+    "prepare_timeseries_partitions",
+    "stream_timeseries",
+    "stream_timeseries_rows",
 ]
 import warnings
 from datetime import datetime, timedelta
-from typing import Collection, Iterable, Self, Sequence
+from enum import Enum
+from typing import (
+    AsyncIterator,
+    Collection,
+    Iterable,
+    Iterator,
+    Mapping,
+    Self,
+    Sequence,
+    assert_never,
+    cast,
+)
 
 from more_itertools import batched
 from pydantic import Field, field_validator, model_validator
-from sqlalchemy import Row, select
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import (
+    ColumnElement,
+    Interval,
+    Row,
+    Select,
+    column,
+    func,
+    literal,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg, insert
 from sqlalchemy.exc import IntegrityError
 
 from carlos.database.context import RequestContext
+from carlos.database.data.rollup import (
+    Rollup,
+    enqueue_rollup_refresh,
+    find_coarsest_rollup,
+)
 from carlos.database.error_handling import PostgresErrorCodes, is_postgres_error_code
 from carlos.database.exceptions import NotFound
 from carlos.database.orm import CarlosDeviceSignalOrm, TimeseriesOrm
 from carlos.database.schema import CarlosSchema
 from carlos.database.utils import utcnow
-from carlos.database.utils.partitions import MonthlyPartition, create_partition
+from carlos.database.utils.partitions import (
+    MonthlyPartition,
+    PartitionManager,
+    TimePartition,
+)
 from carlos.database.utils.timestamp_utils import validate_datetime_timezone_utc
 from carlos.database.utils.values import prevent_real_overflow
 
@@ -103,6 +140,14 @@ class DatetimeRange(CarlosSchema):
 
 _TIMESERIES_MAX_BATCH_SIZE = 1000
 
+TIMESERIES_PARTITIONS = PartitionManager(
+    table=TimeseriesOrm, partition_type=MonthlyPartition
+)
+"""Keeps track of the existing partitions of the timeseries table in this process."""
+
+UPCOMING_TIMESERIES_PARTITIONS = 2
+"""The number of monthly partitions that are created ahead of time."""
+
 ValueType = int | float | bool | None
 
 
@@ -110,18 +155,32 @@ class DuplicateTimestamp(Warning):
     """Issued when duplicate timestamps are found in the data."""
 
 
+class IngestMethod(str, Enum):
+    """Defines how timeseries data is written to the database."""
+
+    INSERT = "insert"
+    """Issues an `INSERT ... ON CONFLICT` statement per batch of samples."""
+
+    COPY = "copy"
+    """Streams all samples via binary COPY into a temporary staging table and merges
+    them into the timeseries table with a single statement. This is considerably
+    faster for large amounts of samples, e.g. when devices upload their backlog."""
+
+
 async def add_timeseries(
     context: RequestContext,
     timeseries_id: int,
     timestamps: Sequence[datetime],
     values: Sequence[ValueType],
+    method: IngestMethod = IngestMethod.INSERT,
 ):
     """Adds timeseries data to the database.
 
     ⚠️ Warning: Using this function may lead to loss of data if the connection
-    contains uncommitted data. This is because the function may need to rollback
-    the current transaction in case the underlying partition tables are not existent.
-    In that case they will be created but with the cost of loosing any uncommitted
+    contains uncommitted data. The function commits the current transaction in case
+    the underlying partition tables need to be created. In the rare case that a
+    partition disappears after it has been seen by this process, the function needs
+    to rollback the current transaction with the cost of loosing any uncommitted
     data.
 
     :param context: The request context.
@@ -130,6 +189,8 @@ async def add_timeseries(
     :param values: The values to add.
         Values are allowed to be of type float, integer, boolean or None. Values will be
         converted to float (except None) before being stored in the database.
+    :param method: Defines how the data is written to the database.
+        See `IngestMethod` for details.
     :raises ValueError: If the length of timestamps and values are not equal, the
         provided timeseries_id is not a timeseries, or the timestamps contain timzone
         naive datetime objects.
@@ -139,6 +200,15 @@ async def add_timeseries(
     if len(timestamps) != sample_cnt:
         raise ValueError("The length of timestamps and values must be equal")
 
+    if method == IngestMethod.COPY:
+        await _copy_timeseries(
+            context=context,
+            values_to_insert=_build_values_to_insert(
+                timeseries_id=timeseries_id, series=zip(timestamps, values)
+            ),
+        )
+        return
+
     # could be optimized by parallelize the inserts
     # It would still wait for the DB, but python also needs some time to prepare the
     # data
@@ -153,25 +223,174 @@ async def add_timeseries(
             set_={"value": insert_stmt.excluded.value},  # pylint: disable=no-member
         )
 
+        await TIMESERIES_PARTITIONS.ensure_partitions(
+            context=context,
+            partitions=_extract_partitions_from_values(values_to_insert),
+        )
+
         try:
             await context.connection.execute(insert_stmt, values_to_insert)
+            await _enqueue_rollup_refresh_of_values(
+                context=context, values=values_to_insert
+            )
             await context.connection.commit()
         except IntegrityError as err:
             await context.connection.rollback()
             if is_postgres_error_code(err, PostgresErrorCodes.CHECK_VIOLATION):
                 # A check violation error does not necessarily only mean that the
                 # partition is missing. But since the timeseries table has not other
-                # checks defined we can assume that this is the case.
+                # checks defined we can assume that this is the case. This may only
+                # happen if a known partition has been dropped in the meantime.
                 await _handle_missing_partitions(
-                    context=context, values=values_to_insert  # type: ignore
+                    context=context, values=values_to_insert
                 )
 
                 await context.connection.execute(insert_stmt, values_to_insert)
+                await _enqueue_rollup_refresh_of_values(
+                    context=context, values=values_to_insert
+                )
                 await context.connection.commit()
                 continue
             raise  # pragma: no cover
 
 
+async def add_timeseries_bulk(
+    context: RequestContext,
+    series: Mapping[int, tuple[Sequence[datetime], Sequence[ValueType]]],
+):
+    """Adds the timeseries data of multiple timeseries to the database.
+
+    All samples are written with a single merge statement in a single transaction,
+    using the COPY ingest method. This is the preferred way to store payloads that
+    contain the data of multiple timeseries at once.
+
+    ⚠️ Warning: See `add_timeseries()` about the possible loss of uncommitted data.
+
+    :param context: The request context.
+    :param series: A mapping of the timeseries_id to a tuple of the timestamps and
+        values to add. See `add_timeseries()` for details about the values.
+    :raises ValueError: If the length of timestamps and values of any timeseries are
+        not equal, or the timestamps contain timezone naive datetime objects.
+    """
+
+    values_to_insert: list[dict[str, datetime | float | int | None]] = []
+    for timeseries_id, (timestamps, values) in series.items():
+        if len(timestamps) != len(values):
+            raise ValueError(
+                f"The length of timestamps and values must be equal "
+                f"({timeseries_id=})."
+            )
+
+        values_to_insert.extend(
+            _build_values_to_insert(
+                timeseries_id=timeseries_id, series=zip(timestamps, values)
+            )
+        )
+
+    await _copy_timeseries(context=context, values_to_insert=values_to_insert)
+
+
+_STAGING_TABLE = table(
+    "_timeseries_staging",
+    column("timeseries_id"),
+    column("timestamp_utc"),
+    column("value"),
+)
+"""The temporary table used to stage the samples of the COPY ingest method."""
+
+_STAGING_COLUMNS = tuple(_STAGING_TABLE.columns.keys())
+
+
+async def _copy_timeseries(
+    context: RequestContext,
+    values_to_insert: list[dict[str, datetime | float | int | None]],
+):
+    """Writes the given samples via binary COPY into a temporary staging table and
+    merges them into the timeseries table with a single statement.
+
+    The staging table is dropped at the end of the transaction. In case the
+    partitions required for the data do not exist, the transaction is rolled back,
+    the partitions are created and the whole operation is retried.
+
+    :param context: The request context.
+    :param values_to_insert: The samples to insert, as returned by
+        `_build_values_to_insert()`. Each (timeseries_id, timestamp_utc) pair must
+        be unique.
+    """
+
+    if not values_to_insert:
+        return
+
+    # mypy can not know the types of the individual fields
+    records: list[tuple[int, datetime, float | None]] = [
+        (
+            cast(int, sample["timeseries_id"]),
+            cast(datetime, sample["timestamp_utc"]),
+            cast(float | None, sample["value"]),
+        )
+        for sample in values_to_insert
+    ]
+
+    await TIMESERIES_PARTITIONS.ensure_partitions(
+        context=context,
+        partitions=_extract_partitions_from_values(values_to_insert),
+    )
+
+    try:
+        await _stage_and_merge(context=context, records=records)
+        await _enqueue_rollup_refresh_of_values(
+            context=context, values=values_to_insert
+        )
+        await context.connection.commit()
+    except IntegrityError as err:
+        await context.connection.rollback()
+        if not is_postgres_error_code(err, PostgresErrorCodes.CHECK_VIOLATION):
+            raise  # pragma: no cover
+
+        # see add_timeseries() for details why we can assume missing partitions
+        await _handle_missing_partitions(context=context, values=values_to_insert)
+
+        await _stage_and_merge(context=context, records=records)
+        await _enqueue_rollup_refresh_of_values(
+            context=context, values=values_to_insert
+        )
+        await context.connection.commit()
+
+
+async def _stage_and_merge(
+    context: RequestContext, records: list[tuple[int, datetime, float | None]]
+):
+    """Copies the records into the staging table and merges them into the
+    timeseries table. The caller is responsible to commit the transaction."""
+
+    # Creating the table via SQLAlchemy ensures that a transaction is started, which
+    # the COPY below will be part of. Otherwise, the staging table would already
+    # be dropped before we could copy any data into it.
+    await context.connection.execute(
+        text(
+            f"CREATE TEMPORARY TABLE {_STAGING_TABLE.name} "
+            f"(LIKE {TimeseriesOrm.__table__.schema}.{TimeseriesOrm.__tablename__}) "
+            f"ON COMMIT DROP;"
+        )
+    )
+
+    raw_connection = await context.connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    assert driver_connection is not None, "The connection has been closed."
+    await driver_connection.copy_records_to_table(
+        _STAGING_TABLE.name, records=records, columns=_STAGING_COLUMNS
+    )
+
+    merge_stmt = insert(TimeseriesOrm).from_select(
+        _STAGING_COLUMNS, select(_STAGING_TABLE)
+    )
+    merge_stmt = merge_stmt.on_conflict_do_update(
+        index_elements=TimeseriesOrm.__table__.primary_key,
+        set_={"value": merge_stmt.excluded.value},  # pylint: disable=no-member
+    )
+    await context.connection.execute(merge_stmt)
+
+
 def _build_values_to_insert(
     timeseries_id: int, series: Iterable[tuple[datetime, ValueType]]
 ) -> list[dict[str, datetime | float | int | None]]:
@@ -214,37 +433,102 @@ def _coalesce_values(a: float | None, b: float | None, /) -> float | None:
 
 
 async def _handle_missing_partitions(
-    context: RequestContext, values: list[dict[str, datetime | float | int]]
+    context: RequestContext, values: list[dict[str, datetime | float | int | None]]
+):
+    """Introspects the values and ensures that the required partitions exist,
+    regardless of whether they are known to this process or not."""
+
+    partitions = _extract_partitions_from_values(values)
+    TIMESERIES_PARTITIONS.forget(partitions)
+    await TIMESERIES_PARTITIONS.ensure_partitions(
+        context=context, partitions=partitions
+    )
+
+
+async def _enqueue_rollup_refresh_of_values(
+    context: RequestContext, values: list[dict[str, datetime | float | int | None]]
 ):
-    """Introspects the values and ensures that the required partitions exist."""
+    """Queues the refresh of the rollup buckets affected by the given values. The
+    caller is responsible to commit the transaction."""
 
-    for partition in _extract_partitions_from_values(values):
-        await create_partition(context=context, partition=partition)
+    modified: dict[int, tuple[datetime, datetime]] = {}
+    for sample in values:
+        # mypy can not know the types of the values of the dict
+        timeseries_id = cast(int, sample["timeseries_id"])
+        timestamp = cast(datetime, sample["timestamp_utc"])
+
+        if timeseries_id in modified:
+            modified_from, modified_to = modified[timeseries_id]
+            timestamp_range = min(modified_from, timestamp), max(modified_to, timestamp)
+        else:
+            timestamp_range = timestamp, timestamp
+        modified[timeseries_id] = timestamp_range
+
+    await enqueue_rollup_refresh(context=context, modified=modified)
 
 
 def _extract_partitions_from_values(
-    values: list[dict[str, datetime | float | int]]
-) -> set[MonthlyPartition]:
-    """Extracts the years from the timestamps and returns them as a set."""
+    values: list[dict[str, datetime | float | int | None]]
+) -> set[TimePartition]:
+    """Extracts the partitions from the timestamps and returns them as a set."""
 
     return {
-        MonthlyPartition.from_timestamp(
-            # ignore type because mypy can not know that the value of the key
-            # is a datetime
-            timestamp=sample["timestamp_utc"],  # type: ignore
-            table=TimeseriesOrm,
-        )
+        # ignore type because mypy can not know that the value of the key
+        # is a datetime
+        TIMESERIES_PARTITIONS.partition_for(sample["timestamp_utc"])  # type: ignore
         for sample in values
     }
 
 
+async def prepare_timeseries_partitions(
+    context: RequestContext, upcoming: int = UPCOMING_TIMESERIES_PARTITIONS
+):
+    """Loads the existing partitions of the timeseries table and creates the
+    partition of the current month, as well as the upcoming ones.
+
+    This function is meant to be called on startup and periodically afterward, to
+    ensure that no partitions need to be created while ingesting data.
+
+    ⚠️ Warning: This function commits the current transaction.
+
+    :param context: The request context.
+    :param upcoming: The number of upcoming monthly partitions to create.
+    """
+
+    await TIMESERIES_PARTITIONS.hydrate(context=context)
+    await TIMESERIES_PARTITIONS.create_upcoming_partitions(
+        context=context, periods=upcoming, now=utcnow()
+    )
+
+
 MAX_QUERY_RANGE = timedelta(days=30)
 
 
+class Aggregation(str, Enum):
+    """Defines how the samples within a time bucket are aggregated."""
+
+    MIN = "min"
+    """The smallest value within the bucket."""
+
+    MAX = "max"
+    """The largest value within the bucket."""
+
+    AVG = "avg"
+    """The arithmetic mean of the values within the bucket."""
+
+    FIRST = "first"
+    """The value of the earliest sample within the bucket."""
+
+    LAST = "last"
+    """The value of the latest sample within the bucket."""
+
+
 async def get_timeseries(
     context: RequestContext,
     timeseries_ids: Collection[int],
     datetime_range: DatetimeRange,
+    resolution: timedelta | None = None,
+    aggregation: Aggregation = Aggregation.AVG,
 ) -> list[TimeseriesData]:
     """Returns a list of TimeseriesData in between the `earliest_date` and
     `latest_date`.
@@ -253,7 +537,19 @@ async def get_timeseries(
     :param timeseries_ids: List timeseries identifiers to fetch
     :param datetime_range: Defines the timerange in which the timeseries data should
         be fetched
+    :param resolution: If given, the samples are aggregated by the database into
+        buckets of the given size, starting at the start of the datetime_range.
+        Each bucket is represented by a single sample at the start of the bucket.
+        Buckets without any samples are omitted. If the resolution is a multiple of
+        the bucket size of a rollup and the aggregation can be computed from it,
+        the data is read from the coarsest such rollup instead of the raw data.
+        In this case the buckets are aligned to the buckets of the rollup, thus
+        the first bucket may start up to one rollup bucket before the start of the
+        datetime_range.
+    :param aggregation: Defines how the samples within a bucket are aggregated.
+        Only used if a resolution is given.
     :raises ValueError: In case timeseries_ids are not provided.
+    :raises ValueError: In case the resolution is not positive.
     :raises ValueError: In case that timezone naive datetimes are passed in as
         function arguments
     :raises NotFoundError: In case that any of the requested timeseries_ids does not exist in
@@ -278,21 +574,22 @@ async def get_timeseries(
             f"consider splitting the request into smaller chunks."
         )
 
+    _validate_resolution(resolution)
+
     # make sure timeseries_ids do not contain duplicates
     timeseries_ids = set(timeseries_ids)
 
-    time_series_query = (
-        select(
-            TimeseriesOrm.timeseries_id,
-            TimeseriesOrm.timestamp_utc,
-            TimeseriesOrm.value,
-        )
-        .where(
-            TimeseriesOrm.timeseries_id.in_(timeseries_ids),
-            TimeseriesOrm.timestamp_utc >= datetime_range.start_at_utc,
-            TimeseriesOrm.timestamp_utc <= datetime_range.end_at_utc,
-        )
-        .order_by(TimeseriesOrm.timeseries_id.asc(), TimeseriesOrm.timestamp_utc.asc())
+    time_series_query = _build_timeseries_query(
+        timeseries_ids=timeseries_ids,
+        start_at_utc=datetime_range.start_at_utc,
+        end_at_utc=datetime_range.end_at_utc,
+        resolution=resolution,
+        aggregation=aggregation,
+        origin=_bucket_origin(
+            datetime_range=datetime_range,
+            resolution=resolution,
+            aggregation=aggregation,
+        ),
     )
 
     timeseries_result = (await context.connection.execute(time_series_query)).all()
@@ -332,6 +629,366 @@ async def get_timeseries(
     return timeseries_data
 
 
+_STREAM_YIELD_PER = 10_000
+"""The number of rows fetched at once from the server side cursor, as well as the
+maximum number of samples per fragment yielded by `stream_timeseries()`."""
+
+
+async def stream_timeseries(
+    context: RequestContext,
+    timeseries_ids: Collection[int],
+    datetime_range: DatetimeRange,
+    resolution: timedelta | None = None,
+    aggregation: Aggregation = Aggregation.AVG,
+) -> AsyncIterator[TimeseriesData]:
+    """Streams the timeseries data in between the `start_at_utc` and `end_at_utc` of
+    the datetime_range. In contrast to `get_timeseries()` the range is not limited.
+
+    The data is yielded as fragments: Each fragment holds consecutive samples of a
+    single timeseries, ordered by timestamp. The fragments of the same timeseries
+    are yielded in order, but fragments of different timeseries are interleaved.
+    Timeseries that have no data at all in the range are yielded once as an empty
+    fragment at the end.
+
+    See `stream_timeseries_rows()` for details about the parameters and exceptions.
+
+    :return: An async iterator of TimeseriesData fragments.
+    """
+
+    no_data_timeseries_ids = set(timeseries_ids)
+    fragment: TimeseriesData | None = None
+    async for rows in stream_timeseries_rows(
+        context=context,
+        timeseries_ids=timeseries_ids,
+        datetime_range=datetime_range,
+        resolution=resolution,
+        aggregation=aggregation,
+    ):
+        for timeseries_id, timestamp, value in rows:
+            if fragment is not None and (
+                fragment.timeseries_id != timeseries_id
+                or len(fragment.values) >= _STREAM_YIELD_PER
+            ):
+                yield fragment
+                fragment = None
+
+            if fragment is None:
+                fragment = TimeseriesData(
+                    timeseries_id=timeseries_id, timestamps=[], values=[]
+                )
+                no_data_timeseries_ids.discard(timeseries_id)
+
+            fragment.timestamps.append(timestamp)
+            fragment.values.append(value)
+
+    if fragment is not None:
+        yield fragment
+
+    for no_data_ts_id in sorted(no_data_timeseries_ids):
+        yield TimeseriesData(timeseries_id=no_data_ts_id, timestamps=[], values=[])
+
+
+async def stream_timeseries_rows(
+    context: RequestContext,
+    timeseries_ids: Collection[int],
+    datetime_range: DatetimeRange,
+    resolution: timedelta | None = None,
+    aggregation: Aggregation = Aggregation.AVG,
+) -> AsyncIterator[Sequence[Row]]:
+    """Streams the timeseries data in between the `start_at_utc` and `end_at_utc` of
+    the datetime_range as batches of plain (timeseries_id, timestamp, value) rows.
+    In contrast to `get_timeseries()` the range is not limited.
+
+    The range is split into chunks at the boundaries of the partitions of the
+    timeseries table. Each chunk is queried separately and read via a server side
+    cursor, so neither the database nor this process needs to hold more than a
+    fraction of the data at once. Within a chunk, the rows are ordered by
+    timeseries_id and timestamp.
+
+    This is the most efficient way to consume large amounts of data, as no
+    TimeseriesData objects are created.
+
+    :param context: request context.
+    :param timeseries_ids: List timeseries identifiers to fetch
+    :param datetime_range: Defines the timerange in which the timeseries data should
+        be fetched
+    :param resolution: See `get_timeseries()`.
+    :param aggregation: See `get_timeseries()`.
+    :raises ValueError: In case timeseries_ids are not provided.
+    :raises ValueError: In case the resolution is not positive.
+    :raises NotFoundError: In case that any of the requested timeseries_ids does not
+        exist. This is raised before any row is yielded.
+    :return: An async iterator of batches of rows.
+    """
+
+    if not timeseries_ids:
+        raise ValueError(
+            "Function argument `timeseries_ids` must not be empty. Please provide "
+            "at least one timeseries_id"
+        )
+
+    _validate_resolution(resolution)
+
+    # make sure timeseries_ids do not contain duplicates
+    timeseries_ids = set(timeseries_ids)
+
+    existing_timeseries_ids = await _get_existing_timeseries_ids(
+        context=context, timeseries_ids=timeseries_ids
+    )
+    missing_timeseries_ids = timeseries_ids - set(existing_timeseries_ids)
+    if missing_timeseries_ids:
+        raise NotFound(
+            f"Requested timeseries_ids {list(missing_timeseries_ids)} are "
+            f"not available timeseries."
+        )
+
+    origin = _bucket_origin(
+        datetime_range=datetime_range, resolution=resolution, aggregation=aggregation
+    )
+
+    for start_at_utc, end_at_utc, is_last in _split_into_chunks(
+        datetime_range=datetime_range, resolution=resolution, origin=origin
+    ):
+        chunk_query = _build_timeseries_query(
+            timeseries_ids=timeseries_ids,
+            start_at_utc=start_at_utc,
+            end_at_utc=end_at_utc,
+            resolution=resolution,
+            aggregation=aggregation,
+            origin=origin,
+            include_end=is_last,
+        ).execution_options(yield_per=_STREAM_YIELD_PER)
+
+        async with context.connection.stream(chunk_query) as result:
+            async for rows in result.partitions():
+                yield rows
+
+
+def _split_into_chunks(
+    datetime_range: DatetimeRange, resolution: timedelta | None, origin: datetime
+) -> Iterator[tuple[datetime, datetime, bool]]:
+    """Splits the datetime_range at the boundaries of the timeseries partitions.
+
+    If a resolution is given, the boundaries are moved to the start of the next
+    bucket, to ensure that each bucket is computed within a single chunk.
+
+    :return: An iterator of the start, end and whether the chunk is the last one.
+        The end is exclusive for all but the last chunk.
+    """
+
+    start_at_utc = datetime_range.start_at_utc
+    while True:
+        partition = TIMESERIES_PARTITIONS.partition_for(start_at_utc)
+        boundary = partition.next_partition().start_at_utc
+        if resolution is not None:
+            buckets_until_boundary = -((origin - boundary) // resolution)
+            boundary = origin + buckets_until_boundary * resolution
+
+        if boundary >= datetime_range.end_at_utc:
+            yield start_at_utc, datetime_range.end_at_utc, True
+            return
+
+        yield start_at_utc, boundary, False
+        start_at_utc = boundary
+
+
+def _validate_resolution(resolution: timedelta | None):
+    """Ensures that the resolution is positive, if given."""
+
+    if resolution is not None and resolution <= timedelta(0):
+        raise ValueError("The resolution must be positive.")
+
+
+_ROLLUP_AGGREGATIONS = frozenset({Aggregation.MIN, Aggregation.MAX, Aggregation.AVG})
+"""The aggregations that can be computed from the rollups."""
+
+
+def _plan_rollup(
+    resolution: timedelta | None, aggregation: Aggregation
+) -> Rollup | None:
+    """Returns the rollup the data should be read from, or None if the raw data
+    needs to be queried."""
+
+    if resolution is None or aggregation not in _ROLLUP_AGGREGATIONS:
+        return None
+
+    return find_coarsest_rollup(resolution)
+
+
+def _bucket_origin(
+    datetime_range: DatetimeRange,
+    resolution: timedelta | None,
+    aggregation: Aggregation,
+) -> datetime:
+    """Returns the timestamp the buckets of the given resolution are aligned to."""
+
+    rollup = _plan_rollup(resolution=resolution, aggregation=aggregation)
+    if rollup is None:
+        return datetime_range.start_at_utc
+
+    # align the buckets to the rollup, so that each bucket consists of whole
+    # rollup buckets
+    return rollup.bucket_of(datetime_range.start_at_utc)
+
+
+def _build_timeseries_query(
+    timeseries_ids: Collection[int],
+    start_at_utc: datetime,
+    end_at_utc: datetime,
+    resolution: timedelta | None,
+    aggregation: Aggregation,
+    origin: datetime,
+    include_end: bool = True,
+) -> Select:
+    """Builds the query to fetch the timeseries data in between `start_at_utc` and
+    `end_at_utc`. The query yields rows of (timeseries_id, timestamp, value) ordered
+    by timeseries_id and timestamp.
+
+    :param timeseries_ids: The timeseries to fetch.
+    :param start_at_utc: The start of the range (inclusive).
+    :param end_at_utc: The end of the range.
+    :param resolution: The size of the buckets, or None to fetch the raw samples.
+    :param aggregation: Defines how the samples within a bucket are aggregated.
+    :param origin: The timestamp the buckets are aligned to.
+    :param include_end: Whether samples at the `end_at_utc` are included.
+    """
+
+    if resolution is None:
+        before_end = (
+            TimeseriesOrm.timestamp_utc <= end_at_utc
+            if include_end
+            else TimeseriesOrm.timestamp_utc < end_at_utc
+        )
+        return (
+            select(
+                TimeseriesOrm.timeseries_id,
+                TimeseriesOrm.timestamp_utc,
+                TimeseriesOrm.value,
+            )
+            .where(
+                TimeseriesOrm.timeseries_id.in_(timeseries_ids),
+                TimeseriesOrm.timestamp_utc >= start_at_utc,
+                before_end,
+            )
+            .order_by(
+                TimeseriesOrm.timeseries_id.asc(), TimeseriesOrm.timestamp_utc.asc()
+            )
+        )
+
+    rollup = _plan_rollup(resolution=resolution, aggregation=aggregation)
+    if rollup is not None:
+        return _build_rollup_query(
+            rollup=rollup,
+            timeseries_ids=timeseries_ids,
+            start_at_utc=start_at_utc,
+            end_at_utc=end_at_utc,
+            resolution=resolution,
+            aggregation=aggregation,
+            origin=origin,
+            include_end=include_end,
+        )
+
+    bucket = func.date_bin(
+        literal(resolution, Interval()), TimeseriesOrm.timestamp_utc, origin
+    ).label("bucket")
+    before_end = (
+        TimeseriesOrm.timestamp_utc <= end_at_utc
+        if include_end
+        else TimeseriesOrm.timestamp_utc < end_at_utc
+    )
+    return (
+        select(
+            TimeseriesOrm.timeseries_id,
+            bucket,
+            _aggregate_value(aggregation).label("value"),
+        )
+        .where(
+            TimeseriesOrm.timeseries_id.in_(timeseries_ids),
+            TimeseriesOrm.timestamp_utc >= start_at_utc,
+            before_end,
+        )
+        .group_by(TimeseriesOrm.timeseries_id, bucket)
+        .order_by(TimeseriesOrm.timeseries_id.asc(), bucket.asc())
+    )
+
+
+def _build_rollup_query(
+    rollup: Rollup,
+    timeseries_ids: Collection[int],
+    start_at_utc: datetime,
+    end_at_utc: datetime,
+    resolution: timedelta,
+    aggregation: Aggregation,
+    origin: datetime,
+    include_end: bool,
+) -> Select:
+    """Builds the query to aggregate the data into buckets of the given resolution
+    from the given rollup. The resolution must be a multiple of the bucket size of
+    the rollup."""
+
+    rollup_table = rollup.table
+    bucket = func.date_bin(
+        literal(resolution, Interval()), rollup_table.timestamp_utc, origin
+    ).label("bucket")
+
+    value: ColumnElement[float | None]
+    match aggregation:
+        case Aggregation.MIN:
+            value = func.min(rollup_table.min_value)
+        case Aggregation.MAX:
+            value = func.max(rollup_table.max_value)
+        case Aggregation.AVG:
+            value = func.sum(
+                rollup_table.mean_value * rollup_table.sample_count
+            ) / func.nullif(func.sum(rollup_table.sample_count), 0)
+        case _:
+            raise ValueError(
+                f"The aggregation {aggregation.value} can not be computed from rollups."
+            )
+
+    before_end = (
+        rollup_table.timestamp_utc <= end_at_utc
+        if include_end
+        else rollup_table.timestamp_utc < end_at_utc
+    )
+    return (
+        select(rollup_table.timeseries_id, bucket, value.label("value"))
+        .where(
+            rollup_table.timeseries_id.in_(timeseries_ids),
+            rollup_table.timestamp_utc >= rollup.bucket_of(start_at_utc),
+            before_end,
+        )
+        .group_by(rollup_table.timeseries_id, bucket)
+        .order_by(rollup_table.timeseries_id.asc(), bucket.asc())
+    )
+
+
+def _aggregate_value(aggregation: Aggregation) -> ColumnElement:
+    """Returns the SQL expression to aggregate the values of a time bucket."""
+
+    match aggregation:
+        case Aggregation.MIN:
+            return func.min(TimeseriesOrm.value)
+        case Aggregation.MAX:
+            return func.max(TimeseriesOrm.value)
+        case Aggregation.AVG:
+            return func.avg(TimeseriesOrm.value)
+        case Aggregation.FIRST:
+            return array_agg(
+                aggregate_order_by(
+                    TimeseriesOrm.value, TimeseriesOrm.timestamp_utc.asc()
+                )
+            )[1]
+        case Aggregation.LAST:
+            return array_agg(
+                aggregate_order_by(
+                    TimeseriesOrm.value, TimeseriesOrm.timestamp_utc.desc()
+                )
+            )[1]
+
+    assert_never(aggregation)
+
+
 async def _get_existing_timeseries_ids(
     context: RequestContext, timeseries_ids: Iterable[int]
 ) -> list[int]:
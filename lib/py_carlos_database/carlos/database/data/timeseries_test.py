@@ -10,12 +10,19 @@ from carlos.database.device import CarlosDeviceSignal
 from carlos.database.exceptions import NotFound
 from carlos.database.utils import utcnow
 
+from .rollup import ROLLUPS, refresh_queued_rollups
 from .timeseries import (
     MAX_QUERY_RANGE,
+    Aggregation,
     DatetimeRange,
+    IngestMethod,
     TimeseriesData,
+    _build_rollup_query,
+    _split_into_chunks,
     add_timeseries,
+    add_timeseries_bulk,
     get_timeseries,
+    stream_timeseries,
 )
 
 
@@ -121,8 +128,11 @@ def random_data(datetime_range, n_samples: int) -> tuple[list[datetime], list[fl
     return timestamps, values
 
 
+@pytest.mark.parametrize("method", list(IngestMethod))
 async def test_timeseries_duplicate_data(
-    async_carlos_db_context: RequestContext, driver_signals: list[CarlosDeviceSignal]
+    async_carlos_db_context: RequestContext,
+    driver_signals: list[CarlosDeviceSignal],
+    method: IngestMethod,
 ):
     span = timedelta(hours=2)
     now = utcnow()
@@ -142,6 +152,7 @@ async def test_timeseries_duplicate_data(
             timeseries_id=driver_signals[0].timeseries_id,
             timestamps=timestamps,
             values=values,
+            method=method,
         )
 
     ts = await get_timeseries(
@@ -154,6 +165,277 @@ async def test_timeseries_duplicate_data(
     assert len(ts[0].timestamps) == n_samples, "Duplicate data was not ignored"
 
 
+async def test_add_timeseries_copy(
+    async_carlos_db_context: RequestContext, driver_signals: list[CarlosDeviceSignal]
+):
+    """Ensures that the COPY ingest method creates missing partitions and
+    overwrites existing samples."""
+
+    # the range spans a month boundary in the past to ensure that the required
+    # partitions do not exist yet
+    datetime_range = DatetimeRange(
+        start_at_utc=datetime(2019, 1, 31, 23, tzinfo=UTC),
+        end_at_utc=datetime(2019, 2, 1, 1, tzinfo=UTC),
+    )
+
+    n_samples = 1200
+    timestamps, values = random_data(datetime_range=datetime_range, n_samples=n_samples)
+
+    await add_timeseries(
+        context=async_carlos_db_context,
+        timeseries_id=driver_signals[0].timeseries_id,
+        timestamps=timestamps,
+        values=values,
+        method=IngestMethod.COPY,
+    )
+
+    # the second insert must overwrite the existing values
+    await add_timeseries(
+        context=async_carlos_db_context,
+        timeseries_id=driver_signals[0].timeseries_id,
+        timestamps=timestamps,
+        values=[42.0] * n_samples,
+        method=IngestMethod.COPY,
+    )
+
+    ts = await get_timeseries(
+        context=async_carlos_db_context,
+        timeseries_ids=[driver_signals[0].timeseries_id],
+        datetime_range=datetime_range,
+    )
+    assert len(ts) == 1
+    assert ts[0].timestamps == timestamps, "Not all samples were copied."
+    assert ts[0].values == [42.0] * n_samples, "Existing values were not updated."
+
+
+async def test_add_timeseries_bulk(
+    async_carlos_db_context: RequestContext, driver_signals: list[CarlosDeviceSignal]
+):
+    """Ensures that the data of multiple timeseries can be added at once."""
+
+    span = timedelta(hours=2)
+    now = utcnow()
+    datetime_range = DatetimeRange(start_at_utc=now - span, end_at_utc=now)
+
+    sample_counts = {
+        signal.timeseries_id: 100 * (idx + 1)
+        for idx, signal in enumerate(driver_signals)
+    }
+
+    await add_timeseries_bulk(
+        context=async_carlos_db_context,
+        series={
+            timeseries_id: random_data(
+                datetime_range=datetime_range, n_samples=n_samples
+            )
+            for timeseries_id, n_samples in sample_counts.items()
+        },
+    )
+
+    ts = await get_timeseries(
+        context=async_carlos_db_context,
+        timeseries_ids=list(sample_counts.keys()),
+        datetime_range=datetime_range,
+    )
+    assert len(ts) == len(sample_counts)
+    for t in ts:
+        assert len(t.values) == sample_counts[t.timeseries_id]
+        assert len(t.timestamps) == sample_counts[t.timeseries_id]
+
+    # ensure that the method raises an error if the input data has different lengths
+    with pytest.raises(ValueError):
+        await add_timeseries_bulk(
+            context=async_carlos_db_context,
+            series={
+                driver_signals[0].timeseries_id: (
+                    [datetime.now(tz=UTC), datetime.now(tz=UTC)],
+                    [1],
+                )
+            },
+        )
+
+
+@pytest.mark.parametrize(
+    "aggregation, expected_values",
+    [
+        pytest.param(Aggregation.MIN, [0.0, 10.0], id="min"),
+        pytest.param(Aggregation.MAX, [9.0, 19.0], id="max"),
+        pytest.param(Aggregation.AVG, [4.5, 14.5], id="avg"),
+        pytest.param(Aggregation.FIRST, [0.0, 10.0], id="first"),
+        pytest.param(Aggregation.LAST, [9.0, 19.0], id="last"),
+    ],
+)
+async def test_get_timeseries_resolution(
+    async_carlos_db_context: RequestContext,
+    driver_signals: list[CarlosDeviceSignal],
+    aggregation: Aggregation,
+    expected_values: list[float],
+):
+    """Ensures that the samples are aggregated into buckets by the database."""
+
+    start_at = datetime(2024, 3, 1, tzinfo=UTC)
+    datetime_range = DatetimeRange(
+        start_at_utc=start_at, end_at_utc=start_at + timedelta(minutes=20)
+    )
+    timeseries_id = driver_signals[0].timeseries_id
+
+    await add_timeseries(
+        context=async_carlos_db_context,
+        timeseries_id=timeseries_id,
+        timestamps=[start_at + timedelta(minutes=i) for i in range(20)],
+        values=[float(i) for i in range(20)],
+    )
+    await refresh_queued_rollups(context=async_carlos_db_context)
+    await async_carlos_db_context.connection.commit()
+
+    ts = await get_timeseries(
+        context=async_carlos_db_context,
+        timeseries_ids=[timeseries_id],
+        datetime_range=datetime_range,
+        resolution=timedelta(minutes=10),
+        aggregation=aggregation,
+    )
+
+    assert len(ts) == 1
+    assert ts[0].timestamps == [start_at, start_at + timedelta(minutes=10)]
+    assert ts[0].values == pytest.approx(expected_values)
+
+    with pytest.raises(ValueError):
+        await get_timeseries(
+            context=async_carlos_db_context,
+            timeseries_ids=[timeseries_id],
+            datetime_range=datetime_range,
+            resolution=timedelta(0),
+        )
+
+
+async def test_stream_timeseries(
+    async_carlos_db_context: RequestContext, driver_signals: list[CarlosDeviceSignal]
+):
+    """Ensures that ranges exceeding the MAX_QUERY_RANGE can be streamed."""
+
+    datetime_range = DatetimeRange(
+        start_at_utc=datetime(2019, 6, 15, tzinfo=UTC),
+        end_at_utc=datetime(2019, 9, 15, tzinfo=UTC),
+    )
+    assert datetime_range.end_at_utc - datetime_range.start_at_utc > MAX_QUERY_RANGE
+
+    with_data, without_data = driver_signals
+    timestamps, values = random_data(datetime_range=datetime_range, n_samples=2000)
+    await add_timeseries_bulk(
+        context=async_carlos_db_context,
+        series={with_data.timeseries_id: (timestamps, values)},
+    )
+
+    streamed: dict[int, TimeseriesData] = {}
+    async for fragment in stream_timeseries(
+        context=async_carlos_db_context,
+        timeseries_ids=[with_data.timeseries_id, without_data.timeseries_id],
+        datetime_range=datetime_range,
+    ):
+        if fragment.timeseries_id not in streamed:
+            streamed[fragment.timeseries_id] = fragment
+            continue
+        streamed[fragment.timeseries_id].timestamps.extend(fragment.timestamps)
+        streamed[fragment.timeseries_id].values.extend(fragment.values)
+
+    assert streamed[with_data.timeseries_id].timestamps == timestamps
+    assert streamed[with_data.timeseries_id].values == pytest.approx(values)
+    assert streamed[without_data.timeseries_id].timestamps == []
+
+    # each bucket must be yielded exactly once, even if it spans multiple chunks
+    bucket_timestamps: list[datetime] = []
+    async for fragment in stream_timeseries(
+        context=async_carlos_db_context,
+        timeseries_ids=[with_data.timeseries_id],
+        datetime_range=datetime_range,
+        resolution=timedelta(days=7),
+        aggregation=Aggregation.FIRST,
+    ):
+        bucket_timestamps.extend(fragment.timestamps)
+
+    assert bucket_timestamps == [
+        datetime_range.start_at_utc + timedelta(days=7 * i) for i in range(14)
+    ]
+
+    with pytest.raises(NotFound):
+        async for _ in stream_timeseries(
+            context=async_carlos_db_context,
+            timeseries_ids=[42069],
+            datetime_range=datetime_range,
+        ):
+            pass  # pragma: no cover
+
+
+@pytest.mark.parametrize(
+    "resolution, expected_boundaries",
+    [
+        pytest.param(
+            None,
+            [
+                datetime(2024, 2, 1, tzinfo=UTC),
+                datetime(2024, 3, 1, tzinfo=UTC),
+            ],
+            id="partition boundaries",
+        ),
+        pytest.param(
+            timedelta(days=7),
+            [
+                datetime(2024, 2, 5, 3, tzinfo=UTC),
+                datetime(2024, 3, 4, 3, tzinfo=UTC),
+            ],
+            id="aligned to buckets",
+        ),
+    ],
+)
+def test_split_into_chunks(
+    resolution: timedelta | None, expected_boundaries: list[datetime]
+):
+    """Ensures that the range is split at the partition boundaries."""
+
+    datetime_range = DatetimeRange(
+        start_at_utc=datetime(2024, 1, 15, 3, tzinfo=UTC),
+        end_at_utc=datetime(2024, 3, 20, tzinfo=UTC),
+    )
+
+    chunks = list(
+        _split_into_chunks(
+            datetime_range=datetime_range,
+            resolution=resolution,
+            origin=datetime_range.start_at_utc,
+        )
+    )
+
+    assert [start for start, _, _ in chunks] == [
+        datetime_range.start_at_utc,
+        *expected_boundaries,
+    ]
+    assert [end for _, end, _ in chunks] == [
+        *expected_boundaries,
+        datetime_range.end_at_utc,
+    ]
+    assert [is_last for _, _, is_last in chunks] == [False, False, True]
+
+
+@pytest.mark.parametrize("aggregation", [Aggregation.FIRST, Aggregation.LAST])
+def test_build_rollup_query_unsupported_aggregation(aggregation: Aggregation):
+    """Ensures that aggregations which can not be computed from the rollups are
+    rejected."""
+
+    start_at_utc = datetime(2024, 1, 15, tzinfo=UTC)
+    with pytest.raises(ValueError, match=aggregation.value):
+        _build_rollup_query(
+            rollup=ROLLUPS[0],
+            timeseries_ids=[1],
+            start_at_utc=start_at_utc,
+            end_at_utc=start_at_utc + timedelta(days=1),
+            resolution=ROLLUPS[0].bucket_size,
+            aggregation=aggregation,
+            origin=start_at_utc,
+            include_end=False,
+        )
+
+
 @pytest.mark.parametrize(
     "timeseries_ids, datetime_range, expected_exception",
     [
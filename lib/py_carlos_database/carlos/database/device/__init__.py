@@ -10,6 +10,9 @@ __all__ = [
     "CarlosDeviceSignalCreate",
     "CarlosDeviceSignalUpdate",
     "CarlosDeviceUpdate",
+    "DeviceTimeseriesIndex",
+    "DeviceTimeseriesIndexCache",
+    "TIMESERIES_INDEX_CACHE",
     "create_device",
     "create_device_driver",
     "create_device_signals",
@@ -17,14 +20,19 @@ __all__ = [
     "delete_device_signal",
     "does_device_exist",
     "ensure_device_exists",
+    "get_cached_device_timeseries_index",
     "get_device",
     "get_device_drivers",
     "get_device_signals",
+    "get_device_timeseries_index",
     "list_devices",
+    "resolve_device_timeseries_index",
     "set_device_seen",
+    "set_devices_seen",
     "update_device",
     "update_device_driver",
     "update_device_signal",
+    "upsert_device_metadata",
 ]
 
 from .device_management import (
@@ -37,6 +45,7 @@ from .device_management import (
     get_device,
     list_devices,
     set_device_seen,
+    set_devices_seen,
     update_device,
 )
 from .device_metadata import (
@@ -50,8 +59,17 @@ from .device_metadata import (
     create_device_signals,
     delete_device_driver,
     delete_device_signal,
+    get_cached_device_timeseries_index,
     get_device_drivers,
     get_device_signals,
+    get_device_timeseries_index,
+    resolve_device_timeseries_index,
     update_device_driver,
     update_device_signal,
+    upsert_device_metadata,
+)
+from .timeseries_index_cache import (
+    TIMESERIES_INDEX_CACHE,
+    DeviceTimeseriesIndex,
+    DeviceTimeseriesIndexCache,
 )
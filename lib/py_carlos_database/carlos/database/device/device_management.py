@@ -8,14 +8,16 @@ __all__ = [
     "get_device",
     "list_devices",
     "set_device_seen",
+    "set_devices_seen",
     "update_device",
 ]
 
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from carlos.edge.interface import DeviceId
 from pydantic import Field, computed_field
-from sqlalchemy import insert, select, update
+from sqlalchemy import TIMESTAMP, column, func, insert, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as SQLUUID
 from sqlalchemy.exc import NoResultFound
 
 from carlos.database.context import RequestContext
@@ -81,6 +83,40 @@ async def set_device_seen(
     await context.connection.commit()
 
 
+async def set_devices_seen(
+    context: RequestContext,
+    seen: dict[DeviceId, datetime],
+) -> None:
+    """Updates the last seen timestamps of multiple devices with a single statement.
+    A timestamp that is older than the stored one is ignored, so that a delayed
+    update does not move the last seen timestamp back in time.
+
+    :param context: The request context.
+    :param seen: Maps the device id to the time the device was last seen.
+    """
+
+    if not seen:
+        return
+
+    seen_values = values(
+        column("device_id", SQLUUID(as_uuid=True)),
+        column("last_seen_at", TIMESTAMP(timezone=True)),
+        name="seen",
+    ).data(list(seen.items()))
+
+    query = (
+        update(CarlosDeviceOrm)
+        .where(CarlosDeviceOrm.device_id == seen_values.c.device_id)
+        .values(
+            last_seen_at=func.greatest(
+                CarlosDeviceOrm.last_seen_at, seen_values.c.last_seen_at
+            )
+        )
+    )
+    await context.connection.execute(query)
+    await context.connection.commit()
+
+
 async def create_device(
     context: RequestContext,
     device: CarlosDeviceCreate,
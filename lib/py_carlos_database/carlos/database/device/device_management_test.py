@@ -19,6 +19,7 @@ from .device_management import (
     get_device,
     list_devices,
     set_device_seen,
+    set_devices_seen,
     update_device,
 )
 
@@ -122,6 +123,41 @@ async def test_set_device_seen(async_carlos_db_context: RequestContext):
     assert (updated.last_seen_at - utcnow()) <= timedelta(seconds=1)
 
 
+@pytest.mark.asyncio()
+async def test_set_devices_seen(async_carlos_db_context: RequestContext):
+    """This test ensures that the `set_devices_seen` method updates multiple
+    devices at once and never moves the last seen timestamp back in time."""
+
+    devices = [
+        await create_device(
+            context=async_carlos_db_context,
+            device=CarlosDeviceCreate(display_name=f"Test Device {i}"),
+        )
+        for i in range(2)
+    ]
+
+    now = utcnow()
+    await set_devices_seen(
+        context=async_carlos_db_context,
+        seen={device.device_id: now for device in devices},
+    )
+
+    # An older timestamp must not overwrite the newer one.
+    await set_devices_seen(
+        context=async_carlos_db_context,
+        seen={devices[0].device_id: now - timedelta(minutes=1)},
+    )
+
+    for device in devices:
+        updated = await get_device(
+            context=async_carlos_db_context, device_id=device.device_id
+        )
+        assert updated.last_seen_at == now
+
+    # Nothing to update, does not fail
+    await set_devices_seen(context=async_carlos_db_context, seen={})
+
+
 @pytest.mark.asyncio()
 @pytest.mark.parametrize(
     "device_id, expected_result",
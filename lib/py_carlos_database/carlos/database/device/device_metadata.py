@@ -10,21 +10,42 @@ __all__ = [
     "delete_device_driver",
     "delete_device_signal",
     "get_device_drivers",
+    "get_cached_device_timeseries_index",
     "get_device_signals",
+    "get_device_timeseries_index",
+    "resolve_device_timeseries_index",
     "update_device_driver",
     "update_device_signal",
+    "upsert_device_metadata",
 ]
 
+import hashlib
+import json
 from uuid import UUID
 
 from carlos.edge.interface import DeviceId
 from carlos.edge.interface.device.driver_config import (
     DRIVER_IDENTIFIER_LENGTH,
     DriverDirection,
+    DriverMetadata,
 )
 from carlos.edge.interface.units import PhysicalQuantity, UnitOfMeasurement
 from pydantic import Field, computed_field
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import (
+    SMALLINT,
+    VARCHAR,
+    column,
+    delete,
+    exists,
+    insert,
+    literal,
+    select,
+    true,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import UUID as SQLUUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import NoResultFound
 
 from carlos.database.context import RequestContext
@@ -37,6 +58,8 @@ from carlos.database.orm import (
 from carlos.database.schema import CarlosSchema
 from carlos.database.utils import does_exist
 
+from .timeseries_index_cache import TIMESERIES_INDEX_CACHE, DeviceTimeseriesIndex
+
 
 class _DriverMixin(CarlosSchema):
     display_name: str = Field(
@@ -249,6 +272,9 @@ async def delete_device_driver(
     await context.connection.execute(stmt)
     await context.connection.commit()
 
+    # the signals of the driver are deleted as well
+    TIMESERIES_INDEX_CACHE.invalidate(device_id)
+
 
 async def get_device_signals(
     context: RequestContext,
@@ -316,6 +342,7 @@ async def create_device_signals(
 
     created = (await context.connection.execute(stmt)).all()
     await context.connection.commit()
+    TIMESERIES_INDEX_CACHE.invalidate(device_id)
 
     return [CarlosDeviceSignal.model_validate(signal) for signal in created]
 
@@ -349,7 +376,10 @@ async def update_device_signal(
     except NoResultFound:
         raise NotFound(f"Signal {timeseries_id=} does not exist.")
 
-    return CarlosDeviceSignal.model_validate(updated)
+    signal_ = CarlosDeviceSignal.model_validate(updated)
+    TIMESERIES_INDEX_CACHE.invalidate(signal_.device_id)
+
+    return signal_
 
 
 async def delete_device_signal(
@@ -362,9 +392,210 @@ async def delete_device_signal(
     :param timeseries_id: The unique identifier of the signal.
     """
 
-    stmt = delete(CarlosDeviceSignalOrm).where(
-        CarlosDeviceSignalOrm.timeseries_id == timeseries_id
+    stmt = (
+        delete(CarlosDeviceSignalOrm)
+        .where(CarlosDeviceSignalOrm.timeseries_id == timeseries_id)
+        .returning(CarlosDeviceSignalOrm.device_id)
     )
 
-    await context.connection.execute(stmt)
+    deleted_device_id = (await context.connection.execute(stmt)).scalar_one_or_none()
     await context.connection.commit()
+
+    if deleted_device_id is not None:
+        TIMESERIES_INDEX_CACHE.invalidate(deleted_device_id)
+
+
+async def upsert_device_metadata(
+    context: RequestContext,
+    device_id: DeviceId,
+    drivers: list[DriverMetadata],
+):
+    """Creates the drivers and signals reported by a device that are not known yet.
+    Existing drivers and signals are left untouched, so that changes made by the
+    user, e.g. the display name, are kept. New drivers and signals use their
+    identifier as display name and are visible on the dashboard.
+
+    Independent of the number of drivers and signals, at most two statements are
+    executed.
+
+    :param context: The request context.
+    :param device_id: The unique identifier of the device.
+    :param drivers: The metadata of the drivers, as reported by the device.
+    """
+
+    if not drivers:
+        return
+
+    driver_stmt = (
+        pg_insert(CarlosDeviceDriverOrm)
+        .values(
+            [
+                {
+                    "device_id": device_id,
+                    "driver_identifier": driver.identifier,
+                    "direction": driver.direction,
+                    "driver_module": driver.driver_module,
+                    "display_name": driver.identifier,
+                    "is_visible_on_dashboard": True,
+                }
+                for driver in drivers
+            ]
+        )
+        .on_conflict_do_nothing(
+            index_elements=[
+                CarlosDeviceDriverOrm.device_id,
+                CarlosDeviceDriverOrm.driver_identifier,
+            ]
+        )
+    )
+    await context.connection.execute(driver_stmt)
+
+    signal_rows = [
+        (driver.identifier, signal.signal_identifier, signal.unit_of_measurement.value)
+        for driver in drivers
+        for signal in driver.signals
+    ]
+    if signal_rows:
+        reported = values(
+            column("driver_identifier", VARCHAR(DRIVER_IDENTIFIER_LENGTH)),
+            column("signal_identifier", VARCHAR(DRIVER_IDENTIFIER_LENGTH)),
+            column("unit_of_measurement", SMALLINT()),
+            name="reported",
+        ).data(signal_rows)
+
+        # The signals are not unique on database level, so the existing ones are
+        # filtered instead of relying on a conflict.
+        is_known = exists().where(
+            CarlosDeviceSignalOrm.device_id == device_id,
+            CarlosDeviceSignalOrm.driver_identifier == reported.c.driver_identifier,
+            CarlosDeviceSignalOrm.signal_identifier == reported.c.signal_identifier,
+        )
+        signal_stmt = insert(CarlosDeviceSignalOrm).from_select(
+            [
+                CarlosDeviceSignalOrm.device_id,
+                CarlosDeviceSignalOrm.driver_identifier,
+                CarlosDeviceSignalOrm.signal_identifier,
+                CarlosDeviceSignalOrm.display_name,
+                CarlosDeviceSignalOrm.unit_of_measurement,
+                CarlosDeviceSignalOrm.is_visible_on_dashboard,
+            ],
+            select(
+                literal(device_id, SQLUUID(as_uuid=True)),
+                reported.c.driver_identifier,
+                reported.c.signal_identifier,
+                reported.c.signal_identifier,
+                reported.c.unit_of_measurement,
+                true(),
+            ).where(~is_known),
+        )
+        await context.connection.execute(signal_stmt)
+
+    await context.connection.commit()
+    TIMESERIES_INDEX_CACHE.invalidate(device_id)
+
+
+async def get_device_timeseries_index(
+    context: RequestContext,
+    device_id: DeviceId,
+) -> DeviceTimeseriesIndex:
+    """Returns the timeseries ids of all signals of a device with a single query.
+
+    :param context: The request context.
+    :param device_id: The unique identifier of the device.
+    :return: Maps the driver identifier to a mapping of the signal identifier to
+        the timeseries id. Drivers without signals are not included.
+    """
+
+    query = select(
+        CarlosDeviceSignalOrm.driver_identifier,
+        CarlosDeviceSignalOrm.signal_identifier,
+        CarlosDeviceSignalOrm.timeseries_id,
+    ).where(CarlosDeviceSignalOrm.device_id == device_id)
+
+    timeseries_index: DeviceTimeseriesIndex = {}
+    for driver_identifier, signal_identifier, timeseries_id in (
+        await context.connection.execute(query)
+    ).all():
+        timeseries_index.setdefault(driver_identifier, {})[
+            signal_identifier
+        ] = timeseries_id
+
+    return timeseries_index
+
+
+async def get_cached_device_timeseries_index(
+    context: RequestContext,
+    device_id: DeviceId,
+    drivers: list[DriverMetadata],
+) -> DeviceTimeseriesIndex | None:
+    """Returns the cached timeseries index of a device, if the device reports the
+    same config as when the index was resolved. The upsert of the device metadata
+    is skipped in this case.
+
+    The cache is local to the process and another process may have changed the
+    signals of the device in the meantime. Hence, the cached index is validated
+    against the timeseries index in the database, which is a single query.
+
+    :param context: The request context.
+    :param device_id: The unique identifier of the device.
+    :param drivers: The metadata of the drivers, as reported by the device.
+    :return: The timeseries index of the device, or None if it must be resolved
+        with `resolve_device_timeseries_index()`. It is shared with the cache and
+        must not be modified.
+    """
+
+    cached = TIMESERIES_INDEX_CACHE.get(
+        device_id=device_id, config_hash=_hash_drivers(drivers)
+    )
+    if cached is None:
+        return None
+
+    current = await get_device_timeseries_index(context=context, device_id=device_id)
+    if current != cached:
+        TIMESERIES_INDEX_CACHE.invalidate(device_id)
+        return None
+
+    return cached
+
+
+async def resolve_device_timeseries_index(
+    context: RequestContext,
+    device_id: DeviceId,
+    drivers: list[DriverMetadata],
+) -> DeviceTimeseriesIndex:
+    """Ensures that the drivers and signals reported by a device exist and returns
+    the timeseries index of the device. The result is cached for the reported
+    config, see `get_cached_device_timeseries_index()`.
+
+    :param context: The request context.
+    :param device_id: The unique identifier of the device.
+    :param drivers: The metadata of the drivers, as reported by the device.
+    :return: The timeseries index of the device. It is shared with the cache and
+        must not be modified.
+    """
+
+    await upsert_device_metadata(context=context, device_id=device_id, drivers=drivers)
+
+    # Read after the upsert, which invalidates the cache itself. Any invalidation
+    # while the index is read discards the result.
+    generation = TIMESERIES_INDEX_CACHE.generation(device_id)
+    timeseries_index = await get_device_timeseries_index(
+        context=context, device_id=device_id
+    )
+    TIMESERIES_INDEX_CACHE.put(
+        device_id=device_id,
+        config_hash=_hash_drivers(drivers),
+        timeseries_index=timeseries_index,
+        generation=generation,
+    )
+
+    return timeseries_index
+
+
+def _hash_drivers(drivers: list[DriverMetadata]) -> str:
+    """Returns a stable hash of the driver metadata reported by a device."""
+
+    serialized = json.dumps(
+        [driver.model_dump(mode="json") for driver in drivers], sort_keys=True
+    )
+    return hashlib.sha256(serialized.encode()).hexdigest()
@@ -1,24 +1,33 @@
 import pytest
 import pytest_asyncio
 from carlos.edge.interface.device import DriverDirection
+from carlos.edge.interface.device.driver_config import DriverMetadata, DriverSignal
 from carlos.edge.interface.units import PhysicalQuantity, UnitOfMeasurement
 
 from carlos.database.context import RequestContext
 from carlos.database.device import (
+    TIMESERIES_INDEX_CACHE,
+    CarlosDeviceCreate,
     CarlosDeviceDriver,
     CarlosDeviceDriverCreate,
     CarlosDeviceDriverUpdate,
     CarlosDeviceSignalCreate,
     CarlosDeviceSignalUpdate,
+    create_device,
     create_device_driver,
     create_device_signals,
     delete_device_driver,
     delete_device_signal,
+    get_cached_device_timeseries_index,
     get_device_drivers,
     get_device_signals,
+    get_device_timeseries_index,
+    resolve_device_timeseries_index,
     update_device_driver,
     update_device_signal,
+    upsert_device_metadata,
 )
+from carlos.database.device.device_metadata import _hash_drivers
 from carlos.database.exceptions import NotFound
 from carlos.database.testing.expectations import DeviceId
 
@@ -272,3 +281,175 @@ async def test_driver_signals_crud(
 
     # deliberately don't delete the last signal, as the delete cascade should take
     # of the driver should care of it
+
+
+async def test_upsert_device_metadata(async_carlos_db_context: RequestContext):
+    """Ensures that only unknown drivers and signals are created and that the
+    timeseries index contains all signals of the device."""
+
+    device = await create_device(
+        context=async_carlos_db_context,
+        device=CarlosDeviceCreate(display_name="Metadata Device"),
+    )
+    device_id = device.device_id
+
+    assert (
+        await get_device_timeseries_index(
+            context=async_carlos_db_context, device_id=device_id
+        )
+        == {}
+    )
+
+    temperature = DriverSignal(
+        signal_identifier="temperature",
+        unit_of_measurement=UnitOfMeasurement.CELSIUS,
+    )
+    humidity = DriverSignal(
+        signal_identifier="humidity",
+        unit_of_measurement=UnitOfMeasurement.HUMIDITY_PERCENTAGE,
+    )
+    drivers = [
+        DriverMetadata(
+            identifier="climate",
+            direction=DriverDirection.INPUT,
+            driver_module="does_not_matter",
+            signals=[temperature],
+        ),
+        DriverMetadata(
+            identifier="empty",
+            direction=DriverDirection.OUTPUT,
+            driver_module="does_not_matter",
+            signals=[],
+        ),
+    ]
+
+    await upsert_device_metadata(
+        context=async_carlos_db_context, device_id=device_id, drivers=drivers
+    )
+    index = await get_device_timeseries_index(
+        context=async_carlos_db_context, device_id=device_id
+    )
+    assert list(index) == ["climate"], "Drivers without signals are not indexed."
+    assert list(index["climate"]) == ["temperature"]
+
+    # Changes made by the user are kept on the next upsert.
+    await update_device_driver(
+        context=async_carlos_db_context,
+        device_id=device_id,
+        driver_identifier="climate",
+        driver=CarlosDeviceDriverUpdate(
+            display_name="Climate", is_visible_on_dashboard=False
+        ),
+    )
+
+    drivers[0].signals.append(humidity)
+    await upsert_device_metadata(
+        context=async_carlos_db_context, device_id=device_id, drivers=drivers
+    )
+    updated_index = await get_device_timeseries_index(
+        context=async_carlos_db_context, device_id=device_id
+    )
+    assert updated_index["climate"]["temperature"] == index["climate"]["temperature"]
+    assert set(updated_index["climate"]) == {"temperature", "humidity"}
+
+    found_drivers = await get_device_drivers(
+        context=async_carlos_db_context, device_id=device_id
+    )
+    assert {driver.driver_identifier for driver in found_drivers} == {
+        "climate",
+        "empty",
+    }
+    climate = next(d for d in found_drivers if d.driver_identifier == "climate")
+    assert climate.display_name == "Climate"
+
+    signals = await get_device_signals(
+        context=async_carlos_db_context,
+        device_id=device_id,
+        driver_identifier="climate",
+    )
+    assert len(signals) == 2, "Known signals must not be duplicated."
+
+
+async def test_resolve_device_timeseries_index(
+    async_carlos_db_context: RequestContext,
+):
+    """Ensures that the resolved timeseries index is cached for the reported config
+    and invalidated once the signals of the device change."""
+
+    device = await create_device(
+        context=async_carlos_db_context,
+        device=CarlosDeviceCreate(display_name="Cached Device"),
+    )
+    device_id = device.device_id
+
+    drivers = [
+        DriverMetadata(
+            identifier="climate",
+            direction=DriverDirection.INPUT,
+            driver_module="does_not_matter",
+            signals=[
+                DriverSignal(
+                    signal_identifier="temperature",
+                    unit_of_measurement=UnitOfMeasurement.CELSIUS,
+                )
+            ],
+        ),
+    ]
+
+    assert (
+        await get_cached_device_timeseries_index(
+            context=async_carlos_db_context, device_id=device_id, drivers=drivers
+        )
+        is None
+    )
+
+    index = await resolve_device_timeseries_index(
+        context=async_carlos_db_context, device_id=device_id, drivers=drivers
+    )
+    assert (
+        await get_cached_device_timeseries_index(
+            context=async_carlos_db_context, device_id=device_id, drivers=drivers
+        )
+        == index
+    )
+
+    # a different config is not served from the cache
+    changed_drivers = [drivers[0].model_copy(update={"driver_module": "changed"})]
+    assert (
+        await get_cached_device_timeseries_index(
+            context=async_carlos_db_context,
+            device_id=device_id,
+            drivers=changed_drivers,
+        )
+        is None
+    )
+
+    await delete_device_signal(
+        context=async_carlos_db_context,
+        timeseries_id=index["climate"]["temperature"],
+    )
+    assert (
+        await get_cached_device_timeseries_index(
+            context=async_carlos_db_context, device_id=device_id, drivers=drivers
+        )
+        is None
+    )
+
+    # the cache of another process is not invalidated, but must not be served
+    TIMESERIES_INDEX_CACHE.put(
+        device_id=device_id,
+        config_hash=_hash_drivers(drivers),
+        timeseries_index=index,
+        generation=TIMESERIES_INDEX_CACHE.generation(device_id),
+    )
+    assert (
+        await get_cached_device_timeseries_index(
+            context=async_carlos_db_context, device_id=device_id, drivers=drivers
+        )
+        is None
+    )
+
+    recreated = await resolve_device_timeseries_index(
+        context=async_carlos_db_context, device_id=device_id, drivers=drivers
+    )
+    assert recreated["climate"]["temperature"] != index["climate"]["temperature"]
@@ -0,0 +1,122 @@
+"""This module contains the cache of the timeseries index of the devices."""
+
+__all__ = [
+    "DeviceTimeseriesIndex",
+    "DeviceTimeseriesIndexCache",
+    "TIMESERIES_INDEX_CACHE",
+    "TIMESERIES_INDEX_CACHE_TTL",
+]
+
+from dataclasses import dataclass
+from datetime import timedelta
+from time import monotonic
+
+from carlos.edge.interface import DeviceId
+
+DeviceTimeseriesIndex = dict[str, dict[str, int]]
+"""Maps the driver identifier to a mapping of the signal identifier to the
+timeseries id."""
+
+TIMESERIES_INDEX_CACHE_TTL = timedelta(minutes=10)
+"""The maximum age of a cached entry. It bounds the memory used for devices that
+no longer connect to the process."""
+
+
+@dataclass(frozen=True, slots=True)
+class _CacheEntry:
+    config_hash: str
+    timeseries_index: DeviceTimeseriesIndex
+    cached_at: float
+
+
+class DeviceTimeseriesIndexCache:
+    """Caches the timeseries index of each device along with the hash of the device
+    config it was resolved for.
+
+    Each entry must be invalidated when the signals of the device change. Every
+    invalidation increments the generation of the device, which allows to detect
+    whether an index that was read from the database is already outdated when it
+    is about to be cached.
+
+    The cache is local to the process, invalidations of other processes, e.g. other
+    API workers, are not observed. Entries must therefore be validated against the
+    database before use, see `get_cached_device_timeseries_index()`."""
+
+    def __init__(self, ttl: timedelta = TIMESERIES_INDEX_CACHE_TTL):
+        """Initializes the cache.
+
+        :param ttl: The maximum age of a cached entry.
+        """
+
+        self.ttl = ttl
+
+        self._entries: dict[DeviceId, _CacheEntry] = {}
+        self._generations: dict[DeviceId, int] = {}
+
+    def get(
+        self, device_id: DeviceId, config_hash: str
+    ) -> DeviceTimeseriesIndex | None:
+        """Returns the cached timeseries index of the device.
+
+        :param device_id: The unique identifier of the device.
+        :param config_hash: The hash of the current device config.
+        :return: The timeseries index, if it was cached for the same config and
+            has not expired, None otherwise.
+        """
+
+        entry = self._entries.get(device_id)
+        if entry is None or entry.config_hash != config_hash:
+            return None
+
+        if monotonic() - entry.cached_at > self.ttl.total_seconds():
+            del self._entries[device_id]
+            return None
+
+        return entry.timeseries_index
+
+    def generation(self, device_id: DeviceId) -> int:
+        """Returns the number of invalidations of the device so far. Read it before
+        querying the database and pass it to `put()`.
+
+        :param device_id: The unique identifier of the device.
+        """
+
+        return self._generations.get(device_id, 0)
+
+    def put(
+        self,
+        device_id: DeviceId,
+        config_hash: str,
+        timeseries_index: DeviceTimeseriesIndex,
+        generation: int,
+    ):
+        """Caches the timeseries index of the device. The index is discarded, if the
+        device was invalidated since the generation was read.
+
+        :param device_id: The unique identifier of the device.
+        :param config_hash: The hash of the device config the index belongs to.
+        :param timeseries_index: The timeseries index of the device.
+        :param generation: The generation of the device before the index was read.
+        """
+
+        if generation != self.generation(device_id):
+            return
+
+        self._entries[device_id] = _CacheEntry(
+            config_hash=config_hash,
+            timeseries_index=timeseries_index,
+            cached_at=monotonic(),
+        )
+
+    def invalidate(self, device_id: DeviceId):
+        """Removes the cached timeseries index of the device.
+
+        :param device_id: The unique identifier of the device.
+        """
+
+        self._entries.pop(device_id, None)
+        self._generations[device_id] = self.generation(device_id) + 1
+
+
+TIMESERIES_INDEX_CACHE = DeviceTimeseriesIndexCache()
+"""The cache shared by all connections of the process."""
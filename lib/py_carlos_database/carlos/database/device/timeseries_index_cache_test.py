@@ -0,0 +1,56 @@
+from datetime import timedelta
+from uuid import uuid4
+
+from carlos.database.device.timeseries_index_cache import DeviceTimeseriesIndexCache
+
+
+def test_cache():
+    """Ensures that entries are only returned for the same config hash and are
+    removed on invalidation."""
+
+    cache = DeviceTimeseriesIndexCache()
+    device_id = uuid4()
+    index = {"driver": {"signal": 1}}
+
+    assert cache.get(device_id=device_id, config_hash="a") is None
+
+    cache.put(
+        device_id=device_id,
+        config_hash="a",
+        timeseries_index=index,
+        generation=cache.generation(device_id),
+    )
+    assert cache.get(device_id=device_id, config_hash="a") == index
+    assert cache.get(device_id=device_id, config_hash="b") is None
+    assert cache.get(device_id=uuid4(), config_hash="a") is None
+
+    cache.invalidate(device_id)
+    assert cache.get(device_id=device_id, config_hash="a") is None
+
+
+def test_cache_outdated_put():
+    """Ensures that an index that was read before an invalidation is not cached."""
+
+    cache = DeviceTimeseriesIndexCache()
+    device_id = uuid4()
+
+    generation = cache.generation(device_id)
+    cache.invalidate(device_id)
+    cache.put(
+        device_id=device_id,
+        config_hash="a",
+        timeseries_index={},
+        generation=generation,
+    )
+
+    assert cache.get(device_id=device_id, config_hash="a") is None
+
+
+def test_cache_ttl():
+    """Ensures that expired entries are not returned."""
+
+    cache = DeviceTimeseriesIndexCache(ttl=timedelta(seconds=-1))
+    device_id = uuid4()
+    cache.put(device_id=device_id, config_hash="a", timeseries_index={}, generation=0)
+
+    assert cache.get(device_id=device_id, config_hash="a") is None
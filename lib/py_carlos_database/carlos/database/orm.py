@@ -4,7 +4,11 @@ __all__ = [
     "CarlosDeviceOrm",
     "CarlosDeviceSignalOrm",
     "CarlosModelBase",
+    "TimeseriesDayRollupOrm",
+    "TimeseriesHourRollupOrm",
+    "TimeseriesMinuteRollupOrm",
     "TimeseriesOrm",
+    "TimeseriesRollupQueueOrm",
 ]
 
 import inspect
@@ -14,6 +18,7 @@ from typing import Optional
 from uuid import UUID
 
 from sqlalchemy import (
+    BIGINT,
     BOOLEAN,
     INTEGER,
     REAL,
@@ -23,6 +28,7 @@ from sqlalchemy import (
     VARCHAR,
     ForeignKey,
     ForeignKeyConstraint,
+    Identity,
     text,
 )
 from sqlalchemy.dialects.postgresql import UUID as SQLUUID
@@ -207,3 +213,105 @@ class TimeseriesOrm(CarlosModelBase):
         REAL(),
         comment="The value of the data point.",
     )
+
+
+class _TimeseriesRollupColumns:
+    """Defines the columns shared by all rollup tables of the timeseries data."""
+
+    timestamp_utc: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        primary_key=True,
+        comment="The start of the bucket in UTC.",
+    )
+    timeseries_id: Mapped[int] = mapped_column(
+        INTEGER(),
+        ForeignKey(
+            CarlosDeviceSignalOrm.timeseries_id,
+            ondelete="CASCADE",
+        ),
+        primary_key=True,
+        comment="The unique identifier series.",
+    )
+    min_value: Mapped[Optional[float]] = mapped_column(
+        REAL(),
+        comment="The smallest value within the bucket.",
+    )
+    max_value: Mapped[Optional[float]] = mapped_column(
+        REAL(),
+        comment="The largest value within the bucket.",
+    )
+    mean_value: Mapped[Optional[float]] = mapped_column(
+        REAL(),
+        comment="The arithmetic mean of the values within the bucket.",
+    )
+    sample_count: Mapped[int] = mapped_column(
+        INTEGER(),
+        nullable=False,
+        comment="The number of non null values within the bucket.",
+    )
+
+
+class TimeseriesMinuteRollupOrm(_TimeseriesRollupColumns, CarlosModelBase):
+    """Holds the timeseries data aggregated into buckets of one minute."""
+
+    __tablename__ = "timeseries_rollup_minute"
+    __table_args__ = {
+        "comment": _clean_doc(__doc__),
+        "schema": CarlosDatabaseSchema.CARLOS.value,
+    }
+
+
+class TimeseriesHourRollupOrm(_TimeseriesRollupColumns, CarlosModelBase):
+    """Holds the timeseries data aggregated into buckets of one hour."""
+
+    __tablename__ = "timeseries_rollup_hour"
+    __table_args__ = {
+        "comment": _clean_doc(__doc__),
+        "schema": CarlosDatabaseSchema.CARLOS.value,
+    }
+
+
+class TimeseriesDayRollupOrm(_TimeseriesRollupColumns, CarlosModelBase):
+    """Holds the timeseries data aggregated into buckets of one day."""
+
+    __tablename__ = "timeseries_rollup_day"
+    __table_args__ = {
+        "comment": _clean_doc(__doc__),
+        "schema": CarlosDatabaseSchema.CARLOS.value,
+    }
+
+
+class TimeseriesRollupQueueOrm(CarlosModelBase):
+    """Holds the ranges of timeseries data whose rollups need to be refreshed."""
+
+    __tablename__ = "timeseries_rollup_queue"
+    __table_args__ = {
+        "comment": _clean_doc(__doc__),
+        "schema": CarlosDatabaseSchema.CARLOS.value,
+    }
+
+    queue_id: Mapped[int] = mapped_column(
+        BIGINT(),
+        Identity(always=True),
+        primary_key=True,
+        comment="The unique identifier of the entry.",
+    )
+    timeseries_id: Mapped[int] = mapped_column(
+        INTEGER(),
+        ForeignKey(
+            CarlosDeviceSignalOrm.timeseries_id,
+            ondelete="CASCADE",
+        ),
+        nullable=False,
+        comment="The unique identifier series.",
+    )
+    modified_from: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        comment="The earliest timestamp of the modified data.",
+    )
+    modified_to: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        comment="The latest timestamp of the modified data.",
+    )
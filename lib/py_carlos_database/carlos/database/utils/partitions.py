@@ -4,13 +4,15 @@ __all__ = [
     "BucketPartition",
     "QuarterlyPartition",
     "MonthlyPartition",
+    "PartitionManager",
     "YearlyPartition",
     "create_partition",
 ]
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import UTC, date, datetime
+from typing import Iterable
 
 from sqlalchemy import text
 from sqlalchemy.exc import ProgrammingError
@@ -82,6 +84,12 @@ class QuarterlyPartition(_Partition):
 
         return f"'{date(year, month, 1).isoformat()}'"
 
+    @property
+    def start_at_utc(self) -> datetime:
+        """Returns the first timestamp that belongs to the partition."""
+
+        return datetime(self.year, (self.quarter - 1) * 3 + 1, 1, tzinfo=UTC)
+
     @classmethod
     def from_timestamp(
         cls, timestamp: datetime, table: type[DeclarativeBase]
@@ -91,6 +99,15 @@ class QuarterlyPartition(_Partition):
         quarter = (timestamp.month - 1) // 3 + 1
         return cls(year=timestamp.year, quarter=quarter, table=table)
 
+    def next_partition(self) -> "QuarterlyPartition":
+        """Returns the partition of the following quarter."""
+
+        if self.quarter == 4:
+            return QuarterlyPartition(year=self.year + 1, quarter=1, table=self.table)
+        return QuarterlyPartition(
+            year=self.year, quarter=self.quarter + 1, table=self.table
+        )
+
 
 @dataclass(slots=True, frozen=True)
 class BucketPartition(_Partition):
@@ -178,6 +195,12 @@ class YearlyPartition(_Partition):
 
         return f"'{date(self.year + 1, 1, 1).isoformat()}'"
 
+    @property
+    def start_at_utc(self) -> datetime:
+        """Returns the first timestamp that belongs to the partition."""
+
+        return datetime(self.year, 1, 1, tzinfo=UTC)
+
     @classmethod
     def from_timestamp(
         cls, timestamp: datetime, table: type[DeclarativeBase]
@@ -186,6 +209,11 @@ class YearlyPartition(_Partition):
 
         return cls(year=timestamp.year, table=table)
 
+    def next_partition(self) -> "YearlyPartition":
+        """Returns the partition of the following year."""
+
+        return YearlyPartition(year=self.year + 1, table=self.table)
+
 
 @dataclass(slots=True, frozen=True)
 class MonthlyPartition(_Partition):
@@ -218,6 +246,12 @@ class MonthlyPartition(_Partition):
 
         return f"'{date(year, month, 1).isoformat()}'"
 
+    @property
+    def start_at_utc(self) -> datetime:
+        """Returns the first timestamp that belongs to the partition."""
+
+        return datetime(self.year, self.month, 1, tzinfo=UTC)
+
     @classmethod
     def from_timestamp(
         cls, timestamp: datetime, table: type[DeclarativeBase]
@@ -226,25 +260,26 @@ class MonthlyPartition(_Partition):
 
         return cls(year=timestamp.year, month=timestamp.month, table=table)
 
+    def next_partition(self) -> "MonthlyPartition":
+        """Returns the partition of the following month."""
 
-Partition = YearlyPartition | QuarterlyPartition | MonthlyPartition | BucketPartition
+        if self.month == 12:
+            return MonthlyPartition(year=self.year + 1, month=1, table=self.table)
+        return MonthlyPartition(year=self.year, month=self.month + 1, table=self.table)
 
 
-async def create_partition(context: RequestContext, partition: Partition):
-    """Creates the timeseries partitions for the current year and the next year."""
+Partition = YearlyPartition | QuarterlyPartition | MonthlyPartition | BucketPartition
 
-    schema, table_name = partition.partition_table_name.split(".")
+TimePartition = YearlyPartition | QuarterlyPartition | MonthlyPartition
 
-    # may happen due to concurrency
-    if await does_table_exist(
-        context=context,
-        schema_name=schema,
-        table_name=table_name,
-    ):
-        return  # pragma: no cover
 
+async def create_partition(context: RequestContext, partition: Partition):
+    """Creates the given partition, if it does not exist yet."""
+
+    # The partition may already exist due to concurrency. Using IF NOT EXISTS
+    # saves us an additional roundtrip to check for the existence of the table.
     statement = text(
-        f"CREATE TABLE {partition.partition_table_name} "
+        f"CREATE TABLE IF NOT EXISTS {partition.partition_table_name} "
         f"PARTITION OF {partition.base_table_name} "
         f"FOR VALUES FROM ({partition.lower_bound}) "
         f"TO ({partition.upper_bound});"
@@ -260,15 +295,107 @@ async def create_partition(context: RequestContext, partition: Partition):
         raise
 
 
-async def does_table_exist(
-    context: RequestContext, schema_name: str, table_name: str
-) -> bool:
-    """Checks if a table exists."""
+async def get_existing_partitions(
+    context: RequestContext, table: type[DeclarativeBase]
+) -> set[str]:
+    """Returns the full qualified names of all existing partitions of the given
+    table."""
 
     statement = text(
-        "SELECT EXISTS ("
-        "SELECT FROM information_schema.tables "
-        f"WHERE table_schema = '{schema_name}' "
-        f"AND table_name = '{table_name}');"
+        "SELECT child_ns.nspname || '.' || child.relname "
+        "FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_namespace parent_ns ON parent.relnamespace = parent_ns.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "JOIN pg_namespace child_ns ON child.relnamespace = child_ns.oid "
+        "WHERE parent_ns.nspname = :schema_name "
+        "AND parent.relname = :table_name;"
+    )
+    result = await context.connection.execute(
+        statement,
+        {
+            "schema_name": table.__table__.schema or "public",
+            "table_name": table.__tablename__,
+        },
     )
-    return bool((await context.connection.execute(statement)).scalar())
+    return set(result.scalars().all())
+
+
+class PartitionManager:
+    """Keeps track of the existing partitions of a partitioned table in-process.
+
+    This allows to ensure the existence of the partitions required for an insert
+    without querying the database, as well as to create upcoming partitions ahead
+    of time. The manager assumes that partitions are never dropped while the
+    process is running. Use `forget()` if this is the case.
+    """
+
+    def __init__(
+        self, table: type[DeclarativeBase], partition_type: type[TimePartition]
+    ):
+        """Creates a new partition manager.
+
+        :param table: The partitioned table.
+        :param partition_type: The type of partitions the table is divided into.
+        """
+
+        self.table = table
+        self.partition_type = partition_type
+        self._known_partitions: set[str] = set()
+
+    @property
+    def known_partitions(self) -> frozenset[str]:
+        """Returns the full qualified names of the partitions known to exist."""
+
+        return frozenset(self._known_partitions)
+
+    async def hydrate(self, context: RequestContext):
+        """Loads all existing partitions of the table from the database."""
+
+        self._known_partitions = await get_existing_partitions(
+            context=context, table=self.table
+        )
+
+    def forget(self, partitions: Iterable[Partition]):
+        """Removes the given partitions from the known partitions. They will be
+        created again on the next call of `ensure_partitions()`."""
+
+        for partition in partitions:
+            self._known_partitions.discard(partition.partition_table_name)
+
+    def partition_for(self, timestamp: datetime) -> TimePartition:
+        """Returns the partition the given timestamp belongs to."""
+
+        return self.partition_type.from_timestamp(timestamp=timestamp, table=self.table)
+
+    async def ensure_partitions(
+        self, context: RequestContext, partitions: Iterable[Partition]
+    ):
+        """Creates all given partitions that are not known to exist yet.
+
+        ⚠️ Warning: Creating a partition commits the current transaction.
+        """
+
+        for partition in partitions:
+            if partition.partition_table_name in self._known_partitions:
+                continue
+
+            await create_partition(context=context, partition=partition)
+            self._known_partitions.add(partition.partition_table_name)
+
+    async def create_upcoming_partitions(
+        self, context: RequestContext, periods: int, now: datetime
+    ):
+        """Ensures that the partition of `now` and the given number of following
+        partitions exist.
+
+        :param context: The request context.
+        :param periods: The number of partitions to create after the current one.
+        :param now: The timestamp of the current partition.
+        """
+
+        partitions: list[TimePartition] = [self.partition_for(now)]
+        for _ in range(periods):
+            partitions.append(partitions[-1].next_partition())
+
+        await self.ensure_partitions(context=context, partitions=partitions)
@@ -2,12 +2,15 @@ from datetime import UTC, datetime
 
 import pytest
 
+from ..context import RequestContext
 from ..orm import TimeseriesOrm
 from .partitions import (
     BucketPartition,
     MonthlyPartition,
+    PartitionManager,
     QuarterlyPartition,
     YearlyPartition,
+    get_existing_partitions,
 )
 
 
@@ -24,6 +27,7 @@ class TestYearlyPartition:
         assert partition.partition_table_name == "carlos.timeseries_y2021"
         assert partition.lower_bound == "'2021-01-01'"
         assert partition.upper_bound == "'2022-01-01'"
+        assert partition.start_at_utc == datetime(2021, 1, 1, tzinfo=UTC)
 
     def test_hash(self):
         """Ensures that the hash is the same for 2 dates in the same quater."""
@@ -40,6 +44,15 @@ class TestYearlyPartition:
 
         assert hash(partition) == hash(second_partition)
 
+    def test_next_partition(self):
+        """Ensures that the following partition is calculated correctly."""
+
+        partition = YearlyPartition(year=2021, table=TimeseriesOrm)
+
+        assert partition.next_partition() == YearlyPartition(
+            year=2022, table=TimeseriesOrm
+        )
+
 
 class TestQuarterlyPartition:
     def test_properties(self):
@@ -54,6 +67,7 @@ class TestQuarterlyPartition:
         assert partition.partition_table_name == "carlos.timeseries_y2021q4"
         assert partition.lower_bound == "'2021-10-01'"
         assert partition.upper_bound == "'2022-01-01'"
+        assert partition.start_at_utc == datetime(2021, 10, 1, tzinfo=UTC)
 
     def test_hash(self):
         """Ensures that the hash is the same for 2 dates in the same quater."""
@@ -70,6 +84,24 @@ class TestQuarterlyPartition:
 
         assert hash(partition) == hash(second_partition)
 
+    @pytest.mark.parametrize(
+        "year, quarter, expected_year, expected_quarter",
+        [
+            pytest.param(2021, 2, 2021, 3, id="same year"),
+            pytest.param(2021, 4, 2022, 1, id="next year"),
+        ],
+    )
+    def test_next_partition(
+        self, year: int, quarter: int, expected_year: int, expected_quarter: int
+    ):
+        """Ensures that the following partition is calculated correctly."""
+
+        partition = QuarterlyPartition(year=year, quarter=quarter, table=TimeseriesOrm)
+
+        assert partition.next_partition() == QuarterlyPartition(
+            year=expected_year, quarter=expected_quarter, table=TimeseriesOrm
+        )
+
 
 class TestMonthlyPartition:
     def test_properties(self):
@@ -84,6 +116,7 @@ class TestMonthlyPartition:
         assert partition.partition_table_name == "carlos.timeseries_y2021m12"
         assert partition.lower_bound == "'2021-12-01'"
         assert partition.upper_bound == "'2022-01-01'"
+        assert partition.start_at_utc == datetime(2021, 12, 1, tzinfo=UTC)
 
     def test_hash(self):
         """Ensures that the hash is the same for 2 dates in the same quater."""
@@ -100,6 +133,24 @@ class TestMonthlyPartition:
 
         assert hash(partition) == hash(second_partition)
 
+    @pytest.mark.parametrize(
+        "year, month, expected_year, expected_month",
+        [
+            pytest.param(2021, 6, 2021, 7, id="same year"),
+            pytest.param(2021, 12, 2022, 1, id="next year"),
+        ],
+    )
+    def test_next_partition(
+        self, year: int, month: int, expected_year: int, expected_month: int
+    ):
+        """Ensures that the following partition is calculated correctly."""
+
+        partition = MonthlyPartition(year=year, month=month, table=TimeseriesOrm)
+
+        assert partition.next_partition() == MonthlyPartition(
+            year=expected_year, month=expected_month, table=TimeseriesOrm
+        )
+
 
 class TestBucketPartition:
     @pytest.mark.parametrize(
@@ -162,3 +213,43 @@ class TestBucketPartition:
                 table=TimeseriesOrm,
                 bucket_size=0,
             )
+
+
+async def test_partition_manager(async_carlos_db_context: RequestContext):
+    """Ensures that the partition manager creates and keeps track of partitions."""
+
+    manager = PartitionManager(table=TimeseriesOrm, partition_type=MonthlyPartition)
+    assert not manager.known_partitions, "A new manager should not know partitions."
+
+    await manager.create_upcoming_partitions(
+        context=async_carlos_db_context,
+        periods=2,
+        now=datetime(2018, 11, 15, tzinfo=UTC),
+    )
+
+    expected = {
+        "carlos.timeseries_y2018m11",
+        "carlos.timeseries_y2018m12",
+        "carlos.timeseries_y2019m1",
+    }
+    assert manager.known_partitions == expected
+
+    existing = await get_existing_partitions(
+        context=async_carlos_db_context, table=TimeseriesOrm
+    )
+    assert expected <= existing, "The partitions were not created."
+
+    # a second manager needs to know the partitions after hydration
+    second_manager = PartitionManager(
+        table=TimeseriesOrm, partition_type=MonthlyPartition
+    )
+    await second_manager.hydrate(context=async_carlos_db_context)
+    assert second_manager.known_partitions == existing
+
+    # ensuring existing partitions is a no-op, even if they are not known
+    second_manager.forget([MonthlyPartition(year=2018, month=11, table=TimeseriesOrm)])
+    await second_manager.ensure_partitions(
+        context=async_carlos_db_context,
+        partitions=[MonthlyPartition(year=2018, month=11, table=TimeseriesOrm)],
+    )
+    assert second_manager.known_partitions == existing
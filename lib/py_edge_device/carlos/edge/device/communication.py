@@ -12,49 +12,17 @@ from carlos.edge.interface import (
     EdgeVersionPayload,
     MessageType,
 )
-from carlos.edge.interface.messages import (
-    DeviceConfigResponsePayload,
-    DriverDataAckPayload,
-)
+from carlos.edge.interface.messages import DeviceConfigResponsePayload
 from loguru import logger
 from semver import Version
 
 from .constants import VERSION
+from .storage.blackbox import Blackbox
 from .storage.connection import get_async_storage_engine
 from .storage.exceptions import NotFoundError
-from .storage.timeseries_data import confirm_staged_data
 from .storage.timeseries_index import find_timeseries_index, update_timeseries_index
 from .update import update_device
-
-
-class ClientEdgeCommunicationHandler(EdgeCommunicationHandler):
-    """Handles and registers all handlers for the device communication."""
-
-    def __init__(self, protocol: EdgeProtocol, device_id: DeviceId):
-        """Initializes the communication handler. The default implementation contains
-        handlers for the ping and pong messages.
-
-        :param protocol: The protocol to use for communication.
-        """
-        super().__init__(protocol=protocol, device_id=device_id)
-
-        self.register_handlers(
-            {
-                MessageType.EDGE_VERSION: handle_edge_version,
-                MessageType.DEVICE_CONFIG_RESPONSE: handle_device_config_response,
-                MessageType.DRIVER_DATA_ACK: handle_driver_data_ack,
-            }
-        )
-
-    async def listen(self):  # pragma: no cover
-        """The client specific implementation of the listen method should always
-        try to reconnect if the connection is lost."""
-
-        while not self._stopped:
-            try:
-                await super().listen()
-            except EdgeConnectionDisconnected:
-                await self.protocol.connect()
+from .upload import DriverDataUploader
 
 
 async def handle_edge_version(
@@ -130,21 +98,52 @@ async def handle_device_config_response(
                     )
 
 
-async def handle_driver_data_ack(
-    protocol: EdgeProtocol, message: CarlosMessage
-):  # pragma: no cover
-    """Handles the incoming driver data ack message.
-
-    This message is sent by the server as an acknowledgment of the driver data
-    received.
+class ClientEdgeCommunicationHandler(EdgeCommunicationHandler):
+    """Handles and registers all handlers for the device communication."""
 
-    :param protocol: The protocol to use for communication.
-    :param message: The incoming message.
-    """
+    def __init__(
+        self,
+        protocol: EdgeProtocol,
+        device_id: DeviceId,
+        blackbox: Blackbox | None = None,
+    ):
+        """Initializes the communication handler. The default implementation contains
+        handlers for the ping and pong messages.
 
-    ackn_message = DriverDataAckPayload.model_validate(message.payload)
+        :param protocol: The protocol to use for communication.
+        :param blackbox: The blackbox holding the pending data, defaults to the
+            row based blackbox of the device storage.
+        """
+        super().__init__(protocol=protocol, device_id=device_id)
 
-    async with get_async_storage_engine().connect() as connection:
-        await confirm_staged_data(
-            connection=connection, staging_id=ackn_message.staging_id
+        self.uploader = DriverDataUploader(
+            protocol=protocol,
+            blackbox=blackbox or Blackbox(engine=get_async_storage_engine()),
         )
+
+    async def listen(self):  # pragma: no cover
+        """The client specific implementation of the listen method should always
+        try to reconnect if the connection is lost."""
+
+        while not self._stopped:
+            try:
+                await super().listen()
+            except EdgeConnectionDisconnected:
+                await self.protocol.connect()
+
+    async def handle_driver_data_ack(
+        self, protocol: EdgeProtocol, message: CarlosMessage
+    ):  # pragma: no cover
+        """Handles the incoming driver data ack message. See `DriverDataUploader`.
+
+        :param protocol: The protocol to use for communication.
+        :param message: The incoming message.
+        """
+
+        await self.uploader.handle_driver_data_ack(protocol=protocol, message=message)
+
+    message_handlers = {
+        MessageType.EDGE_VERSION: handle_edge_version,
+        MessageType.DEVICE_CONFIG_RESPONSE: handle_device_config_response,
+        MessageType.DRIVER_DATA_ACK: handle_driver_data_ack,
+    }
@@ -20,12 +20,17 @@ INPUT_SAMPLE_INTERVAL = 2.5 * 60  # 2.5 minutes
 
 class DriverManager:  # pragma: no cover
 
-    def __init__(self):
+    def __init__(self, blackbox: Blackbox | None = None):
+        """Loads the configured drivers.
+
+        :param blackbox: The blackbox the readings are recorded to, defaults to the
+            row based blackbox of the device storage.
+        """
 
         self.drivers = {driver.identifier: driver for driver in load_drivers()}
         validate_device_address_space(self.drivers.values())
 
-        self.blackbox = Blackbox(engine=get_async_storage_engine())
+        self.blackbox = blackbox or Blackbox(engine=get_async_storage_engine())
 
     @property
     def driver_metadata(self) -> list[DriverMetadata]:
@@ -67,8 +72,12 @@ class DriverManager:  # pragma: no cover
 
         logger.debug(f"Reading data from driver {driver_identifier}.")
 
+        driver = self.drivers[driver_identifier]
+        if not isinstance(driver, InputDriver):
+            raise TypeError(f"The driver {driver_identifier} is not an input.")
+
         read_start = datetime.now(tz=UTC)
-        data = await self.drivers[driver_identifier].read_async()
+        data = await driver.read_async()
         read_end = datetime.now(tz=UTC)
         # We assume that the actual read time is in the middle of the
         # start and end time.
@@ -20,38 +20,52 @@ from loguru import logger
 from .communication import ClientEdgeCommunicationHandler
 from .constants import LOCAL_DEVICE_STORAGE_PATH
 from .driver_manager import DriverManager
+from .storage.blackbox import BlackboxBackend, build_blackbox
 from .storage.connection import get_async_storage_engine
 from .storage.migration import alembic_upgrade
-from .storage.timeseries_data import stage_timeseries_data
 
 
 # We don't cover this in the unit tests. This needs to be tested in an integration test.
 class DeviceRuntime:  # pragma: no cover
 
-    def __init__(self, device_id: DeviceId, protocol: EdgeProtocol):
+    def __init__(
+        self,
+        device_id: DeviceId,
+        protocol: EdgeProtocol,
+        blackbox_backend: BlackboxBackend = BlackboxBackend.ROWS,
+    ):
         """Initializes the device runtime.
 
         :param device_id: The unique identifier of the device.
         :param protocol: The concrete implementation of the EdgeProtocol.
+        :param blackbox_backend: The storage backend of the blackbox. The readings
+            are recorded to and uploaded from the same blackbox.
         """
 
         self.device_id = device_id
 
+        blackbox = build_blackbox(
+            backend=blackbox_backend, engine=get_async_storage_engine()
+        )
+
         protocol.on_connect = self.on_connect
         self.communication_handler = ClientEdgeCommunicationHandler(
-            device_id=self.device_id, protocol=protocol
+            device_id=self.device_id, protocol=protocol, blackbox=blackbox
         )
 
-        self.driver_manager = DriverManager()
+        self.driver_manager = DriverManager(blackbox=blackbox)
 
         self.task_scheduler: AsyncScheduler | None = None
 
     async def on_connect(self, protocol: EdgeProtocol):
-        """This method is called when the protocol connects to the server. It sends the
-        device configuration to the server."""
+        """This method is called when the protocol connects to the server. It resets
+        the upload window and sends the device configuration to the server."""
 
         logger.info("Connected to server.")
 
+        # the batches sent with a previous connection are never acknowledged
+        await self.communication_handler.uploader.reset_window()
+
         await protocol.send(
             CarlosMessage(
                 message_type=MessageType.DEVICE_CONFIG,
@@ -80,6 +94,10 @@ class DeviceRuntime:  # pragma: no cover
         await self.task_scheduler.stop()
         logger.info("Task scheduler stopped.")
 
+        # closing the persistent connection checkpoints the write-ahead log
+        await get_async_storage_engine().dispose()
+        logger.info("Storage connection closed.")
+
     async def _handle_signal(self, signum: int):
         """Tries to gracefully stop the device runtime."""
 
@@ -146,25 +164,13 @@ class DeviceRuntime:  # pragma: no cover
             await self.task_scheduler.run_until_stopped()
 
     async def _send_pending_data(self):
-        """Sends the pending data to the server."""
+        """Sends the pending data to the server. See `DriverDataUploader`."""
 
         if not self.communication_handler.protocol.is_connected:
             logger.warning("Cannot send pending data, as the device is not connected.")
             return
 
-        async with get_async_storage_engine().connect() as connection:
-            staged_data = await stage_timeseries_data(connection=connection)
-
-            if staged_data is None:
-                logger.debug("No data available to be staged.")
-                return
-
-            await self.communication_handler.send(
-                CarlosMessage(
-                    message_type=MessageType.DRIVER_DATA,
-                    payload=staged_data,
-                )
-            )
+        await self.communication_handler.uploader.upload_pending_data()
 
 
 async def send_ping(
@@ -0,0 +1,60 @@
+"""add timeseries chunk table
+
+Revision ID: 5d2e8c71b04f
+Revises: aa6148de461a
+Create Date: 2026-10-17 14:27:05.804113
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d2e8c71b04f"
+down_revision = "aa6148de461a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The samples of a timeseries are packed into chunks. The timestamps are stored
+    # as offsets to the start of the chunk, see `carlos.edge.device.storage.
+    # timeseries_chunks`.
+    timeseries_chunk_ddl = """
+    CREATE TABLE timeseries_chunk (
+        chunk_id INTEGER PRIMARY KEY,
+        timeseries_id INTEGER NOT NULL,
+        start_utc INTEGER NOT NULL,
+        end_utc INTEGER NOT NULL,
+        sample_count INTEGER NOT NULL,
+        timestamp_offsets BLOB NOT NULL,
+        sample_values BLOB NOT NULL,
+        staging_id VARCHAR(6) NULL,
+        staged_at_utc INTEGER NULL,
+        FOREIGN KEY(timeseries_id) REFERENCES timeseries_index(timeseries_id)
+    );
+    """
+    op.execute(timeseries_chunk_ddl)
+
+    # Used to find the chunk a sample is appended to. Only pending chunks are
+    # appended to.
+    open_index_ddl = """
+    CREATE INDEX ix_timeseries_chunk_open
+    ON timeseries_chunk (timeseries_id, start_utc)
+    WHERE staging_id IS NULL;
+    """
+    op.execute(open_index_ddl)
+
+    # Used to find the chunks of a staging, to confirm them and to find expired
+    # stagings.
+    staging_index_ddl = """
+    CREATE INDEX ix_timeseries_chunk_staging_id
+    ON timeseries_chunk (staging_id)
+    WHERE staging_id IS NOT NULL;
+    """
+    op.execute(staging_index_ddl)
+
+
+def downgrade():
+    op.execute("DROP INDEX ix_timeseries_chunk_staging_id;")
+    op.execute("DROP INDEX ix_timeseries_chunk_open;")
+    op.execute("DROP TABLE timeseries_chunk;")
@@ -0,0 +1,40 @@
+"""index timeseries data
+
+Revision ID: aa6148de461a
+Revises: 476f88fe4d1b
+Create Date: 2026-10-17 09:12:41.519304
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "aa6148de461a"
+down_revision = "476f88fe4d1b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Used to find the newest pending samples. Only unstaged samples are included,
+    # which are the vast majority of the blackbox.
+    pending_index_ddl = """
+    CREATE INDEX ix_timeseries_data_pending
+    ON timeseries_data (timestamp_utc)
+    WHERE staging_id IS NULL;
+    """
+    op.execute(pending_index_ddl)
+
+    # Used to find the samples of a staging, to confirm them and to find expired
+    # stagings. Only the few samples that await their acknowledgement are included.
+    staging_index_ddl = """
+    CREATE INDEX ix_timeseries_data_staging_id
+    ON timeseries_data (staging_id)
+    WHERE staging_id IS NOT NULL;
+    """
+    op.execute(staging_index_ddl)
+
+
+def downgrade():
+    op.execute("DROP INDEX ix_timeseries_data_staging_id;")
+    op.execute("DROP INDEX ix_timeseries_data_pending;")
@@ -1,9 +1,29 @@
+__all__ = ["Blackbox", "BlackboxBackend", "ChunkedBlackbox", "build_blackbox"]
+
+from dataclasses import dataclass
 from datetime import datetime
+from enum import Enum
+from typing import Awaitable, Callable, ClassVar, Mapping
 
+from carlos.edge.interface.messages import DriverDataPayload
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
 
-from .timeseries_data import TimeseriesInput, add_timeseries_data
+from .timeseries_chunks import (
+    add_timeseries_chunk_data,
+    confirm_staged_chunks,
+    release_staged_chunks,
+    renew_chunk_staging_lease,
+    stage_timeseries_chunks,
+)
+from .timeseries_data import (
+    TimeseriesInput,
+    add_timeseries_data,
+    confirm_staged_data,
+    release_staged_data,
+    renew_staging_lease,
+    stage_timeseries_data,
+)
 from .timeseries_index import (
     TimeseriesIndexMutation,
     create_timeseries_index,
@@ -11,13 +31,61 @@ from .timeseries_index import (
 )
 
 
+class BlackboxBackend(str, Enum):
+    """The available storage backends of the blackbox."""
+
+    ROWS = "rows"
+    """Stores each sample as a row of the timeseries_data table. See `Blackbox`."""
+
+    CHUNKED = "chunked"
+    """Packs the samples of each timeseries into chunks. See `ChunkedBlackbox`."""
+
+
+@dataclass(frozen=True, slots=True)
+class _StagingTable:
+    """The functions to stage the pending data of one table."""
+
+    stage: Callable[..., Awaitable[DriverDataPayload | None]]
+    renew_lease: Callable[..., Awaitable[DriverDataPayload | None]]
+    release: Callable[..., Awaitable[None]]
+    confirm: Callable[..., Awaitable[None]]
+
+
+_TIMESERIES_DATA_STAGING = _StagingTable(
+    stage=stage_timeseries_data,
+    renew_lease=renew_staging_lease,
+    release=release_staged_data,
+    confirm=confirm_staged_data,
+)
+
+_TIMESERIES_CHUNK_STAGING = _StagingTable(
+    stage=stage_timeseries_chunks,
+    renew_lease=renew_chunk_staging_lease,
+    release=release_staged_chunks,
+    confirm=confirm_staged_chunks,
+)
+
+
 class Blackbox:
     """The black box is used to store measurement data locally on the device. This data
     is stored to be send to the server at a later time. This is useful in case the device
     is not able to send the data to the server immediately. The black box stores the data
     in a SQLite database. The data is stored in the timeseries_data table.
+
+    The pending data is sent to the server in stagings: The staged samples are
+    leased to the staging, until it is either confirmed or released.
+
+    The pending data of the other backend is staged as well, once the own table
+    has no pending data left. This way, no data is lost when the backend of a
+    device is switched.
     """
 
+    _staging_tables: ClassVar[tuple[_StagingTable, ...]] = (
+        _TIMESERIES_DATA_STAGING,
+        _TIMESERIES_CHUNK_STAGING,
+    )
+    """The tables the pending data is staged from, in the order of preference."""
+
     def __init__(self, engine: AsyncEngine):
         self._engine = engine
         self._timeseries_id_index: dict[str, dict[str, int]] = {}
@@ -26,7 +94,7 @@ class Blackbox:
         self,
         driver_identifier: str,
         read_timestamp: datetime,
-        data: dict[str, float],
+        data: Mapping[str, float],
     ) -> None:
         """Inserts the reading into the database."""
 
@@ -43,7 +111,7 @@ class Blackbox:
                 )
                 timeseries_id_to_value[timeseries_id] = value
 
-            await add_timeseries_data(
+            await self._add_timeseries_data(
                 connection=connection,
                 timeseries_input=TimeseriesInput(
                     timestamp_utc=read_timestamp, values=timeseries_id_to_value
@@ -52,6 +120,71 @@ class Blackbox:
 
             logger.debug(f"Recorded data from driver {driver_identifier}.")
 
+    async def _add_timeseries_data(
+        self, connection: AsyncConnection, timeseries_input: TimeseriesInput
+    ):
+        """Stores the reading in the timeseries_data table."""
+
+        await add_timeseries_data(
+            connection=connection, timeseries_input=timeseries_input
+        )
+
+    async def stage(self, max_values: int) -> DriverDataPayload | None:
+        """Stages the pending data. See `stage_timeseries_data()` and
+        `stage_timeseries_chunks()`.
+
+        :param max_values: The maximum number of samples to stage.
+        :return: The staged data, or None if there is no pending data.
+        """
+
+        async with self._engine.connect() as connection:
+            for table in self._staging_tables:
+                staged = await table.stage(connection=connection, max_values=max_values)
+                if staged is not None:
+                    return staged
+
+        return None
+
+    async def renew_staging_lease(self, staging_id: str) -> DriverDataPayload | None:
+        """Renews the lease of a staging. See `renew_staging_lease()` and
+        `renew_chunk_staging_lease()`.
+
+        :param staging_id: The staging_id to renew.
+        :return: The staged data, or None if the staging does not exist anymore.
+        """
+
+        async with self._engine.connect() as connection:
+            for table in self._staging_tables:
+                staged = await table.renew_lease(
+                    connection=connection, staging_id=staging_id
+                )
+                if staged is not None:
+                    return staged
+
+        return None
+
+    async def release_staging(self, staging_id: str) -> None:
+        """Releases the data of a staging. See `release_staged_data()` and
+        `release_staged_chunks()`.
+
+        :param staging_id: The staging_id to release.
+        """
+
+        async with self._engine.connect() as connection:
+            for table in self._staging_tables:
+                await table.release(connection=connection, staging_id=staging_id)
+
+    async def confirm_staging(self, staging_id: str) -> None:
+        """Deletes the data of a staging the server received. See
+        `confirm_staged_data()` and `confirm_staged_chunks()`.
+
+        :param staging_id: The staging_id to confirm.
+        """
+
+        async with self._engine.connect() as connection:
+            for table in self._staging_tables:
+                await table.confirm(connection=connection, staging_id=staging_id)
+
     async def _ensure_index_hydrated(
         self, connection: AsyncConnection, driver_identifier: str
     ):
@@ -96,3 +229,35 @@ class Blackbox:
             ] = created.timeseries_id
 
             return created.timeseries_id
+
+
+class ChunkedBlackbox(Blackbox):
+    """The chunked black box stores the measurement data in the timeseries_chunk
+    table instead. The samples of each timeseries are packed into chunks, which
+    reduces the size of the storage and the cost of each insert. The pending
+    chunks are staged before the pending rows.
+    """
+
+    _staging_tables = (_TIMESERIES_CHUNK_STAGING, _TIMESERIES_DATA_STAGING)
+
+    async def _add_timeseries_data(
+        self, connection: AsyncConnection, timeseries_input: TimeseriesInput
+    ):
+        """Appends the reading to the pending chunks of the timeseries."""
+
+        await add_timeseries_chunk_data(
+            connection=connection, timeseries_input=timeseries_input
+        )
+
+
+def build_blackbox(backend: BlackboxBackend, engine: AsyncEngine) -> Blackbox:
+    """Builds the blackbox of the given backend.
+
+    :param backend: The storage backend of the blackbox.
+    :param engine: The engine of the storage.
+    :return: The blackbox.
+    """
+
+    if backend == BlackboxBackend.CHUNKED:
+        return ChunkedBlackbox(engine=engine)
+    return Blackbox(engine=engine)
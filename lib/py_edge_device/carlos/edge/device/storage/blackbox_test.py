@@ -1,12 +1,13 @@
 from datetime import UTC, datetime
 from random import randint
 
+import pytest
 from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncEngine
 
-from .blackbox import Blackbox
-from .orm import TimeseriesDataOrm, TimeseriesIndexOrm
-from .timeseries_index import find_timeseries_index
+from .blackbox import Blackbox, BlackboxBackend, ChunkedBlackbox, build_blackbox
+from .orm import TimeseriesChunkOrm, TimeseriesDataOrm, TimeseriesIndexOrm
+from .timeseries_index import find_timeseries_index, update_timeseries_index
 
 
 async def test_blackbox(async_engine: AsyncEngine):
@@ -76,3 +77,91 @@ async def test_blackbox(async_engine: AsyncEngine):
         await connection.execute(delete(TimeseriesDataOrm))
         await connection.execute(delete(TimeseriesIndexOrm))
         await connection.commit()
+
+
+async def test_chunked_blackbox(async_engine: AsyncEngine):
+    """Ensures that the chunked blackbox appends the readings to one chunk per
+    signal."""
+
+    blackbox = ChunkedBlackbox(engine=async_engine)
+
+    sample_cnt = randint(3, 10)
+    for i in range(sample_cnt):
+        await blackbox.record(
+            driver_identifier="driver_identifier",
+            read_timestamp=datetime(2026, 10, 17, 12, i, tzinfo=UTC),
+            data={"driver_signal_int": i, "driver_signal_float": i / 2},
+        )
+
+    async with async_engine.connect() as connection:
+        chunks = (
+            await connection.execute(
+                select(
+                    TimeseriesChunkOrm.sample_count, TimeseriesDataOrm.sample_id
+                ).outerjoin(
+                    TimeseriesDataOrm,
+                    TimeseriesDataOrm.timeseries_id == TimeseriesChunkOrm.timeseries_id,
+                )
+            )
+        ).all()
+        assert chunks == [(sample_cnt, None), (sample_cnt, None)]
+
+        await connection.execute(delete(TimeseriesChunkOrm))
+        await connection.execute(delete(TimeseriesIndexOrm))
+        await connection.commit()
+
+
+@pytest.mark.parametrize(
+    "previous_backend, backend",
+    [
+        pytest.param(BlackboxBackend.ROWS, BlackboxBackend.CHUNKED, id="to chunked"),
+        pytest.param(BlackboxBackend.CHUNKED, BlackboxBackend.ROWS, id="to rows"),
+    ],
+)
+async def test_switch_blackbox_backend(
+    async_engine: AsyncEngine,
+    previous_backend: BlackboxBackend,
+    backend: BlackboxBackend,
+):
+    """Ensures that the data recorded with the previous backend is still staged
+    after switching the backend of the blackbox."""
+
+    driver_identifier = "driver_identifier"
+    recorded = []
+    for i, blackbox_backend in enumerate([previous_backend] * 3 + [backend] * 3):
+        read_timestamp = datetime(2026, 10, 17, 12, i, tzinfo=UTC)
+        await build_blackbox(backend=blackbox_backend, engine=async_engine).record(
+            driver_identifier=driver_identifier,
+            read_timestamp=read_timestamp,
+            data={"driver_signal": float(i)},
+        )
+        recorded.append(int(read_timestamp.timestamp()))
+
+    async with async_engine.connect() as connection:
+        (index_entry,) = await find_timeseries_index(
+            connection, driver_identifier=driver_identifier
+        )
+        await update_timeseries_index(
+            connection=connection,
+            timeseries_id=index_entry.timeseries_id,
+            server_timeseries_id=1,
+        )
+
+    blackbox = build_blackbox(backend=backend, engine=async_engine)
+    staged = []
+    while (payload := await blackbox.stage(max_values=2)) is not None:
+        assert payload.staging_id is not None
+        staged.extend(payload.data[1].timestamps_utc)
+        await blackbox.confirm_staging(staging_id=payload.staging_id)
+
+    assert sorted(staged) == recorded
+
+    async with async_engine.connect() as connection:
+        for orm in (TimeseriesDataOrm, TimeseriesChunkOrm):
+            remaining = (
+                await connection.execute(select(func.count()).select_from(orm))
+            ).scalar()
+            assert remaining == 0, f"Pending data left in {orm.__tablename__}."
+
+        await connection.execute(delete(TimeseriesIndexOrm))
+        await connection.commit()
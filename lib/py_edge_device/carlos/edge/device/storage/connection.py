@@ -1,13 +1,33 @@
 from functools import cache
 from pathlib import Path
 
-from sqlalchemy import Engine, NullPool, create_engine
+from sqlalchemy import Engine, NullPool, create_engine, event
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from carlos.edge.device.constants import LOCAL_DEVICE_STORAGE_PATH
 
 STORAGE_PATH = LOCAL_DEVICE_STORAGE_PATH / "storage.db"
 
+SQLITE_PRAGMAS: dict[str, str | int] = {
+    # Writers append to the write-ahead log instead of rewriting the database
+    # pages, readers are not blocked by the writer.
+    "journal_mode": "WAL",
+    # In WAL mode the log is only synced on checkpoints. A power loss may roll
+    # back the latest transactions, but never corrupts the database.
+    "synchronous": "NORMAL",
+    # negative values are KiB, so 8 MiB of page cache
+    "cache_size": -8192,
+    # wait for a concurrent writer instead of failing immediately
+    "busy_timeout": 5000,
+}
+"""The pragmas applied to every connection of the storage. They reduce the number
+of writes to the SD card and the latency of each transaction."""
+
+PERSISTENT_POOL_TIMEOUT = 60.0
+"""The time in seconds to wait for the connection of the persistent storage
+engine, before an error is raised."""
+
 
 def build_storage_url(path: Path = STORAGE_PATH, is_async: bool = False) -> str:
     """Build the storage URL for the device."""
@@ -20,14 +40,54 @@ def build_storage_url(path: Path = STORAGE_PATH, is_async: bool = False) -> str:
 @cache
 def get_storage_engine(url: str | None = None) -> Engine:
     """Get the storage engine for the device."""
-    return create_engine(
+    engine = create_engine(
         url or build_storage_url(), pool_pre_ping=True, poolclass=NullPool
     )
+    _apply_sqlite_pragmas(engine)
+    return engine
 
 
 @cache
-def get_async_storage_engine(url: str | None = None) -> AsyncEngine:
-    """Get the async storage engine for the device."""
-    return create_async_engine(
-        url or build_storage_url(is_async=True), pool_pre_ping=True, poolclass=NullPool
-    )
+def get_async_storage_engine(
+    url: str | None = None, persistent: bool = True
+) -> AsyncEngine:
+    """Get the async storage engine for the device.
+
+    :param url: Optional URL of the storage, defaults to the device storage.
+    :param persistent: If True, the engine keeps a single connection open for its
+        whole lifetime. Callers wait for the connection until the previous one
+        returned it, hence all transactions, and thus the writes, are
+        serialized. Otherwise, a new connection is opened for each use.
+    :return: The engine.
+    """
+
+    if persistent:
+        engine = create_async_engine(
+            url or build_storage_url(is_async=True),
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=PERSISTENT_POOL_TIMEOUT,
+        )
+    else:
+        engine = create_async_engine(
+            url or build_storage_url(is_async=True),
+            pool_pre_ping=True,
+            poolclass=NullPool,
+        )
+
+    _apply_sqlite_pragmas(engine.sync_engine)
+    return engine
+
+
+def _apply_sqlite_pragmas(engine: Engine):
+    """Applies the `SQLITE_PRAGMAS` to each new connection of the engine."""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
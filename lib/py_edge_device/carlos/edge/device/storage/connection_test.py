@@ -24,3 +24,24 @@ async def test_get_async_storage_engine():
     async with engine.connect() as connection:
         result = await connection.execute(text("SELECT 1"))
         assert result.scalar() == 1
+
+
+async def test_persistent_async_storage_engine():
+    """Ensures that the persistent engine reuses a single connection, which is
+    configured with the storage pragmas."""
+
+    engine = get_async_storage_engine(
+        build_storage_url(TEST_STORAGE_PATH, is_async=True)
+    )
+
+    async with engine.connect() as connection:
+        journal_mode = await connection.scalar(text("PRAGMA journal_mode"))
+        synchronous = await connection.scalar(text("PRAGMA synchronous"))
+        first = (await connection.get_raw_connection()).driver_connection
+
+    async with engine.connect() as connection:
+        second = (await connection.get_raw_connection()).driver_connection
+
+    assert journal_mode == "wal"
+    assert synchronous == 1, "Expected synchronous=NORMAL."
+    assert first is second, "The connection should be reused."
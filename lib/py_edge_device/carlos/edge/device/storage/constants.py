@@ -1,7 +1,19 @@
-SQLITE_MAX_VARIABLE_NUMBER = 999
-"""The maximum number of variables that can be used in a single query.
-This is a limitation imposed by SQLite."""
-
+from datetime import timedelta
 
 DEFAULT_STAGING_SAMPLE_SIZE = 250
 """The default number of samples to stage with a single staging request."""
+
+
+STAGING_LEASE_DURATION = timedelta(minutes=30)
+"""Staged samples are leased to the staging for this duration. If the staging is
+neither confirmed nor renewed in time, e.g. because the device restarted, the
+samples are staged again."""
+
+
+CHUNK_DURATION = timedelta(hours=1)
+"""The time span covered by a single chunk of the chunked blackbox. The timestamps
+of a chunk are stored as offsets to its start."""
+
+MAX_CHUNK_SAMPLE_SIZE = 256
+"""The maximum number of samples per chunk of the chunked blackbox. Appending a
+sample rewrites the chunk, hence its size is kept close to a database page."""
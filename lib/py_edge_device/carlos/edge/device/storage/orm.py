@@ -1,13 +1,14 @@
 __all__ = [
     "ApiTokenOrm",
     "CarlosDeviceModelBase",
+    "TimeseriesChunkOrm",
     "TimeseriesDataOrm",
     "TimeseriesIndexOrm",
 ]
 
 from datetime import datetime
 
-from sqlalchemy import DATETIME, FLOAT, INTEGER, VARCHAR
+from sqlalchemy import BLOB, DATETIME, FLOAT, INTEGER, VARCHAR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -62,3 +63,30 @@ class TimeseriesDataOrm(CarlosDeviceModelBase):
     staged_at_utc: Mapped[int | None] = mapped_column(
         "staged_at_utc", INTEGER, nullable=True
     )
+
+
+class TimeseriesChunkOrm(CarlosDeviceModelBase):
+    __tablename__ = "timeseries_chunk"
+
+    chunk_id: Mapped[int] = mapped_column("chunk_id", INTEGER, primary_key=True)
+
+    timeseries_id: Mapped[int] = mapped_column("timeseries_id", INTEGER, nullable=False)
+
+    start_utc: Mapped[int] = mapped_column("start_utc", INTEGER, nullable=False)
+
+    end_utc: Mapped[int] = mapped_column("end_utc", INTEGER, nullable=False)
+
+    sample_count: Mapped[int] = mapped_column("sample_count", INTEGER, nullable=False)
+
+    timestamp_offsets: Mapped[bytes] = mapped_column(
+        "timestamp_offsets", BLOB, nullable=False
+    )
+
+    sample_values: Mapped[bytes] = mapped_column("sample_values", BLOB, nullable=False)
+
+    staging_id: Mapped[str | None] = mapped_column(
+        "staging_id", VARCHAR(6), nullable=True
+    )
+    staged_at_utc: Mapped[int | None] = mapped_column(
+        "staged_at_utc", INTEGER, nullable=True
+    )
@@ -0,0 +1,372 @@
+"""This module stores the timeseries data in chunks instead of one row per sample.
+
+Each chunk holds the samples of a single timeseries within `CHUNK_DURATION`. The
+timestamps are packed as offsets to the start of the chunk and the values as
+doubles, both in little endian byte order. Compared to the timeseries_data table,
+this saves the sample id, the timeseries id and the index entries of each sample.
+
+The functions mirror the ones of `timeseries_data`. The samples are staged,
+renewed, released and confirmed per chunk."""
+
+__all__ = [
+    "add_timeseries_chunk_data",
+    "confirm_staged_chunks",
+    "release_staged_chunks",
+    "renew_chunk_staging_lease",
+    "stage_timeseries_chunks",
+]
+
+import struct
+from datetime import datetime, timedelta
+
+from carlos.edge.interface.messages import (
+    DriverDataPayload,
+    DriverTimeseries,
+    generate_staging_id,
+)
+from sqlalchemy import (
+    BLOB,
+    INTEGER,
+    ColumnElement,
+    Update,
+    and_,
+    bindparam,
+    cast,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.orm import aliased
+
+from carlos.edge.device.storage.orm import TimeseriesChunkOrm, TimeseriesIndexOrm
+
+from .constants import (
+    CHUNK_DURATION,
+    DEFAULT_STAGING_SAMPLE_SIZE,
+    MAX_CHUNK_SAMPLE_SIZE,
+    STAGING_LEASE_DURATION,
+)
+from .timeseries_data import TimeseriesInput
+
+_OFFSET_FORMAT = "<I"
+"""The format of a timestamp offset to the start of the chunk in seconds."""
+
+_VALUE_FORMAT = "<d"
+"""The format of a sample value."""
+
+
+def _open_chunk_condition(chunk: type[TimeseriesChunkOrm]) -> ColumnElement[bool]:
+    """The condition of the pending chunk the sample of the bound timeseries and
+    timestamp is appended to.
+
+    :param chunk: The chunk table or an alias of it.
+    """
+
+    return and_(
+        chunk.timeseries_id == bindparam("sample_timeseries_id"),
+        chunk.start_utc == bindparam("chunk_start_utc"),
+        chunk.staging_id.is_(None),
+        chunk.sample_count < bindparam("max_chunk_samples"),
+    )
+
+
+_open_chunk = aliased(TimeseriesChunkOrm, name="open_chunk")
+
+_CREATE_CHUNK_STMT = insert(TimeseriesChunkOrm).from_select(
+    [
+        TimeseriesChunkOrm.timeseries_id,
+        TimeseriesChunkOrm.start_utc,
+        TimeseriesChunkOrm.end_utc,
+        TimeseriesChunkOrm.sample_count,
+        TimeseriesChunkOrm.timestamp_offsets,
+        TimeseriesChunkOrm.sample_values,
+    ],
+    select(
+        bindparam("sample_timeseries_id", type_=INTEGER),
+        bindparam("chunk_start_utc", type_=INTEGER),
+        bindparam("sample_timestamp_utc", type_=INTEGER),
+        literal(0),
+        literal(b"", type_=BLOB),
+        literal(b"", type_=BLOB),
+    ).where(~exists().where(_open_chunk_condition(_open_chunk))),
+)
+"""Creates an empty chunk for the bound timeseries, unless there is a pending chunk
+with room for another sample."""
+
+_APPEND_SAMPLE_STMT = (
+    update(TimeseriesChunkOrm)
+    .where(
+        TimeseriesChunkOrm.chunk_id
+        == (
+            select(_open_chunk.chunk_id)
+            .where(_open_chunk_condition(_open_chunk))
+            .order_by(_open_chunk.chunk_id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+    )
+    .values(
+        end_utc=func.max(
+            TimeseriesChunkOrm.end_utc, bindparam("sample_timestamp_utc", type_=INTEGER)
+        ),
+        sample_count=TimeseriesChunkOrm.sample_count + 1,
+        # The concatenation of two BLOBs is TEXT in SQLite, hence the cast.
+        timestamp_offsets=cast(
+            TimeseriesChunkOrm.timestamp_offsets.op("||")(
+                bindparam("timestamp_offset", type_=BLOB)
+            ),
+            BLOB,
+        ),
+        sample_values=cast(
+            TimeseriesChunkOrm.sample_values.op("||")(
+                bindparam("sample_value", type_=BLOB)
+            ),
+            BLOB,
+        ),
+    )
+)
+"""Appends the bound sample to the newest pending chunk of its timeseries."""
+
+
+async def add_timeseries_chunk_data(
+    connection: AsyncConnection,
+    timeseries_input: TimeseriesInput,
+    chunk_duration: timedelta = CHUNK_DURATION,
+    max_chunk_samples: int = MAX_CHUNK_SAMPLE_SIZE,
+) -> None:
+    """Appends the timeseries data to the pending chunk of each timeseries. A new
+    chunk is created, if there is no pending chunk for the timestamp or it is full.
+
+    :param connection: The connection to the database.
+    :param timeseries_input: The data to be inserted.
+    :param chunk_duration: The time span covered by a single chunk.
+    :param max_chunk_samples: The maximum number of samples per chunk.
+    """
+
+    timestamp_utc = int(timeseries_input.timestamp_utc.timestamp())
+    start_utc = timestamp_utc - timestamp_utc % int(chunk_duration.total_seconds())
+    timestamp_offset = struct.pack(_OFFSET_FORMAT, timestamp_utc - start_utc)
+
+    samples = [
+        {
+            "sample_timeseries_id": timeseries_id,
+            "chunk_start_utc": start_utc,
+            "sample_timestamp_utc": timestamp_utc,
+            "max_chunk_samples": max_chunk_samples,
+            "timestamp_offset": timestamp_offset,
+            "sample_value": struct.pack(_VALUE_FORMAT, float(value)),
+        }
+        for timeseries_id, value in timeseries_input.values.items()
+    ]
+
+    # Both statements are executed once for all samples of the input. Creating the
+    # missing chunks first ensures that each sample is appended to a chunk.
+    await connection.execute(_CREATE_CHUNK_STMT, samples)
+    await connection.execute(_APPEND_SAMPLE_STMT, samples)
+    await connection.commit()
+
+
+async def stage_timeseries_chunks(
+    connection: AsyncConnection,
+    max_values: int = DEFAULT_STAGING_SAMPLE_SIZE,
+    lease_duration: timedelta = STAGING_LEASE_DURATION,
+) -> DriverDataPayload | None:
+    """Stages the newest pending chunks, see `stage_timeseries_data()`.
+
+    Chunks are staged as a whole. The newest chunk is always staged, even if it
+    holds more than `max_values` samples. Further chunks are only staged as long as
+    the total number of samples does not exceed `max_values`.
+
+    :param connection: The connection to the database.
+    :param max_values: The maximum number of samples to stage.
+    :param lease_duration: The duration after which the staged chunks are considered
+        pending again, unless the staging is confirmed or renewed.
+    :return: The staged data, or None if no data is pending.
+    """
+
+    staging_id = generate_staging_id()
+
+    staged_at_utc = int(datetime.utcnow().timestamp())
+    expired_before = staged_at_utc - int(lease_duration.total_seconds())
+
+    newest_first = (
+        TimeseriesChunkOrm.end_utc.desc(),
+        TimeseriesChunkOrm.chunk_id.desc(),
+    )
+    candidates = (
+        select(
+            TimeseriesChunkOrm.chunk_id,
+            func.row_number().over(order_by=newest_first).label("position"),
+            func.sum(TimeseriesChunkOrm.sample_count)
+            .over(order_by=newest_first)
+            .label("total_samples"),
+        )
+        .join(
+            TimeseriesIndexOrm,
+            TimeseriesIndexOrm.timeseries_id == TimeseriesChunkOrm.timeseries_id,
+        )
+        .where(
+            or_(
+                TimeseriesChunkOrm.staging_id.is_(None),
+                TimeseriesChunkOrm.staged_at_utc < expired_before,
+            ),
+            TimeseriesIndexOrm.server_timeseries_id.isnot(None),
+        )
+        # each chunk holds at least one sample
+        .order_by(*newest_first)
+        .limit(max_values)
+        .subquery()
+    )
+    chunk_ids_query = select(candidates.c.chunk_id).where(
+        or_(candidates.c.position == 1, candidates.c.total_samples <= max_values)
+    )
+
+    stage_stmt = (
+        update(TimeseriesChunkOrm)
+        .values({"staging_id": staging_id, "staged_at_utc": staged_at_utc})
+        .where(TimeseriesChunkOrm.chunk_id.in_(chunk_ids_query))
+    )
+
+    return await _execute_chunk_staging(
+        connection=connection, staging_stmt=stage_stmt, staging_id=staging_id
+    )
+
+
+async def renew_chunk_staging_lease(
+    connection: AsyncConnection, staging_id: str
+) -> DriverDataPayload | None:
+    """Renews the lease of the staged chunks, see `renew_staging_lease()`.
+
+    :param connection: The connection to the database.
+    :param staging_id: The staging_id to renew.
+    :return: The staged data, or None if the staging has no chunks anymore.
+    """
+
+    renew_stmt = (
+        update(TimeseriesChunkOrm)
+        .values({"staged_at_utc": int(datetime.utcnow().timestamp())})
+        .where(TimeseriesChunkOrm.staging_id == staging_id)
+    )
+
+    return await _execute_chunk_staging(
+        connection=connection, staging_stmt=renew_stmt, staging_id=staging_id
+    )
+
+
+async def release_staged_chunks(connection: AsyncConnection, staging_id: str) -> None:
+    """Releases the staged chunks, so that they are staged again with the next
+    staging.
+
+    :param connection: The connection to the database.
+    :param staging_id: The staging_id to release.
+    """
+
+    stmt = (
+        update(TimeseriesChunkOrm)
+        .values({"staging_id": None, "staged_at_utc": None})
+        .where(TimeseriesChunkOrm.staging_id == staging_id)
+    )
+
+    await connection.execute(stmt)
+    await connection.commit()
+
+
+async def confirm_staged_chunks(connection: AsyncConnection, staging_id: str) -> None:
+    """Deletes the chunks of a staging that has been received by the server.
+
+    :param connection: The connection to the database.
+    :param staging_id: The staging_id to confirm.
+    """
+
+    stmt = delete(TimeseriesChunkOrm).where(TimeseriesChunkOrm.staging_id == staging_id)
+
+    await connection.execute(stmt)
+    await connection.commit()
+
+
+async def _execute_chunk_staging(
+    connection: AsyncConnection, staging_stmt: Update, staging_id: str
+) -> DriverDataPayload | None:
+    """Executes the statement that assigns the chunks to the staging and builds the
+    payload from the samples of the updated chunks.
+
+    :param connection: The connection to the database.
+    :param staging_stmt: The UPDATE statement that stages the chunks.
+    :param staging_id: The staging_id the chunks are staged with.
+    :return: The staged data, or None if no chunks were staged.
+    """
+
+    # RETURNING can't refer to joined tables, see `_execute_staging()`.
+    staged_index = aliased(TimeseriesIndexOrm, name="staged_index")
+    server_timeseries_id_column = (
+        select(staged_index.server_timeseries_id)
+        .where(
+            staged_index.timeseries_id
+            == literal_column(f"{TimeseriesChunkOrm.__tablename__}.timeseries_id")
+        )
+        .scalar_subquery()
+    )
+
+    staged_chunks = (
+        await connection.execute(
+            staging_stmt.returning(
+                TimeseriesChunkOrm.start_utc,
+                TimeseriesChunkOrm.timestamp_offsets,
+                TimeseriesChunkOrm.sample_values,
+                server_timeseries_id_column.label("server_timeseries_id"),
+            )
+        )
+    ).all()
+    await connection.commit()
+
+    if not staged_chunks:
+        return None
+
+    samples: dict[int, list[tuple[int, float]]] = {}
+    for chunk in staged_chunks:
+        samples.setdefault(chunk.server_timeseries_id, []).extend(
+            _unpack_chunk(
+                start_utc=chunk.start_utc,
+                timestamp_offsets=chunk.timestamp_offsets,
+                sample_values=chunk.sample_values,
+            )
+        )
+
+    data: dict[int, DriverTimeseries] = {}
+    for server_timeseries_id, timeseries_samples in samples.items():
+        # sorted timestamps are compressed much better, see DriverDataPayload.compress
+        timeseries_samples.sort(key=lambda sample: sample[0])
+        data[server_timeseries_id] = DriverTimeseries(
+            timestamps_utc=[timestamp for timestamp, _ in timeseries_samples],
+            values=[value for _, value in timeseries_samples],
+        )
+
+    return DriverDataPayload(staging_id=staging_id, data=data)
+
+
+def _unpack_chunk(
+    start_utc: int, timestamp_offsets: bytes, sample_values: bytes
+) -> list[tuple[int, float]]:
+    """Unpacks the samples of a chunk.
+
+    :param start_utc: The start of the chunk.
+    :param timestamp_offsets: The packed timestamp offsets.
+    :param sample_values: The packed values.
+    :return: The timestamps and values of the samples.
+    """
+
+    return [
+        (start_utc + offset, value)
+        for (offset,), (value,) in zip(
+            struct.iter_unpack(_OFFSET_FORMAT, timestamp_offsets),
+            struct.iter_unpack(_VALUE_FORMAT, sample_values),
+            strict=True,
+        )
+    ]
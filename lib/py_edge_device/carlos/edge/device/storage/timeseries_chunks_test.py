@@ -0,0 +1,212 @@
+from datetime import UTC, datetime, timedelta
+from typing import AsyncGenerator
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from carlos.edge.device.storage.orm import TimeseriesChunkOrm
+from carlos.edge.device.storage.timeseries_chunks import (
+    add_timeseries_chunk_data,
+    confirm_staged_chunks,
+    release_staged_chunks,
+    renew_chunk_staging_lease,
+    stage_timeseries_chunks,
+)
+from carlos.edge.device.storage.timeseries_data import TimeseriesInput
+from carlos.edge.device.storage.timeseries_index import (
+    TimeseriesIndex,
+    TimeseriesIndexMutation,
+    create_timeseries_index,
+    delete_timeseries_index,
+    update_timeseries_index,
+)
+
+CHUNK_START = datetime(2026, 10, 17, 12, tzinfo=UTC)
+
+
+@pytest.fixture()
+async def timeseries_pair(
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+) -> AsyncGenerator[tuple[int, int], None]:
+    """Provides two timeseries known to the server with the server ids 11 and 22."""
+
+    await update_timeseries_index(
+        connection=async_connection,
+        timeseries_id=temporary_timeseries_index.timeseries_id,
+        server_timeseries_id=11,
+    )
+    other_index = await create_timeseries_index(
+        connection=async_connection,
+        timeseries_index=TimeseriesIndexMutation(
+            driver_identifier="test_driver",
+            driver_signal="other_signal",
+            server_timeseries_id=22,
+        ),
+    )
+    await async_connection.execute(delete(TimeseriesChunkOrm))
+    await async_connection.commit()
+
+    yield temporary_timeseries_index.timeseries_id, other_index.timeseries_id
+
+    await async_connection.execute(delete(TimeseriesChunkOrm))
+    await async_connection.commit()
+    await delete_timeseries_index(
+        connection=async_connection, timeseries_id=other_index.timeseries_id
+    )
+
+
+async def _record(
+    connection: AsyncConnection,
+    timeseries_ids: tuple[int, int],
+    sample_cnt: int,
+    start: datetime = CHUNK_START,
+):
+    """Records one sample per second of both timeseries. The second timeseries
+    holds the negated values of the first one."""
+
+    first, second = timeseries_ids
+    for i in range(sample_cnt):
+        await add_timeseries_chunk_data(
+            connection=connection,
+            timeseries_input=TimeseriesInput(
+                timestamp_utc=start + timedelta(seconds=i),
+                values={first: i, second: -i},
+            ),
+        )
+
+
+async def _chunk_sizes(connection: AsyncConnection) -> list[int]:
+    """Returns the number of samples of each chunk."""
+
+    return list(
+        (
+            await connection.execute(
+                select(TimeseriesChunkOrm.sample_count).order_by(
+                    TimeseriesChunkOrm.chunk_id
+                )
+            )
+        )
+        .scalars()
+        .all()
+    )
+
+
+async def test_add_timeseries_chunk_data(
+    async_connection: AsyncConnection, timeseries_pair: tuple[int, int]
+):
+    """Ensures that the samples are appended to the chunk of their timeseries, until
+    the chunk is full or the sample belongs to the next chunk."""
+
+    await _record(async_connection, timeseries_pair, sample_cnt=300)
+    assert await _chunk_sizes(async_connection) == [256, 256, 44, 44]
+
+    # the next hour starts a new chunk
+    await _record(
+        async_connection,
+        timeseries_pair,
+        sample_cnt=1,
+        start=CHUNK_START + timedelta(hours=1),
+    )
+    assert await _chunk_sizes(async_connection) == [256, 256, 44, 44, 1, 1]
+
+    staged = await stage_timeseries_chunks(connection=async_connection, max_values=2)
+    assert staged is not None
+    assert staged.data[11].timestamps_utc == [
+        int((CHUNK_START + timedelta(hours=1)).timestamp())
+    ]
+
+    # staged chunks are closed, the next sample of the hour starts a new chunk
+    await _record(
+        async_connection,
+        timeseries_pair,
+        sample_cnt=1,
+        start=CHUNK_START + timedelta(hours=1, seconds=1),
+    )
+    assert await _chunk_sizes(async_connection) == [256, 256, 44, 44, 1, 1, 1, 1]
+
+
+async def test_chunk_staging(
+    async_connection: AsyncConnection, timeseries_pair: tuple[int, int]
+):
+    """Ensures that the chunks are staged newest first and as a whole, and that
+    each sample is mapped to the server id of its timeseries."""
+
+    sample_cnt = 600
+    await _record(async_connection, timeseries_pair, sample_cnt=sample_cnt)
+    start = int(CHUNK_START.timestamp())
+
+    # the newest chunk of each timeseries holds 88 samples
+    staged = await stage_timeseries_chunks(connection=async_connection, max_values=200)
+    assert staged is not None
+    assert set(staged.data) == {11, 22}
+    assert staged.data[11].timestamps_utc == list(
+        range(start + sample_cnt - 88, start + sample_cnt)
+    )
+    assert staged.data[11].values == [float(i) for i in range(sample_cnt - 88, 600)]
+    assert staged.data[22].values == [-float(i) for i in range(sample_cnt - 88, 600)]
+
+    # the newest chunk is staged, even if it exceeds the maximum
+    oversized = await stage_timeseries_chunks(connection=async_connection, max_values=1)
+    assert oversized is not None
+    assert sum(len(ts.values) for ts in oversized.data.values()) == 256
+
+    # a released staging is staged again, a renewed one is not
+    await release_staged_chunks(
+        connection=async_connection, staging_id=staged.staging_id
+    )
+    renewed = await renew_chunk_staging_lease(
+        connection=async_connection, staging_id=oversized.staging_id
+    )
+    assert renewed is not None
+    assert renewed.data == oversized.data
+
+    stagings = [oversized]
+    while restaged := await stage_timeseries_chunks(
+        connection=async_connection, max_values=1_000
+    ):
+        stagings.append(restaged)
+
+    staged_timestamps = sorted(
+        timestamp
+        for staging in stagings
+        for timeseries in staging.data.values()
+        for timestamp in timeseries.timestamps_utc
+    )
+    assert staged_timestamps == sorted(2 * list(range(start, start + sample_cnt)))
+
+    for staging in stagings:
+        await confirm_staged_chunks(
+            connection=async_connection, staging_id=staging.staging_id
+        )
+
+    assert (
+        await async_connection.execute(func.count(TimeseriesChunkOrm.chunk_id))
+    ).scalar() == 0, "Data left in the database after staging."
+
+    # a confirmed staging can't be renewed
+    assert (
+        await renew_chunk_staging_lease(
+            connection=async_connection, staging_id=oversized.staging_id
+        )
+        is None
+    )
+
+
+async def test_chunk_staging_expired(
+    async_connection: AsyncConnection, timeseries_pair: tuple[int, int]
+):
+    """Ensures that chunks with an expired staging are staged again."""
+
+    await _record(async_connection, timeseries_pair, sample_cnt=10)
+
+    staged = await stage_timeseries_chunks(connection=async_connection)
+    assert staged is not None
+    assert await stage_timeseries_chunks(connection=async_connection) is None
+
+    restaged = await stage_timeseries_chunks(
+        connection=async_connection, lease_duration=timedelta(seconds=-1)
+    )
+    assert restaged is not None
+    assert restaged.data == staged.data
@@ -2,19 +2,36 @@ __all__ = [
     "TimeseriesInput",
     "add_timeseries_data",
     "confirm_staged_data",
+    "release_staged_data",
+    "renew_staging_lease",
     "stage_timeseries_data",
 ]
 from datetime import datetime, timedelta
 
-from carlos.edge.interface.messages import DriverDataPayload, DriverTimeseries
+from carlos.edge.interface.messages import (
+    DriverDataPayload,
+    DriverTimeseries,
+    generate_staging_id,
+)
 from carlos.edge.interface.types import CarlosSchema
 from pydantic import Field
-from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy import (
+    ColumnElement,
+    Subquery,
+    Update,
+    delete,
+    insert,
+    literal_column,
+    select,
+    union_all,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.orm import aliased
 
 from carlos.edge.device.storage.orm import TimeseriesDataOrm, TimeseriesIndexOrm
 
-from .constants import DEFAULT_STAGING_SAMPLE_SIZE, SQLITE_MAX_VARIABLE_NUMBER
+from .constants import DEFAULT_STAGING_SAMPLE_SIZE, STAGING_LEASE_DURATION
 
 
 class TimeseriesInput(CarlosSchema):
@@ -56,85 +73,185 @@ async def add_timeseries_data(
 
 
 async def stage_timeseries_data(
-    connection: AsyncConnection, max_values: int = DEFAULT_STAGING_SAMPLE_SIZE
+    connection: AsyncConnection,
+    max_values: int = DEFAULT_STAGING_SAMPLE_SIZE,
+    lease_duration: timedelta = STAGING_LEASE_DURATION,
 ) -> DriverDataPayload | None:
     """Stages any pending data from the timeseries_data table.
 
     This function seeks the latest values from the timeseries_data table and stages
     them by setting the staging_id to the payload's staging_id. The data is then
     returned in a DriverDataPayload object.
-    """
 
-    # we have 2 additional variables in the payload
-    if max_values > SQLITE_MAX_VARIABLE_NUMBER - 2:
-        raise ValueError(  # pragma: no cover
-            f"max_values cannot be greater than {SQLITE_MAX_VARIABLE_NUMBER - 2}."
-            "This is a limitation of SQLite."
-        )
+    The staged samples are leased to the staging. Samples of stagings whose lease
+    expired are considered pending again.
+
+    :param connection: The connection to the database.
+    :param max_values: The maximum number of samples to stage.
+    :param lease_duration: The time after which the staging expires, unless it is
+        confirmed or renewed.
+    :return: The staged data, or None if no data is pending.
+    """
 
-    payload = DriverDataPayload(data={})
+    staging_id = generate_staging_id()
 
     staging_time = datetime.utcnow()
-    expired_staging_time = staging_time - timedelta(minutes=30)
+    expired_staging_time = staging_time - lease_duration
 
+    # The pending and the expired samples are selected separately, so that each
+    # query uses its partial index, see the `index_timeseries_data` migration. A
+    # combined OR condition would scan the whole table.
+    pending_query = _newest_stageable_samples(
+        TimeseriesDataOrm.staging_id.is_(None), max_values=max_values
+    )
+    expired_query = _newest_stageable_samples(
+        TimeseriesDataOrm.staging_id.isnot(None),
+        TimeseriesDataOrm.staged_at_utc < int(expired_staging_time.timestamp()),
+        max_values=max_values,
+    )
+    candidates = union_all(
+        select(pending_query.c.sample_id, pending_query.c.timestamp_utc),
+        select(expired_query.c.sample_id, expired_query.c.timestamp_utc),
+    ).subquery()
     sample_ids_query = (
-        select(TimeseriesDataOrm.sample_id)
-        .where(
-            # Only select rows that are
-            # - not staged or have an expired staging time
-            # - have a server_timeseries_id
-            or_(
-                TimeseriesDataOrm.staging_id.is_(None),
-                TimeseriesDataOrm.timestamp_utc < int(expired_staging_time.timestamp()),
-            ),
-            TimeseriesIndexOrm.server_timeseries_id.isnot(None),
-        )
-        .join(
-            TimeseriesIndexOrm,
-            TimeseriesIndexOrm.timeseries_id == TimeseriesDataOrm.timeseries_id,
-        )
+        select(candidates.c.sample_id)
         # we want to stage newest data first
-        .order_by(TimeseriesDataOrm.timestamp_utc.desc())
-        .limit(max_values)
+        .order_by(candidates.c.timestamp_utc.desc()).limit(max_values)
     )
-    sample_ids = (await connection.execute(sample_ids_query)).scalars().all()
-
-    if not sample_ids:
-        return None
 
+    # The samples are selected, staged and returned with a single statement, the
+    # number of samples is not limited by the number of SQL variables.
     stage_stmt = (
         update(TimeseriesDataOrm)
         .values(
             {
-                "staging_id": payload.staging_id,
+                "staging_id": staging_id,
                 "staged_at_utc": int(staging_time.timestamp()),
             }
         )
-        .where(TimeseriesDataOrm.sample_id.in_(sample_ids))
+        .where(TimeseriesDataOrm.sample_id.in_(sample_ids_query))
+    )
+
+    return await _execute_staging(
+        connection=connection, staging_stmt=stage_stmt, staging_id=staging_id
+    )
+
+
+async def renew_staging_lease(
+    connection: AsyncConnection, staging_id: str
+) -> DriverDataPayload | None:
+    """Renews the lease of a staging, so that its samples can be sent again with the
+    same staging_id without being staged by another staging in the meantime.
+
+    :param connection: The connection to the database.
+    :param staging_id: The staging_id to renew.
+    :return: The staged data, or None if the staging no longer exists, e.g.
+        because it has been confirmed or its lease expired.
+    """
+
+    renew_stmt = (
+        update(TimeseriesDataOrm)
+        .values({"staged_at_utc": int(datetime.utcnow().timestamp())})
+        .where(TimeseriesDataOrm.staging_id == staging_id)
+    )
+
+    return await _execute_staging(
+        connection=connection, staging_stmt=renew_stmt, staging_id=staging_id
+    )
+
+
+async def release_staged_data(connection: AsyncConnection, staging_id: str) -> None:
+    """Releases the samples of a staging that will not be confirmed. They are
+    pending again and are staged by the next staging.
+
+    :param connection: The connection to the database.
+    :param staging_id: The staging_id to release.
+    """
+
+    release_stmt = (
+        update(TimeseriesDataOrm)
+        .values({"staging_id": None, "staged_at_utc": None})
+        .where(TimeseriesDataOrm.staging_id == staging_id)
     )
-    await connection.execute(stage_stmt)
+    await connection.execute(release_stmt)
     await connection.commit()
 
-    staged_query = (
-        select(TimeseriesDataOrm, TimeseriesIndexOrm.server_timeseries_id)
-        .join(
-            TimeseriesIndexOrm,
-            TimeseriesIndexOrm.timeseries_id == TimeseriesDataOrm.timeseries_id,
+
+async def _execute_staging(
+    connection: AsyncConnection, staging_stmt: Update, staging_id: str
+) -> DriverDataPayload | None:
+    """Executes the statement that assigns the samples to the staging and builds
+    the payload from the updated samples.
+
+    :param connection: The connection to the database.
+    :param staging_stmt: The UPDATE statement that stages the samples.
+    :param staging_id: The staging_id the samples are staged with.
+    :return: The staged data, or None if no samples were staged.
+    """
+
+    # RETURNING can't refer to joined tables, hence the server_timeseries_id is
+    # looked up with a correlated subquery.
+    staged_index = aliased(TimeseriesIndexOrm, name="staged_index")
+    server_timeseries_id = (
+        select(staged_index.server_timeseries_id)
+        .where(
+            staged_index.timeseries_id
+            == literal_column(f"{TimeseriesDataOrm.__tablename__}.timeseries_id")
         )
-        .where(TimeseriesDataOrm.staging_id == payload.staging_id)
+        .scalar_subquery()
     )
-    staged_rows = (await connection.execute(staged_query)).all()
 
-    for row in staged_rows:
-        if row.server_timeseries_id not in payload.data:
-            payload.data[row.server_timeseries_id] = DriverTimeseries(
+    staged_rows = (
+        await connection.execute(
+            staging_stmt.returning(
+                TimeseriesDataOrm.timestamp_utc,
+                TimeseriesDataOrm.value,
+                server_timeseries_id.label("server_timeseries_id"),
+            )
+        )
+    ).all()
+    await connection.commit()
+
+    if not staged_rows:
+        return None
+
+    # The order of the returned rows is undefined. Sorted timestamps are compressed
+    # much better, see DriverDataPayload.compress
+    data: dict[int, DriverTimeseries] = {}
+    for row in sorted(staged_rows, key=lambda row: row.timestamp_utc):
+        if row.server_timeseries_id not in data:
+            data[row.server_timeseries_id] = DriverTimeseries(
                 timestamps_utc=[], values=[]
             )
-        dt = payload.data[row.server_timeseries_id]
+        dt = data[row.server_timeseries_id]
         dt.timestamps_utc.append(row.timestamp_utc)
         dt.values.append(row.value)
 
-    return payload
+    return DriverDataPayload(staging_id=staging_id, data=data)
+
+
+def _newest_stageable_samples(
+    *conditions: ColumnElement[bool], max_values: int
+) -> Subquery:
+    """Selects the newest samples matching the conditions, that belong to a
+    timeseries known to the server.
+
+    :param conditions: Additional conditions the samples must match.
+    :param max_values: The maximum number of samples to select.
+    :return: A subquery with the sample_id and timestamp_utc of the samples.
+    """
+
+    return (
+        select(TimeseriesDataOrm.sample_id, TimeseriesDataOrm.timestamp_utc)
+        .join(
+            TimeseriesIndexOrm,
+            TimeseriesIndexOrm.timeseries_id == TimeseriesDataOrm.timeseries_id,
+        )
+        .where(*conditions, TimeseriesIndexOrm.server_timeseries_id.isnot(None))
+        .order_by(TimeseriesDataOrm.timestamp_utc.desc())
+        .limit(max_values)
+        .subquery()
+    )
 
 
 async def confirm_staged_data(connection: AsyncConnection, staging_id: str) -> None:
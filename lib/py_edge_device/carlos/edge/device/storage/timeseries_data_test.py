@@ -3,7 +3,7 @@ from random import randint
 from typing import AsyncGenerator
 
 import pytest
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, func, insert, select, text, update
 from sqlalchemy.ext.asyncio import AsyncConnection
 
 from carlos.edge.device.storage.orm import TimeseriesDataOrm
@@ -11,10 +11,15 @@ from carlos.edge.device.storage.timeseries_data import (
     TimeseriesInput,
     add_timeseries_data,
     confirm_staged_data,
+    release_staged_data,
+    renew_staging_lease,
     stage_timeseries_data,
 )
 from carlos.edge.device.storage.timeseries_index import (
     TimeseriesIndex,
+    TimeseriesIndexMutation,
+    create_timeseries_index,
+    delete_timeseries_index,
     update_timeseries_index,
 )
 
@@ -149,3 +154,198 @@ async def test_staging(
     assert (
         await async_connection.execute(func.count(TimeseriesDataOrm.timeseries_id))
     ).scalar() == 0, "Data left in the database after staging."
+
+
+async def test_staging_expired(
+    async_connection: AsyncConnection,
+    temporary_timeseries_data: list[TimeseriesInput],
+):
+    """Ensures that samples with an expired staging are staged again, merged with
+    the pending samples by their timestamp."""
+
+    newest = await stage_timeseries_data(connection=async_connection, max_values=5)
+    assert newest is not None
+
+    # let the staging of the newest samples expire
+    await async_connection.execute(
+        update(TimeseriesDataOrm)
+        .where(TimeseriesDataOrm.staging_id == newest.staging_id)
+        .values(staged_at_utc=TimeseriesDataOrm.staged_at_utc - 3600)
+    )
+    await async_connection.commit()
+
+    restaged = await stage_timeseries_data(connection=async_connection, max_values=10)
+    assert restaged is not None
+
+    restaged_timestamps = [
+        timestamp
+        for timeseries in restaged.data.values()
+        for timestamp in timeseries.timestamps_utc
+    ]
+    expected = sorted(
+        int(sample.timestamp_utc.timestamp()) for sample in temporary_timeseries_data
+    )[-10:]
+    assert sorted(restaged_timestamps) == expected
+
+
+async def test_staging_single_statement(
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+):
+    """Ensures that a batch exceeding the SQLite variable limit is staged at once
+    and that each sample is mapped to the server id of its timeseries."""
+
+    await update_timeseries_index(
+        connection=async_connection,
+        timeseries_id=temporary_timeseries_index.timeseries_id,
+        server_timeseries_id=11,
+    )
+    other_index = await create_timeseries_index(
+        connection=async_connection,
+        timeseries_index=TimeseriesIndexMutation(
+            driver_identifier="test_driver",
+            driver_signal="other_signal",
+            server_timeseries_id=22,
+        ),
+    )
+    await async_connection.execute(delete(TimeseriesDataOrm))
+
+    samples_per_timeseries = 1_500
+    start = int(datetime.utcnow().timestamp()) - samples_per_timeseries
+    await async_connection.execute(
+        insert(TimeseriesDataOrm),
+        [
+            {
+                "timeseries_id": timeseries_id,
+                "timestamp_utc": start + i,
+                "value": float(i * factor),
+            }
+            for timeseries_id, factor in (
+                (temporary_timeseries_index.timeseries_id, 1),
+                (other_index.timeseries_id, -1),
+            )
+            for i in range(samples_per_timeseries)
+        ],
+    )
+    await async_connection.commit()
+
+    staged = await stage_timeseries_data(
+        connection=async_connection, max_values=2 * samples_per_timeseries
+    )
+    assert staged is not None
+    assert set(staged.data) == {11, 22}
+
+    for server_timeseries_id, factor in ((11, 1), (22, -1)):
+        timeseries = staged.data[server_timeseries_id]
+        assert timeseries.timestamps_utc == [
+            start + i for i in range(samples_per_timeseries)
+        ], "The samples must be sorted by their timestamp."
+        assert timeseries.values == [
+            float(i * factor) for i in range(samples_per_timeseries)
+        ]
+
+    assert await stage_timeseries_data(connection=async_connection) is None
+
+    await async_connection.execute(delete(TimeseriesDataOrm))
+    await async_connection.commit()
+    await delete_timeseries_index(
+        connection=async_connection, timeseries_id=other_index.timeseries_id
+    )
+
+
+async def test_staging_indexes(async_connection: AsyncConnection):
+    """Ensures that the staging queries are supported by indexes."""
+
+    indexes = (
+        (
+            await async_connection.execute(
+                text(
+                    "SELECT name FROM sqlite_master "
+                    "WHERE type = 'index' AND tbl_name = 'timeseries_data'"
+                )
+            )
+        )
+        .scalars()
+        .all()
+    )
+
+    assert "ix_timeseries_data_pending" in indexes
+    assert "ix_timeseries_data_staging_id" in indexes
+
+
+async def test_staging_lease_large_backlog(
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+):
+    """Ensures that a large backlog is staged exactly once, unless the lease of a
+    staging expires, and that renewed and released stagings behave accordingly."""
+
+    await update_timeseries_index(
+        connection=async_connection,
+        timeseries_id=temporary_timeseries_index.timeseries_id,
+        server_timeseries_id=1,
+    )
+    await async_connection.execute(delete(TimeseriesDataOrm))
+
+    backlog_size = 20_000
+    start = int(datetime.utcnow().timestamp()) - backlog_size
+    await async_connection.execute(
+        insert(TimeseriesDataOrm),
+        [
+            {
+                "timeseries_id": temporary_timeseries_index.timeseries_id,
+                "timestamp_utc": start + i,
+                "value": float(i),
+            }
+            for i in range(backlog_size)
+        ],
+    )
+    await async_connection.commit()
+
+    async def _stage_all() -> dict[str, int]:
+        """Stages until nothing is left, returns the sample count per staging."""
+
+        counts = {}
+        while staged := await stage_timeseries_data(
+            connection=async_connection, max_values=997
+        ):
+            counts[staged.staging_id] = sum(
+                len(timeseries.timestamps_utc) for timeseries in staged.data.values()
+            )
+        return counts
+
+    stagings = await _stage_all()
+    assert sum(stagings.values()) == backlog_size, "Each sample is staged once."
+
+    expired, renewed, released, *_ = stagings
+
+    # let the lease of two stagings expire and renew one of them afterwards
+    await async_connection.execute(
+        update(TimeseriesDataOrm)
+        .where(TimeseriesDataOrm.staging_id.in_([expired, renewed]))
+        .values(staged_at_utc=TimeseriesDataOrm.staged_at_utc - 3600)
+    )
+    await async_connection.commit()
+
+    renewed_data = await renew_staging_lease(
+        connection=async_connection, staging_id=renewed
+    )
+    assert renewed_data is not None
+    assert renewed_data.staging_id == renewed
+
+    await release_staged_data(connection=async_connection, staging_id=released)
+
+    restaged = await _stage_all()
+    assert (
+        sum(restaged.values()) == stagings[expired] + stagings[released]
+    ), "Only the expired and the released samples are staged again."
+
+    # a confirmed staging can't be renewed
+    await confirm_staged_data(connection=async_connection, staging_id=renewed)
+    assert (
+        await renew_staging_lease(connection=async_connection, staging_id=renewed)
+        is None
+    )
+
+    await async_connection.execute(delete(TimeseriesDataOrm))
+    await async_connection.commit()
@@ -0,0 +1,326 @@
+"""This module contains the upload of the pending timeseries data to the server."""
+
+__all__ = [
+    "DriverDataUploader",
+    "MAX_STAGING_SAMPLE_SIZE",
+    "MIN_STAGING_SAMPLE_SIZE",
+]
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+from carlos.edge.interface import CarlosMessage, EdgeProtocol, MessageType
+from carlos.edge.interface.messages import (
+    DriverDataAckPayload,
+    DriverDataPayload,
+    WireFormat,
+)
+from loguru import logger
+
+from .storage.blackbox import Blackbox
+from .storage.constants import DEFAULT_STAGING_SAMPLE_SIZE
+
+DEFAULT_WINDOW_SIZE = 4
+"""The default number of batches that may await their acknowledgement at the same
+time."""
+
+MIN_STAGING_SAMPLE_SIZE = 50
+"""The lower bound of the adaptive batch size."""
+
+MAX_STAGING_SAMPLE_SIZE = 10_000
+"""The upper bound of the adaptive batch size. It bounds the size of a single
+DRIVER_DATA message and the time a staging holds the write lock of the storage."""
+
+DEFAULT_TARGET_ROUND_TRIP = 2.0
+"""The round trip time in seconds the batch size is adapted to. Smaller batches
+make sure that a slow connection is not congested, larger batches reduce the
+overhead on fast connections."""
+
+DEFAULT_ACK_TIMEOUT = 60.0
+"""The time in seconds after which an unacknowledged batch is sent again."""
+
+DEFAULT_MAX_RESENDS = 2
+"""The number of times an unacknowledged batch is sent again, before its samples
+are released to be staged with a new batch."""
+
+_ROUND_TRIP_SMOOTHING = 0.25
+"""The weight of the latest measurement in the smoothed round trip time."""
+
+
+@dataclass(slots=True)
+class _InFlightBatch:
+    sent_at: float
+    """The monotonic time the batch was sent the last time."""
+    resends: int = 0
+    """The number of times the batch has been sent again."""
+
+
+class DriverDataUploader:
+    """Uploads the pending timeseries data to the server using a sliding window.
+
+    Up to `window_size` staged batches are sent without waiting for their
+    DRIVER_DATA_ACK. Each acknowledgement frees a slot in the window and the next
+    batch is sent immediately. The number of samples per batch is adapted to the
+    observed round trip time, so that a large backlog is transferred as fast as
+    the connection allows.
+
+    Batches that are not acknowledged in time are sent again with the same
+    staging id, renewing the lease of the staged samples. After `max_resends`
+    attempts the samples are released and staged again with the next batch."""
+
+    def __init__(
+        self,
+        protocol: EdgeProtocol,
+        blackbox: Blackbox,
+        window_size: int = DEFAULT_WINDOW_SIZE,
+        min_batch_size: int = MIN_STAGING_SAMPLE_SIZE,
+        max_batch_size: int = MAX_STAGING_SAMPLE_SIZE,
+        target_round_trip: float = DEFAULT_TARGET_ROUND_TRIP,
+        ack_timeout: float = DEFAULT_ACK_TIMEOUT,
+        max_resends: int = DEFAULT_MAX_RESENDS,
+    ):
+        """Initializes the uploader.
+
+        :param protocol: The protocol used to send the data.
+        :param blackbox: The blackbox holding the pending data.
+        :param window_size: The maximum number of unacknowledged batches.
+        :param min_batch_size: The minimum number of samples per batch.
+        :param max_batch_size: The maximum number of samples per batch.
+        :param target_round_trip: The round trip time in seconds the batch size
+            is adapted to.
+        :param ack_timeout: The time in seconds after which an unacknowledged batch
+            is considered lost.
+        :param max_resends: The maximum number of times a lost batch is sent again.
+        """
+
+        if not 0 < min_batch_size <= max_batch_size <= MAX_STAGING_SAMPLE_SIZE:
+            raise ValueError(
+                "The batch size must satisfy 0 < min_batch_size <= max_batch_size "
+                f"<= {MAX_STAGING_SAMPLE_SIZE}."
+            )
+
+        self.protocol = protocol
+        self.blackbox = blackbox
+        self.window_size = window_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_round_trip = target_round_trip
+        self.ack_timeout = ack_timeout
+        self.max_resends = max_resends
+
+        self.batch_size = min(
+            max(DEFAULT_STAGING_SAMPLE_SIZE, min_batch_size), max_batch_size
+        )
+        """The number of samples staged with the next batch."""
+
+        self.round_trip_time: float | None = None
+        """The smoothed round trip time in seconds, once it has been measured."""
+
+        # maps the staging id to each unacknowledged batch
+        self._in_flight: dict[str, _InFlightBatch] = {}
+        self._window_changed = asyncio.Condition()
+        self._upload_lock = asyncio.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """The number of batches awaiting their acknowledgement."""
+
+        return len(self._in_flight)
+
+    async def upload_pending_data(self) -> int:
+        """Sends the pending data until the blackbox is empty, the connection is
+        lost or the server repeatedly fails to acknowledge a batch. If an upload is
+        already running, this function returns immediately.
+
+        :return: The number of batches sent.
+        """
+
+        if self._upload_lock.locked():
+            logger.debug("Upload of pending data is already running.")
+            return 0
+
+        sent_batches = 0
+        async with self._upload_lock:
+            while self.protocol.is_connected:
+                if not await self._wait_for_window():
+                    break
+
+                staged_data = await self.blackbox.stage(max_values=self.batch_size)
+
+                if staged_data is None:
+                    if not self._in_flight:
+                        break
+
+                    # Wait for the outstanding batches, the lost ones are sent
+                    # again. New data may have been recorded in the meantime.
+                    if not await self._wait_for_window(max_in_flight=0):
+                        break
+                    continue
+
+                self._in_flight[staged_data.staging_id] = _InFlightBatch(
+                    sent_at=time.monotonic()
+                )
+                await self._send_driver_data(staged_data)
+                sent_batches += 1
+
+        if sent_batches:
+            logger.debug(
+                f"Sent {sent_batches} batches of pending data. "
+                f"Batch size: {self.batch_size}, round trip: {self.round_trip_time}."
+            )
+        return sent_batches
+
+    async def reset_window(self):
+        """Releases the samples of all batches awaiting their acknowledgement. Must
+        be called whenever the connection is established again: The batches sent
+        with the previous connection are never acknowledged, hence they would block
+        the window until the `ack_timeout` and would be sent again needlessly.
+        """
+
+        async with self._window_changed:
+            lost = list(self._in_flight)
+            self._in_flight.clear()
+            self._window_changed.notify_all()
+
+        if not lost:
+            return
+
+        for staging_id in lost:
+            await self.blackbox.release_staging(staging_id=staging_id)
+        logger.info(f"Released the samples of {len(lost)} unacknowledged batches.")
+
+    async def handle_driver_data_ack(
+        self, protocol: EdgeProtocol, message: CarlosMessage
+    ):
+        """Handles the incoming driver data ack message.
+
+        This message is sent by the server as an acknowledgment of the driver data
+        received. The acknowledged data is deleted and the next batch may be sent.
+
+        :param protocol: The protocol to use for communication.
+        :param message: The incoming message.
+        """
+
+        ackn_message = DriverDataAckPayload.model_validate(message.payload)
+
+        await self.blackbox.confirm_staging(staging_id=ackn_message.staging_id)
+
+        async with self._window_changed:
+            batch = self._in_flight.pop(ackn_message.staging_id, None)
+            # the round trip of a batch that was sent again is ambiguous
+            if batch is not None and batch.resends == 0:
+                self._adapt_batch_size(round_trip=time.monotonic() - batch.sent_at)
+            self._window_changed.notify_all()
+
+    async def _wait_for_window(self, max_in_flight: int | None = None) -> bool:
+        """Waits until the window allows to send another batch. Batches that are not
+        acknowledged within the `ack_timeout` are sent again or released.
+
+        :param max_in_flight: The number of unacknowledged batches to wait for,
+            defaults to one less than the window size.
+        :return: False, if a batch has been released. The upload should be stopped
+            in that case, as the server does not acknowledge the data.
+        """
+
+        if max_in_flight is None:
+            max_in_flight = self.window_size - 1
+
+        while True:
+            async with self._window_changed:
+                if len(self._in_flight) <= max_in_flight:
+                    return True
+
+                timed_out = self._pop_timed_out()
+                if not timed_out:
+                    try:
+                        await asyncio.wait_for(
+                            self._window_changed.wait(), timeout=self.ack_timeout
+                        )
+                    except TimeoutError:
+                        pass
+                    continue
+
+            # This is considered a sign of congestion, hence the batch size is
+            # reduced.
+            logger.warning(f"No acknowledgement received for the batches {timed_out}.")
+            self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+            released = False
+            for staging_id, batch in timed_out.items():
+                released |= await self._resend_or_release(
+                    staging_id=staging_id, batch=batch
+                )
+            if released:
+                return False
+
+    def _pop_timed_out(self) -> dict[str, _InFlightBatch]:
+        """Removes the batches from the window that exceeded the `ack_timeout`.
+
+        :return: The removed batches by their staging id.
+        """
+
+        timed_out_before = time.monotonic() - self.ack_timeout
+        return {
+            staging_id: self._in_flight.pop(staging_id)
+            for staging_id, batch in list(self._in_flight.items())
+            if batch.sent_at <= timed_out_before
+        }
+
+    async def _resend_or_release(self, staging_id: str, batch: _InFlightBatch) -> bool:
+        """Sends the timed out batch again, unless it has been sent `max_resends`
+        times already. In that case, its samples are released.
+
+        :param staging_id: The staging id of the batch.
+        :param batch: The timed out batch.
+        :return: True, if the samples have been released.
+        """
+
+        if batch.resends >= self.max_resends:
+            await self.blackbox.release_staging(staging_id=staging_id)
+            logger.warning(f"Released the samples of the batch {staging_id}.")
+            return True
+
+        staged_data = await self.blackbox.renew_staging_lease(staging_id=staging_id)
+
+        # the batch has been acknowledged in the meantime
+        if staged_data is None:
+            return False
+
+        self._in_flight[staging_id] = _InFlightBatch(
+            sent_at=time.monotonic(), resends=batch.resends + 1
+        )
+        await self._send_driver_data(staged_data)
+        return False
+
+    async def _send_driver_data(self, staged_data: DriverDataPayload):
+        """Sends the staged data to the server. The timeseries are compressed, if
+        the connection negotiated a binary wire format. Servers that only support
+        the text format might not know the compressed timeseries.
+
+        :param staged_data: The staged data to send.
+        """
+
+        if self.protocol.wire_format != WireFormat.TEXT:
+            staged_data = staged_data.compress()
+
+        await self.protocol.send(
+            CarlosMessage(message_type=MessageType.DRIVER_DATA, payload=staged_data)
+        )
+
+    def _adapt_batch_size(self, round_trip: float):
+        """Adapts the batch size, so that the round trip time approaches the
+        `target_round_trip`. The batch size changes by a factor of 2 at most.
+
+        :param round_trip: The measured round trip time in seconds.
+        """
+
+        if self.round_trip_time is None:
+            self.round_trip_time = round_trip
+        else:
+            self.round_trip_time += _ROUND_TRIP_SMOOTHING * (
+                round_trip - self.round_trip_time
+            )
+
+        scale = self.target_round_trip / max(self.round_trip_time, 1e-3)
+        batch_size = int(self.batch_size * min(max(scale, 0.5), 2.0))
+        self.batch_size = min(max(batch_size, self.min_batch_size), self.max_batch_size)
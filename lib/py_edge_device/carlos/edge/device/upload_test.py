@@ -0,0 +1,451 @@
+import asyncio
+from datetime import UTC, datetime
+from typing import AsyncGenerator
+
+import pytest
+from carlos.edge.interface import CarlosMessage, MessageType
+from carlos.edge.interface.messages import (
+    CompressedDriverTimeseries,
+    DriverDataAckPayload,
+    DriverDataPayload,
+    DriverTimeseries,
+    WireFormat,
+)
+from carlos.edge.interface.plugin_pytest import EdgeProtocolTestingConnection
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from carlos.edge.device.storage.blackbox import Blackbox, ChunkedBlackbox
+from carlos.edge.device.storage.connection import (
+    build_storage_url,
+    get_async_storage_engine,
+)
+from carlos.edge.device.storage.orm import TimeseriesChunkOrm, TimeseriesDataOrm
+from carlos.edge.device.storage.timeseries_chunks import add_timeseries_chunk_data
+from carlos.edge.device.storage.timeseries_data import TimeseriesInput
+from carlos.edge.device.storage.timeseries_index import (
+    TimeseriesIndex,
+    update_timeseries_index,
+)
+from carlos.edge.device.upload import MAX_STAGING_SAMPLE_SIZE, DriverDataUploader
+from conftest import TEST_STORAGE_PATH
+
+STORAGE_URL = build_storage_url(TEST_STORAGE_PATH, is_async=True)
+
+
+def _blackbox() -> Blackbox:
+    """Returns the row based blackbox of the test storage."""
+
+    return Blackbox(engine=get_async_storage_engine(url=STORAGE_URL))
+
+
+async def _insert_pending_samples(
+    connection: AsyncConnection, timeseries_index: TimeseriesIndex, count: int
+) -> set[int]:
+    """Inserts `count` samples with distinct timestamps into the blackbox."""
+
+    await update_timeseries_index(
+        connection=connection,
+        timeseries_id=timeseries_index.timeseries_id,
+        server_timeseries_id=1,
+    )
+
+    start = int(datetime.utcnow().timestamp()) - count
+    timestamps = {start + i for i in range(count)}
+    await connection.execute(
+        insert(TimeseriesDataOrm),
+        [
+            {
+                "timeseries_id": timeseries_index.timeseries_id,
+                "timestamp_utc": timestamp,
+                "value": 20.0,
+            }
+            for timestamp in timestamps
+        ],
+    )
+    await connection.commit()
+
+    return timestamps
+
+
+@pytest.fixture()
+async def clean_blackbox(
+    async_connection: AsyncConnection,
+) -> AsyncGenerator[None, None]:
+    """Ensures that the blackbox is empty before and after the test."""
+
+    await async_connection.execute(delete(TimeseriesDataOrm))
+    await async_connection.commit()
+
+    yield
+
+    await async_connection.execute(delete(TimeseriesDataOrm))
+    await async_connection.commit()
+
+
+@pytest.mark.parametrize(
+    "target_round_trip, expected_batch_size",
+    [
+        pytest.param(60.0, 400, id="fast connection"),
+        pytest.param(1e-6, 50, id="slow connection"),
+    ],
+)
+async def test_upload_pending_data(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+    clean_blackbox: None,
+    target_round_trip: float,
+    expected_batch_size: int,
+):
+    """Ensures that the whole backlog is uploaded with multiple batches in flight
+    and that the batch size adapts to the round trip time."""
+
+    server, client = edge_testing_protocol
+    timestamps = await _insert_pending_samples(
+        connection=async_connection,
+        timeseries_index=temporary_timeseries_index,
+        count=1500,
+    )
+
+    window_size = 3
+    uploader = DriverDataUploader(
+        protocol=client,
+        window_size=window_size,
+        min_batch_size=50,
+        max_batch_size=400,
+        target_round_trip=target_round_trip,
+        blackbox=_blackbox(),
+    )
+
+    received: list[int] = []
+    max_in_flight = 0
+
+    async def _acknowledge():
+        """Acts as the server, acknowledging each batch on receipt."""
+
+        nonlocal max_in_flight
+        while True:
+            message = await server.receive()
+            payload = DriverDataPayload.model_validate(message.payload)
+            max_in_flight = max(max_in_flight, uploader.in_flight)
+            for timeseries in payload.decompressed_data().values():
+                received.extend(timeseries.timestamps_utc)
+
+            await uploader.handle_driver_data_ack(
+                protocol=client,
+                message=CarlosMessage(
+                    message_type=MessageType.DRIVER_DATA_ACK,
+                    payload=DriverDataAckPayload(staging_id=payload.staging_id),
+                ),
+            )
+
+    acknowledge_task = asyncio.create_task(_acknowledge())
+    try:
+        sent_batches = await uploader.upload_pending_data()
+        async with asyncio.timeout(5):
+            while uploader.in_flight:
+                await asyncio.sleep(0.05)
+    finally:
+        acknowledge_task.cancel()
+
+    assert sorted(received) == sorted(timestamps)
+    assert sent_batches > 1
+    assert 1 < max_in_flight <= window_size
+    assert uploader.batch_size == expected_batch_size
+    assert uploader.round_trip_time is not None
+
+    remaining = (
+        await async_connection.execute(select(func.count(TimeseriesDataOrm.sample_id)))
+    ).scalar()
+    assert remaining == 0
+
+
+@pytest.mark.parametrize(
+    "wire_format, expected_type",
+    [
+        pytest.param(WireFormat.TEXT, DriverTimeseries, id="text"),
+        pytest.param(WireFormat.BINARY, CompressedDriverTimeseries, id="binary"),
+    ],
+)
+async def test_upload_pending_data_compression(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+    clean_blackbox: None,
+    wire_format: WireFormat,
+    expected_type: type,
+):
+    """Ensures that the data is only compressed, if a binary wire format has been
+    negotiated with the server."""
+
+    server, client = edge_testing_protocol
+    client.wire_format = wire_format
+    await _insert_pending_samples(
+        connection=async_connection,
+        timeseries_index=temporary_timeseries_index,
+        count=10,
+    )
+
+    uploader = DriverDataUploader(
+        protocol=client, ack_timeout=0.1, blackbox=_blackbox()
+    )
+    upload_task = asyncio.create_task(uploader.upload_pending_data())
+    try:
+        message = await asyncio.wait_for(server.receive(), timeout=5)
+    finally:
+        upload_task.cancel()
+
+    payload = DriverDataPayload.model_validate(message.payload)
+    assert [type(timeseries) for timeseries in payload.data.values()] == [expected_type]
+
+
+async def test_upload_pending_data_ack_timeout(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+    clean_blackbox: None,
+):
+    """Ensures that an unacknowledged batch is sent again a limited number of times
+    with the same staging id and that its samples are released afterwards."""
+
+    server, client = edge_testing_protocol
+    await _insert_pending_samples(
+        connection=async_connection,
+        timeseries_index=temporary_timeseries_index,
+        count=300,
+    )
+
+    uploader = DriverDataUploader(
+        protocol=client,
+        window_size=1,
+        ack_timeout=0.1,
+        max_resends=2,
+        blackbox=_blackbox(),
+    )
+
+    # The upload stops once the batch has been released, instead of sending the
+    # same samples over and over again.
+    assert await uploader.upload_pending_data() == 1
+    assert uploader.batch_size == uploader.min_batch_size
+    assert uploader.in_flight == 0
+
+    staging_ids = []
+    for _ in range(3):
+        message = await server.receive()
+        staging_ids.append(DriverDataPayload.model_validate(message.payload).staging_id)
+    assert len(set(staging_ids)) == 1, "The batch must be sent with the same id."
+
+    staged = (
+        await async_connection.execute(
+            select(func.count(TimeseriesDataOrm.sample_id)).where(
+                TimeseriesDataOrm.staging_id.isnot(None)
+            )
+        )
+    ).scalar()
+    assert staged == 0, "The samples of the batch must be released."
+
+
+async def test_reset_window_on_reconnect(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+    clean_blackbox: None,
+):
+    """Ensures that the batches of a lost connection do not block the window after
+    reconnecting, and that their samples are uploaded again right away."""
+
+    server, client = edge_testing_protocol
+    timestamps = await _insert_pending_samples(
+        connection=async_connection,
+        timeseries_index=temporary_timeseries_index,
+        count=200,
+    )
+
+    uploader = DriverDataUploader(
+        protocol=client,
+        window_size=1,
+        min_batch_size=200,
+        ack_timeout=60.0,
+        blackbox=_blackbox(),
+    )
+
+    upload_task = asyncio.create_task(uploader.upload_pending_data())
+    try:
+        # the batch is lost along with the connection
+        await asyncio.wait_for(server.receive(), timeout=5)
+        assert uploader.in_flight == 1
+
+        # the upload continues without waiting for the ack timeout
+        await uploader.reset_window()
+        message = await asyncio.wait_for(server.receive(), timeout=5)
+    finally:
+        upload_task.cancel()
+
+    payload = DriverDataPayload.model_validate(message.payload)
+    received = [
+        timestamp
+        for timeseries in payload.decompressed_data().values()
+        for timestamp in timeseries.timestamps_utc
+    ]
+    assert sorted(received) == sorted(timestamps)
+
+
+async def test_upload_pending_data_lossy_connection(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+    clean_blackbox: None,
+):
+    """Ensures that a large backlog is uploaded completely, if some messages are
+    lost, and that lost batches are sent again instead of being staged again."""
+
+    server, client = edge_testing_protocol
+    timestamps = await _insert_pending_samples(
+        connection=async_connection,
+        timeseries_index=temporary_timeseries_index,
+        count=20_000,
+    )
+
+    uploader = DriverDataUploader(
+        protocol=client,
+        window_size=4,
+        max_batch_size=MAX_STAGING_SAMPLE_SIZE,
+        ack_timeout=0.2,
+        blackbox=_blackbox(),
+    )
+
+    received: set[int] = set()
+    attempts: dict[str, int] = {}
+
+    async def _acknowledge():
+        """Acts as the server, dropping the first message of every third batch."""
+
+        while True:
+            message = await server.receive()
+            payload = DriverDataPayload.model_validate(message.payload)
+            attempts[payload.staging_id] = attempts.get(payload.staging_id, 0) + 1
+            if len(attempts) % 3 == 0 and attempts[payload.staging_id] == 1:
+                continue
+
+            for timeseries in payload.decompressed_data().values():
+                received.update(timeseries.timestamps_utc)
+
+            await uploader.handle_driver_data_ack(
+                protocol=client,
+                message=CarlosMessage(
+                    message_type=MessageType.DRIVER_DATA_ACK,
+                    payload=DriverDataAckPayload(staging_id=payload.staging_id),
+                ),
+            )
+
+    acknowledge_task = asyncio.create_task(_acknowledge())
+    try:
+        # the upload waits for the outstanding batches before it returns
+        async with asyncio.timeout(30):
+            await uploader.upload_pending_data()
+    finally:
+        acknowledge_task.cancel()
+
+    assert received == timestamps
+    assert max(attempts.values()) == 2, "Lost batches must be sent once more."
+
+    remaining = (
+        await async_connection.execute(select(func.count(TimeseriesDataOrm.sample_id)))
+    ).scalar()
+    assert remaining == 0
+
+
+async def test_upload_pending_data_chunked(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+    async_connection: AsyncConnection,
+    temporary_timeseries_index: TimeseriesIndex,
+):
+    """Ensures that the uploader stages and confirms the data of the chunked
+    blackbox."""
+
+    server, client = edge_testing_protocol
+    await update_timeseries_index(
+        connection=async_connection,
+        timeseries_id=temporary_timeseries_index.timeseries_id,
+        server_timeseries_id=1,
+    )
+    await async_connection.execute(delete(TimeseriesChunkOrm))
+    start = int(datetime.utcnow().timestamp()) - 600
+    for i in range(600):
+        await add_timeseries_chunk_data(
+            connection=async_connection,
+            timeseries_input=TimeseriesInput(
+                timestamp_utc=datetime.fromtimestamp(start + i, tz=UTC),
+                values={temporary_timeseries_index.timeseries_id: float(i)},
+            ),
+        )
+
+    uploader = DriverDataUploader(
+        protocol=client,
+        blackbox=ChunkedBlackbox(engine=get_async_storage_engine(url=STORAGE_URL)),
+        max_batch_size=256,
+    )
+
+    received: list[int] = []
+
+    async def _acknowledge():
+        """Acts as the server, acknowledging each batch on receipt."""
+
+        while True:
+            message = await server.receive()
+            payload = DriverDataPayload.model_validate(message.payload)
+            for timeseries in payload.decompressed_data().values():
+                received.extend(timeseries.timestamps_utc)
+
+            await uploader.handle_driver_data_ack(
+                protocol=client,
+                message=CarlosMessage(
+                    message_type=MessageType.DRIVER_DATA_ACK,
+                    payload=DriverDataAckPayload(staging_id=payload.staging_id),
+                ),
+            )
+
+    acknowledge_task = asyncio.create_task(_acknowledge())
+    try:
+        assert await uploader.upload_pending_data() > 1
+        async with asyncio.timeout(5):
+            while uploader.in_flight:
+                await asyncio.sleep(0.05)
+    finally:
+        acknowledge_task.cancel()
+
+    assert sorted(received) == list(range(start, start + 600))
+
+    remaining = (
+        await async_connection.execute(select(func.count(TimeseriesChunkOrm.chunk_id)))
+    ).scalar()
+    assert remaining == 0
+
+
+def test_invalid_batch_size(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+):
+    """Ensures that the batch size bounds are validated."""
+
+    with pytest.raises(ValueError):
+        DriverDataUploader(
+            protocol=edge_testing_protocol[1],
+            blackbox=_blackbox(),
+            min_batch_size=100,
+            max_batch_size=50,
+        )
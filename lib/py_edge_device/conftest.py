@@ -30,8 +30,13 @@ TEST_STORAGE_PATH = Path(__file__).parent / "tests" / "storage.db"
 def db_migration() -> None:
     """Fixture that upgrades the database and downgrades it after the test."""
 
-    if TEST_STORAGE_PATH.exists():
-        TEST_STORAGE_PATH.unlink()
+    # the write-ahead log of a previous run must not be applied to the new database
+    for path in (
+        TEST_STORAGE_PATH,
+        TEST_STORAGE_PATH.with_name(TEST_STORAGE_PATH.name + "-wal"),
+        TEST_STORAGE_PATH.with_name(TEST_STORAGE_PATH.name + "-shm"),
+    ):
+        path.unlink(missing_ok=True)
     assert not TEST_STORAGE_PATH.exists(), "Failed to remove the test database."
 
     alembic_config = build_alembic_config(
@@ -59,13 +64,26 @@ def sync_connection(sync_engine: Engine) -> Generator[Connection, None, None]:
         yield connection
 
 
+@pytest_asyncio.fixture(autouse=True)
+async def dispose_persistent_engine() -> AsyncGenerator[None, None]:
+    """Closes the persistent connection of the storage after each test. The pool of
+    the engine is bound to the event loop of the test."""
+
+    yield
+
+    await get_async_storage_engine(
+        url=build_storage_url(TEST_STORAGE_PATH, is_async=True)
+    ).dispose()
+
+
 @pytest_asyncio.fixture()
 async def async_engine() -> Generator[AsyncEngine, None, None]:
     """Fixture that provides an asynchronous connection to a temporary
-    SQLite database."""
+    SQLite database. It does not use the persistent connection, so that the tests
+    can hold a connection while the code under test uses the storage."""
 
     yield get_async_storage_engine(
-        url=build_storage_url(TEST_STORAGE_PATH, is_async=True)
+        url=build_storage_url(TEST_STORAGE_PATH, is_async=True), persistent=False
     )
 
 
@@ -0,0 +1,68 @@
+"""Compares the row based and the chunked blackbox by the time to record the
+readings and the resulting size of the storage. Run it from the root of the
+package:
+
+    python -m tests.benchmark_blackbox
+"""
+
+import asyncio
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from carlos.edge.device.storage.blackbox import Blackbox, ChunkedBlackbox
+from carlos.edge.device.storage.connection import (
+    build_storage_url,
+    get_async_storage_engine,
+)
+from carlos.edge.device.storage.migration import alembic_upgrade, build_alembic_config
+
+READINGS = 20_000
+"""The number of readings recorded with each blackbox."""
+
+SIGNALS = 8
+"""The number of signals per reading."""
+
+READING_INTERVAL = timedelta(seconds=10)
+
+
+async def _measure_blackbox(path: Path, blackbox_type: type[Blackbox]) -> float:
+    """Records the readings, returns the time in seconds per reading."""
+
+    alembic_upgrade(
+        alembic_config=build_alembic_config(connection_url=build_storage_url(path)),
+    )
+    engine = get_async_storage_engine(url=build_storage_url(path, is_async=True))
+    blackbox = blackbox_type(engine=engine)
+
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    begin = time.perf_counter()
+    for i in range(READINGS):
+        await blackbox.record(
+            driver_identifier="driver",
+            read_timestamp=start + i * READING_INTERVAL,
+            data={f"signal-{signal}": i * 0.5 + signal for signal in range(SIGNALS)},
+        )
+    duration = time.perf_counter() - begin
+
+    # checkpoints the write-ahead log into the database file
+    await engine.dispose()
+    return duration / READINGS
+
+
+async def main():
+    print(f"{'blackbox':>16} | {'per reading':>11} | {'storage size':>12}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for blackbox_type in (Blackbox, ChunkedBlackbox):
+            path = Path(directory) / f"{blackbox_type.__name__}.db"
+            duration = await _measure_blackbox(path, blackbox_type=blackbox_type)
+            print(
+                f"{blackbox_type.__name__:>16} | {duration * 1000:>8.2f} ms "
+                f"| {path.stat().st_size / 2**20:>8.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""Measures the time to stage pending data depending on the size of the backlog.
+
+The benchmark compares the storage with and without the indexes of the
+`index_timeseries_data` migration. Run it from the root of the package:
+
+    python -m tests.benchmark_staging
+"""
+
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+
+from sqlalchemy import update
+
+from carlos.edge.device.storage.connection import (
+    build_storage_url,
+    get_async_storage_engine,
+)
+from carlos.edge.device.storage.migration import alembic_upgrade, build_alembic_config
+from carlos.edge.device.storage.orm import TimeseriesDataOrm
+from carlos.edge.device.storage.timeseries_data import stage_timeseries_data
+
+BACKLOG_SIZES = (10_000, 100_000, 1_000_000)
+"""The number of pending samples in the blackbox."""
+
+WITHOUT_INDEXES = "476f88fe4d1b"
+"""The revision before the staging indexes were added."""
+
+WITH_INDEXES = "head"
+
+REPETITIONS = 5
+"""The number of stagings per measurement, the median is reported."""
+
+
+def _prepare_storage(path: Path, revision: str, backlog_size: int):
+    """Creates the storage at the given revision and fills the backlog."""
+
+    alembic_upgrade(
+        alembic_config=build_alembic_config(connection_url=build_storage_url(path)),
+        revision=revision,
+    )
+
+    with sqlite3.connect(path) as connection:
+        connection.executemany(
+            "INSERT INTO timeseries_index (timeseries_id, driver_identifier, "
+            "driver_signal, server_timeseries_id) VALUES (?, 'driver', ?, ?)",
+            [(i, f"signal-{i}", i) for i in range(1, 11)],
+        )
+        connection.executemany(
+            "INSERT INTO timeseries_data (timeseries_id, timestamp_utc, value) "
+            "VALUES (?, ?, ?)",
+            ((i % 10 + 1, 1_700_000_000 + i // 10, 20.0) for i in range(backlog_size)),
+        )
+        connection.execute("ANALYZE")
+
+
+async def _measure_staging(path: Path) -> float:
+    """Returns the median time in seconds to stage a default sized batch."""
+
+    engine = get_async_storage_engine(
+        url=build_storage_url(path, is_async=True), persistent=False
+    )
+
+    durations = []
+    async with engine.connect() as connection:
+        for _ in range(REPETITIONS):
+            start = time.perf_counter()
+            staged = await stage_timeseries_data(connection=connection)
+            durations.append(time.perf_counter() - start)
+
+            # reset the staging, so that each repetition stages the same backlog
+            assert staged is not None
+            await connection.execute(
+                update(TimeseriesDataOrm)
+                .where(TimeseriesDataOrm.staging_id == staged.staging_id)
+                .values(staging_id=None, staged_at_utc=None)
+            )
+            await connection.commit()
+
+    await engine.dispose()
+    return median(durations)
+
+
+async def main():
+    print(f"{'backlog':>10} | {'without indexes':>16} | {'with indexes':>13}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for backlog_size in BACKLOG_SIZES:
+            results = []
+            for revision in (WITHOUT_INDEXES, WITH_INDEXES):
+                path = Path(directory) / f"{revision}-{backlog_size}.db"
+                _prepare_storage(path, revision=revision, backlog_size=backlog_size)
+                results.append(await _measure_staging(path))
+
+            print(
+                f"{backlog_size:>10} | {results[0] * 1000:>13.1f} ms "
+                f"| {results[1] * 1000:>10.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
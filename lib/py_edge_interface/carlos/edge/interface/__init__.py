@@ -13,6 +13,7 @@ __all__ = [
     "PONG",
     "PingMessage",
     "PongMessage",
+    "WireFormat",
     "get_websocket_endpoint",
     "get_websocket_token_endpoint",
 ]
@@ -25,6 +26,7 @@ from .messages import (
     MessageType,
     PingMessage,
     PongMessage,
+    WireFormat,
 )
 from .protocol import (
     PING,
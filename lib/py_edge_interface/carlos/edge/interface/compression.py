@@ -0,0 +1,111 @@
+"""This module contains the per message compression of binary frames. It is used by
+the `WireFormat.BINARY_DEFLATE` wire format."""
+
+__all__ = [
+    "COMPRESSED_FLAG",
+    "COMPRESSION_THRESHOLD",
+    "CompressionStatistics",
+    "compress_frame",
+    "decompress_frame",
+]
+
+import zlib
+from dataclasses import dataclass
+
+COMPRESSION_THRESHOLD = 256
+"""Frames smaller than this number of bytes are never compressed. The overhead of
+the compression outweighs the savings for small messages like PING or PONG."""
+
+COMPRESSED_FLAG = 0x80
+"""This bit is set in the first byte of a frame, if the remainder of the frame is
+compressed. The remaining bits hold the code of the message type."""
+
+_COMPRESSION_LEVEL = 6
+"""The zlib compression level. This is a good trade-off between the achieved ratio
+and the CPU usage on small devices."""
+
+
+def compress_frame(frame: bytes, threshold: int = COMPRESSION_THRESHOLD) -> bytes:
+    """Compresses the payload of a binary frame. The first byte of the frame
+    is kept and flagged with the `COMPRESSED_FLAG`.
+
+    :param frame: The binary frame to compress.
+    :param threshold: Frames smaller than this number of bytes are not compressed.
+    :return: The compressed frame or the original frame, if compressing it does not
+        reduce its size.
+    """
+
+    if len(frame) < threshold:
+        return frame
+
+    compressed = zlib.compress(frame[1:], _COMPRESSION_LEVEL)
+    if len(compressed) + 1 >= len(frame):
+        return frame
+
+    return bytes((frame[0] | COMPRESSED_FLAG,)) + compressed
+
+
+def decompress_frame(frame: bytes) -> bytes:
+    """Restores the original binary frame, if the frame is compressed. Uncompressed
+    frames are returned unchanged.
+
+    :param frame: The received binary frame.
+    :return: The uncompressed binary frame.
+    :raises ValueError: If the compressed payload is corrupt.
+    """
+
+    if not frame or not frame[0] & COMPRESSED_FLAG:
+        return frame
+
+    try:
+        payload = zlib.decompress(frame[1:])
+    except zlib.error as ex:
+        raise ValueError("Invalid compressed frame.") from ex
+
+    return bytes((frame[0] & ~COMPRESSED_FLAG,)) + payload
+
+
+@dataclass(slots=True)
+class CompressionStatistics:
+    """Keeps track of the size of the binary frames before and after compression."""
+
+    frames: int = 0
+    """The number of frames."""
+
+    compressed_frames: int = 0
+    """The number of frames that were compressed."""
+
+    raw_bytes: int = 0
+    """The total size of the frames before compression."""
+
+    wire_bytes: int = 0
+    """The total size of the frames as transferred over the wire."""
+
+    def record(self, raw_size: int, wire_size: int):
+        """Records a single frame.
+
+        :param raw_size: The size of the frame before compression.
+        :param wire_size: The size of the frame as transferred over the wire.
+        """
+
+        self.frames += 1
+        self.compressed_frames += wire_size != raw_size
+        self.raw_bytes += raw_size
+        self.wire_bytes += wire_size
+
+    @property
+    def ratio(self) -> float:
+        """The achieved compression ratio, i.e. the raw size divided by the size
+        on the wire. A ratio of 1.0 means no savings."""
+
+        if self.wire_bytes == 0:
+            return 1.0
+
+        return self.raw_bytes / self.wire_bytes
+
+    def __str__(self) -> str:
+        return (
+            f"{self.frames} frames ({self.compressed_frames} compressed), "
+            f"{self.raw_bytes} bytes -> {self.wire_bytes} bytes "
+            f"(ratio {self.ratio:.2f})"
+        )
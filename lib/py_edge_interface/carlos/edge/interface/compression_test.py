@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from .compression import (
+    COMPRESSED_FLAG,
+    COMPRESSION_THRESHOLD,
+    CompressionStatistics,
+    compress_frame,
+    decompress_frame,
+)
+
+
+@pytest.mark.parametrize(
+    "frame, expect_compressed",
+    [
+        pytest.param(b"", False, id="empty frame"),
+        pytest.param(bytes((1,)), False, id="message without payload"),
+        pytest.param(
+            bytes((5,)) + b"a" * (COMPRESSION_THRESHOLD - 2),
+            False,
+            id="below threshold",
+        ),
+        pytest.param(
+            bytes((5,)) + b"a" * COMPRESSION_THRESHOLD, True, id="above threshold"
+        ),
+        pytest.param(
+            bytes((5,)) + random.Random(42).randbytes(512), False, id="incompressible"
+        ),
+    ],
+)
+def test_compress_frame(frame: bytes, expect_compressed: bool):
+    """Ensures that only large compressible frames are compressed and that they
+    can be restored."""
+
+    compressed = compress_frame(frame)
+
+    if expect_compressed:
+        assert len(compressed) < len(frame)
+        assert compressed[0] == frame[0] | COMPRESSED_FLAG
+    else:
+        assert compressed == frame
+
+    assert decompress_frame(compressed) == frame
+
+
+def test_decompress_frame_invalid():
+    """Ensures that corrupt frames raise a ValueError."""
+
+    with pytest.raises(ValueError):
+        decompress_frame(bytes((5 | COMPRESSED_FLAG,)) + b"not compressed")
+
+
+def test_compression_statistics():
+    """Ensures that the statistics are accumulated correctly."""
+
+    statistics = CompressionStatistics()
+    assert statistics.ratio == 1.0
+
+    statistics.record(raw_size=1000, wire_size=100)
+    statistics.record(raw_size=10, wire_size=10)
+
+    assert statistics.frames == 2
+    assert statistics.compressed_frames == 1
+    assert statistics.ratio == pytest.approx(1010 / 110)
+    assert "ratio 9.18" in str(statistics)
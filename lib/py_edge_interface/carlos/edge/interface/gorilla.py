@@ -0,0 +1,201 @@
+"""This module contains the Gorilla time series compression, as described in
+"Gorilla: A Fast, Scalable, In-Memory Time Series Database" (Pelkonen et al., 2015).
+
+Timestamps are stored as delta-of-delta, which takes a single bit per sample for
+signals sampled at a fixed interval. Values are XORed with the previous value, only
+the meaningful bits of the result are stored. Slowly changing signals therefore
+require only a few bits per sample. The compression is lossless.
+
+The compression trades parsing time for transfer size: The bit stream is decoded
+sample by sample in Python, which is slower than parsing the plain samples of
+either wire format. Hence, it pays off on slow or metered connections. See
+`tests/benchmark_gorilla.py` for the sizes and decoding times of typical
+signals."""
+
+__all__ = ["decode_gorilla", "encode_gorilla", "gorilla_sample_count"]
+
+import struct
+from typing import Sequence
+
+_HEADER = struct.Struct("<I")
+"""The number of samples stored in the bit stream."""
+
+_TIMESTAMP_BUCKETS = ((7, "10"), (9, "110"), (12, "1110"))
+"""The number of bits and the control bits used to store a delta-of-delta that
+fits the respective number of bits. Larger values are stored with 64 bits."""
+
+_MAX_LEADING_ZEROS = 31
+"""The number of leading zeros of a XORed value is stored with 5 bits."""
+
+
+def encode_gorilla(timestamps: Sequence[int], values: Sequence[float]) -> bytes:
+    """Compresses the samples of a timeseries.
+
+    :param timestamps: The timestamps of the samples.
+    :param values: The values of the samples.
+    :return: The compressed samples.
+    :raises ValueError: If the number of timestamps and values differ or the
+        delta-of-delta of the timestamps exceeds 64 bits.
+    """
+
+    count = len(timestamps)
+    if count != len(values):
+        raise ValueError("The number of timestamps and values must be equal.")
+
+    header = _HEADER.pack(count)
+    if not count:
+        return header
+
+    value_bits = struct.unpack(f"<{count}Q", struct.pack(f"<{count}d", *values))
+
+    bits = [_to_bits(timestamps[0], 64), _to_bits(value_bits[0], 64)]
+    previous_timestamp, previous_delta = timestamps[0], 0
+    previous_value, leading, trailing = value_bits[0], -1, -1
+
+    for timestamp, value in zip(timestamps[1:], value_bits[1:]):
+        delta = timestamp - previous_timestamp
+        delta_of_delta = delta - previous_delta
+        previous_timestamp, previous_delta = timestamp, delta
+
+        if delta_of_delta == 0:
+            bits.append("0")
+        else:
+            for size, control in _TIMESTAMP_BUCKETS:
+                if -(1 << (size - 1)) <= delta_of_delta < 1 << (size - 1):
+                    bits.append(control + _to_bits(delta_of_delta, size))
+                    break
+            else:
+                if not -(1 << 63) <= delta_of_delta < 1 << 63:
+                    raise ValueError("The timestamps are too far apart.")
+                bits.append("1111" + _to_bits(delta_of_delta, 64))
+
+        xor = value ^ previous_value
+        previous_value = value
+        if not xor:
+            bits.append("0")
+            continue
+
+        xor_leading = min(64 - xor.bit_length(), _MAX_LEADING_ZEROS)
+        xor_trailing = (xor & -xor).bit_length() - 1
+        if leading >= 0 and xor_leading >= leading and xor_trailing >= trailing:
+            # the meaningful bits fit into the window of the previous value
+            bits.append("10" + _to_bits(xor >> trailing, 64 - leading - trailing))
+            continue
+
+        leading, trailing = xor_leading, xor_trailing
+        meaningful = 64 - leading - trailing
+        # 64 meaningful bits do not fit into 6 bits and are stored as 0
+        bits.append(
+            f"11{leading:05b}{meaningful & 0x3F:06b}"
+            + _to_bits(xor >> trailing, meaningful)
+        )
+
+    bit_stream = "".join(bits)
+    byte_count = (len(bit_stream) + 7) // 8
+    bit_stream = bit_stream.ljust(byte_count * 8, "0")
+
+    return header + int(bit_stream, 2).to_bytes(byte_count, "big")
+
+
+def decode_gorilla(data: bytes) -> tuple[list[int], list[float]]:
+    """Restores the samples compressed by `encode_gorilla()`.
+
+    :param data: The compressed samples.
+    :return: The timestamps and values of the samples.
+    :raises ValueError: If the data is not a valid Gorilla bit stream.
+    """
+
+    count = gorilla_sample_count(data)
+    if not count:
+        return [], []
+
+    body = data[_HEADER.size :]
+    bits = f"{int.from_bytes(body, 'big'):0{len(body) * 8}b}"
+    if len(bits) < 128:
+        raise ValueError("Truncated Gorilla bit stream.")
+
+    try:
+        timestamps, value_bits, pos = _decode_bit_stream(bits, count)
+    except IndexError as ex:
+        raise ValueError("Truncated Gorilla bit stream.") from ex
+
+    if pos > len(bits):
+        raise ValueError("Truncated Gorilla bit stream.")
+
+    values = struct.unpack(f"<{count}d", struct.pack(f"<{count}Q", *value_bits))
+    return timestamps, list(values)
+
+
+def _decode_bit_stream(bits: str, count: int) -> tuple[list[int], list[int], int]:
+    """Decodes the timestamps and the IEEE 754 bits of the values.
+
+    :return: The timestamps, the bits of the values and the number of bits read.
+    """
+
+    timestamp = _from_bits(bits[:64])
+    value = int(bits[64:128], 2)
+    timestamps, value_bits = [timestamp], [value]
+    delta, leading, trailing = 0, 0, 0
+    pos = 128
+
+    for _ in range(count - 1):
+        if bits[pos] == "0":
+            pos += 1
+        else:
+            control = bits.find("0", pos + 1, pos + 4)
+            if control < 0:
+                size, pos = 64, pos + 4
+            else:
+                size = _TIMESTAMP_BUCKETS[control - pos - 1][0]
+                pos = control + 1
+            delta += _from_bits(bits[pos : pos + size])
+            pos += size
+        timestamp += delta
+        timestamps.append(timestamp)
+
+        if bits[pos] == "0":
+            pos += 1
+        else:
+            if bits[pos + 1] == "1":
+                leading = int(bits[pos + 2 : pos + 7], 2)
+                meaningful = int(bits[pos + 7 : pos + 13], 2) or 64
+                trailing = 64 - leading - meaningful
+                pos += 13
+            else:
+                pos += 2
+            size = 64 - leading - trailing
+            value ^= int(bits[pos : pos + size], 2) << trailing
+            pos += size
+        value_bits.append(value)
+
+    return timestamps, value_bits, pos
+
+
+def gorilla_sample_count(data: bytes) -> int:
+    """Returns the number of samples stored in the compressed data.
+
+    :param data: The compressed samples.
+    :return: The number of samples.
+    :raises ValueError: If the data is too short to be valid.
+    """
+
+    try:
+        return _HEADER.unpack_from(data)[0]
+    except struct.error as ex:
+        raise ValueError("Truncated Gorilla header.") from ex
+
+
+def _to_bits(value: int, size: int) -> str:
+    """Returns the `size` least significant bits of the two's complement of the
+    value."""
+
+    return f"{value & ((1 << size) - 1):0{size}b}"
+
+
+def _from_bits(bits: str) -> int:
+    """Parses a two's complement number from the given bits."""
+
+    value = int(bits, 2)
+    if bits[0] == "1":
+        value -= 1 << len(bits)
+    return value
@@ -0,0 +1,103 @@
+import math
+import random
+
+import pytest
+
+from carlos.edge.interface.gorilla import (
+    decode_gorilla,
+    encode_gorilla,
+    gorilla_sample_count,
+)
+
+
+@pytest.mark.parametrize(
+    "timestamps, values",
+    [
+        pytest.param([], [], id="empty"),
+        pytest.param([1_700_000_000], [21.5], id="single sample"),
+        pytest.param(
+            [1_700_000_000 + 5 * i for i in range(100)],
+            [21.5] * 100,
+            id="constant signal",
+        ),
+        pytest.param(
+            [1_700_000_000 + 5 * i + (i % 3) for i in range(100)],
+            [round(20 + math.sin(i / 10), 2) for i in range(100)],
+            id="jittering timestamps",
+        ),
+        pytest.param(
+            [0, 2**40, 10, -(2**40), 2**40 + 70, 2**40 + 300, 2**40 + 3000],
+            [0.0, -0.0, math.inf, -math.inf, 1e-300, 1e300, 5.0],
+            id="extreme values",
+        ),
+    ],
+)
+def test_round_trip(timestamps: list[int], values: list[float]):
+    """Ensures that the compression is lossless."""
+
+    data = encode_gorilla(timestamps, values)
+
+    assert gorilla_sample_count(data) == len(timestamps)
+    assert decode_gorilla(data) == (timestamps, values)
+
+
+def test_round_trip_random():
+    """Ensures that the compression is lossless for arbitrary values and
+    timestamps."""
+
+    rng = random.Random(42)
+    timestamps = [rng.randint(-(2**60), 2**60) for _ in range(500)]
+    values = [rng.uniform(-1e6, 1e6) for _ in range(500)]
+
+    assert decode_gorilla(encode_gorilla(timestamps, values)) == (timestamps, values)
+
+
+def test_round_trip_nan():
+    """Ensures that NaN values are restored."""
+
+    _, values = decode_gorilla(encode_gorilla([1, 2], [math.nan, 1.0]))
+
+    assert math.isnan(values[0])
+    assert values[1] == 1.0
+
+
+def test_compression_ratio():
+    """Ensures that regularly sampled, slowly changing signals require only a
+    fraction of a byte per sample."""
+
+    count = 10_000
+    timestamps = [1_700_000_000 + 5 * i for i in range(count)]
+    values = [round(20 + 2 * math.sin(i / 500), 1) for i in range(count)]
+
+    assert len(encode_gorilla(timestamps, values)) < count
+
+
+@pytest.mark.parametrize(
+    "timestamps, values",
+    [
+        pytest.param([1, 2], [1.0], id="length mismatch"),
+        pytest.param([0, 2**62, -(2**62)], [1.0] * 3, id="timestamps too far apart"),
+    ],
+)
+def test_encode_invalid(timestamps: list[int], values: list[float]):
+    """Ensures that unsupported input raises a ValueError."""
+
+    with pytest.raises(ValueError):
+        encode_gorilla(timestamps, values)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param(b"", id="empty"),
+        pytest.param(b"\x02\x00\x00\x00" + bytes(8), id="truncated first sample"),
+        pytest.param(
+            encode_gorilla([1, 2, 4], [1.0, 2.0, 3.0])[:-3], id="truncated samples"
+        ),
+    ],
+)
+def test_decode_invalid(data: bytes):
+    """Ensures that corrupt data raises a ValueError."""
+
+    with pytest.raises(ValueError):
+        decode_gorilla(data)
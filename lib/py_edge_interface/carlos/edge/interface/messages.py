@@ -4,6 +4,7 @@ Carlos Edge device."""
 __all__ = [
     "CarlosMessage",
     "CarlosPayload",
+    "CompressedDriverTimeseries",
     "DeviceConfigPayload",
     "DeviceConfigResponsePayload",
     "DriverDataAckPayload",
@@ -13,16 +14,34 @@ __all__ = [
     "MessageType",
     "PingMessage",
     "PongMessage",
+    "WireFormat",
+    "select_wire_format",
 ]
 
+import base64
 import secrets
 import string
+import struct
 from abc import ABC
 from enum import Enum
-
-from pydantic import Field, ValidationError, model_validator
+from itertools import accumulate
+from operator import sub
+from typing import Iterable
+
+from pydantic import (
+    Field,
+    ValidationError,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
 
 from carlos.edge.interface.device.driver_config import DriverMetadata
+from carlos.edge.interface.gorilla import (
+    decode_gorilla,
+    encode_gorilla,
+    gorilla_sample_count,
+)
 from carlos.edge.interface.types import CarlosSchema
 
 
@@ -59,6 +78,44 @@ class MessageType(str, Enum):
     """Send by the server. This message is a response to a DRIVER_DATA message."""
 
 
+class WireFormat(str, Enum):
+    """Defines how the messages are encoded on the wire. The format is negotiated
+    per connection, the values are used as websocket subprotocols. The formats are
+    ordered from the most basic to the most capable one."""
+
+    TEXT = "carlos.text.v1"
+    """Each message is sent as text frame of the message type, optionally followed
+    by the separator and the JSON payload. This format is used as fallback, if no
+    other format could be negotiated."""
+
+    BINARY = "carlos.binary.v1"
+    """Each message is sent as binary frame, starting with a single byte that
+    identifies the message type. The samples of DRIVER_DATA messages are packed
+    with delta encoded timestamps and float32 values (float64 if a value exceeds
+    the range of float32), all other payloads are encoded as UTF-8 JSON."""
+
+    BINARY_DEFLATE = "carlos.binary-deflate.v1"
+    """Same as BINARY, but frames larger than the compression threshold are
+    compressed with deflate. See `carlos.edge.interface.compression`."""
+
+
+def select_wire_format(offered: Iterable[str]) -> WireFormat | None:
+    """Selects the wire format for a connection.
+
+    :param offered: The formats offered by the communication partner, ordered by
+        preference.
+    :return: The first supported format or None if none of the formats is supported.
+    """
+
+    for candidate in offered:
+        try:
+            return WireFormat(candidate)
+        except ValueError:
+            continue
+
+    return None
+
+
 class CarlosPayloadBase(CarlosSchema, ABC):
     """Common base class for all payload classes."""
 
@@ -155,6 +212,54 @@ class CarlosMessage(CarlosSchema):
         except ValidationError as e:
             raise ValueError(f"Invalid payload for message type {message_type}.") from e
 
+    def build_bytes(self) -> bytes:
+        """Builds the message in the binary wire format. See `WireFormat.BINARY`."""
+
+        frame = bytes((MESSAGE_TYPE_TO_CODE[self.message_type],))
+
+        if isinstance(self.payload, DriverDataPayload):
+            return frame + _pack_driver_data(self.payload)
+
+        if self.payload is None:
+            return frame
+
+        return frame + self.payload.model_dump_json(indent=None, by_alias=True).encode()
+
+    @classmethod
+    def from_bytes(cls, frame: bytes) -> "CarlosMessage":
+        """Parses a CarlosMessage from the binary wire format. See
+        `WireFormat.BINARY`."""
+
+        if not frame:
+            raise ValueError("Empty message.")
+
+        try:
+            message_type = CODE_TO_MESSAGE_TYPE[frame[0]]
+        except KeyError as err:
+            raise ValueError(f"Unsupported message type code: {frame[0]}") from err
+
+        model = MESSAGE_TYPE_TO_MODEL[message_type]
+
+        if model is None:
+            return cls(message_type=message_type, payload=None)
+
+        payload = frame[1:]
+        if not payload:
+            raise ValueError(f"Missing payload for message type {message_type}.")
+
+        try:
+            if model is DriverDataPayload:
+                return cls(
+                    message_type=message_type,
+                    payload=_unpack_driver_data(memoryview(payload)),
+                )
+            return cls(
+                message_type=message_type,
+                payload=model.model_validate_json(payload),
+            )
+        except (ValidationError, struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid payload for message type {message_type}.") from e
+
 
 PingMessage = None
 PongMessage = None
@@ -200,6 +305,69 @@ class DriverTimeseries(CarlosPayloadBase):
     )
 
 
+class CompressedDriverTimeseries(CarlosPayloadBase):
+    """A DriverTimeseries compressed with the Gorilla time series compression. The
+    timestamps are stored as delta-of-delta and the values are XORed with their
+    predecessor, see `carlos.edge.interface.gorilla`. This considerably reduces
+    the size of regularly sampled, slowly changing signals, while decompressing
+    them takes longer than parsing the plain samples."""
+
+    data: bytes = Field(
+        # we choose as short a possible alias to save bandwidth
+        ...,
+        alias="g",
+        description="The Gorilla compressed samples. Encoded as base64 in JSON.",
+    )
+
+    @field_validator("data", mode="before")
+    @classmethod
+    def decode_base64(cls, value):
+        """JSON does not support binary data, hence it is transferred as base64."""
+
+        if isinstance(value, str):
+            return base64.b64decode(value, validate=True)
+        return value
+
+    @field_serializer("data", when_used="json")
+    def encode_base64(self, value: bytes) -> str:
+        """JSON does not support binary data, hence it is transferred as base64."""
+
+        return base64.b64encode(value).decode("ascii")
+
+    @property
+    def sample_count(self) -> int:
+        """The number of samples in the compressed timeseries."""
+
+        return gorilla_sample_count(self.data)
+
+    @classmethod
+    def compress(cls, timeseries: DriverTimeseries) -> "CompressedDriverTimeseries":
+        """Compresses the given timeseries.
+
+        :param timeseries: The timeseries to compress.
+        :return: The compressed timeseries.
+        """
+
+        return cls(
+            data=encode_gorilla(
+                timestamps=timeseries.timestamps_utc, values=timeseries.values
+            )
+        )
+
+    def decompress(self) -> DriverTimeseries:
+        """Restores the original timeseries.
+
+        :return: The decompressed timeseries.
+        :raises ValueError: If the compressed data is corrupt.
+        """
+
+        timestamps_utc, values = decode_gorilla(self.data)
+        # the types are guaranteed by the encoding, no need to validate them
+        return DriverTimeseries.model_construct(
+            timestamps_utc=timestamps_utc, values=values
+        )
+
+
 class DriverDataPayload(CarlosPayloadBase):
     """Defines the payload of a DRIVER_DATA message."""
 
@@ -211,7 +379,7 @@ class DriverDataPayload(CarlosPayloadBase):
         description="The staging id of the Carlos Edge device.",
     )
 
-    data: dict[int, DriverTimeseries] = Field(
+    data: dict[int, DriverTimeseries | CompressedDriverTimeseries] = Field(
         # we choose as short a possible alias to save bandwidth
         ...,
         alias="d",
@@ -219,6 +387,38 @@ class DriverDataPayload(CarlosPayloadBase):
         "timeseries data.",
     )
 
+    def compress(self) -> "DriverDataPayload":
+        """Returns a copy of this payload with all timeseries compressed. See
+        `CompressedDriverTimeseries`."""
+
+        return self.model_copy(
+            update={
+                "data": {
+                    timeseries_id: (
+                        timeseries
+                        if isinstance(timeseries, CompressedDriverTimeseries)
+                        else CompressedDriverTimeseries.compress(timeseries)
+                    )
+                    for timeseries_id, timeseries in self.data.items()
+                }
+            }
+        )
+
+    def decompressed_data(self) -> dict[int, DriverTimeseries]:
+        """Returns the data of this payload with all timeseries decompressed.
+
+        :raises ValueError: If the compressed data of a timeseries is corrupt.
+        """
+
+        return {
+            timeseries_id: (
+                timeseries.decompress()
+                if isinstance(timeseries, CompressedDriverTimeseries)
+                else timeseries
+            )
+            for timeseries_id, timeseries in self.data.items()
+        }
+
 
 class DriverDataAckPayload(CarlosPayloadBase):
     """Defines the payload of a DRIVER_DATA_ACK message."""
@@ -255,6 +455,127 @@ class DeviceConfigResponsePayload(CarlosPayloadBase):
     )
 
 
+_DRIVER_DATA_HEADER = struct.Struct(f"<B{SID_SIZE}sH")
+"""The length of the staging id, the staging id and the number of timeseries."""
+
+_TIMESERIES_HEADER = struct.Struct("<IIccq")
+"""The timeseries id, the number of samples, the struct format of the timestamp
+deltas, the struct format of the values and the first timestamp. For compressed
+timeseries both formats are `_GORILLA_FORMAT` and the last field holds the size
+of the compressed data."""
+
+_GORILLA_FORMAT = b"g"
+"""Marks a timeseries that is stored as Gorilla compressed data."""
+
+
+def _pack_driver_data(payload: "DriverDataPayload") -> bytes:
+    """Packs the DRIVER_DATA payload. The timestamps of each timeseries are stored
+    as the first timestamp followed by the deltas to the respective previous one.
+    The values are stored as float32, unless a finite value exceeds the range of
+    float32. In this case the values of the timeseries are stored as float64.
+    Compressed timeseries are stored as is."""
+
+    staging_id = payload.staging_id.encode("ascii")
+    parts = [_DRIVER_DATA_HEADER.pack(len(staging_id), staging_id, len(payload.data))]
+
+    for timeseries_id, timeseries in payload.data.items():
+        if isinstance(timeseries, CompressedDriverTimeseries):
+            parts.append(
+                _TIMESERIES_HEADER.pack(
+                    timeseries_id,
+                    timeseries.sample_count,
+                    _GORILLA_FORMAT,
+                    _GORILLA_FORMAT,
+                    len(timeseries.data),
+                )
+            )
+            parts.append(timeseries.data)
+            continue
+
+        timestamps = timeseries.timestamps_utc
+        sample_count = len(timestamps)
+        deltas = list(map(sub, timestamps[1:], timestamps[:-1]))
+        # The deltas usually fit into 4 bytes, but we need to handle large gaps
+        delta_format = (
+            b"i"
+            if not deltas or -(2**31) <= min(deltas) <= max(deltas) < 2**31
+            else b"q"
+        )
+        value_format = b"f"
+        try:
+            values = struct.pack(f"<{sample_count}f", *timeseries.values)
+        except OverflowError:
+            value_format = b"d"
+            values = struct.pack(f"<{sample_count}d", *timeseries.values)
+
+        parts.append(
+            _TIMESERIES_HEADER.pack(
+                timeseries_id,
+                sample_count,
+                delta_format,
+                value_format,
+                timestamps[0] if timestamps else 0,
+            )
+        )
+        parts.append(struct.pack(f"<{len(deltas)}{delta_format.decode()}", *deltas))
+        parts.append(values)
+
+    return b"".join(parts)
+
+
+def _unpack_driver_data(data: memoryview) -> "DriverDataPayload":
+    """Unpacks a DRIVER_DATA payload packed by `_pack_driver_data()`."""
+
+    sid_length, staging_id, timeseries_count = _DRIVER_DATA_HEADER.unpack_from(data)
+    offset = _DRIVER_DATA_HEADER.size
+
+    timeseries_data: dict[int, DriverTimeseries | CompressedDriverTimeseries] = {}
+    for _ in range(timeseries_count):
+        timeseries_id, sample_count, delta_format, value_format, first_timestamp = (
+            _TIMESERIES_HEADER.unpack_from(data, offset)
+        )
+        offset += _TIMESERIES_HEADER.size
+
+        if delta_format == _GORILLA_FORMAT:
+            if not 0 <= first_timestamp <= len(data) - offset:
+                raise ValueError("Truncated compressed timeseries.")
+            # the data is decompressed by the receiver when it is processed
+            timeseries_data[timeseries_id] = CompressedDriverTimeseries.model_construct(
+                data=bytes(data[offset : offset + first_timestamp])
+            )
+            offset += first_timestamp
+            continue
+
+        deltas_struct = struct.Struct(
+            f"<{max(sample_count - 1, 0)}{delta_format.decode('ascii')}"
+        )
+        deltas = deltas_struct.unpack_from(data, offset)
+        offset += deltas_struct.size
+
+        if value_format not in (b"f", b"d"):
+            raise ValueError(f"Unsupported value format: {value_format!r}")
+        values_struct = struct.Struct(f"<{sample_count}{value_format.decode()}")
+        values = values_struct.unpack_from(data, offset)
+        offset += values_struct.size
+
+        # the types are guaranteed by the packed layout, no need to validate them
+        timeseries_data[timeseries_id] = DriverTimeseries.model_construct(
+            timestamps_utc=(
+                list(accumulate(deltas, initial=first_timestamp))
+                if sample_count
+                else []
+            ),
+            values=list(values),
+        )
+
+    if offset != len(data):
+        raise ValueError("Unexpected trailing data in DRIVER_DATA payload.")
+
+    return DriverDataPayload(
+        staging_id=staging_id[:sid_length].decode("ascii"), data=timeseries_data
+    )
+
+
 MESSAGE_TYPE_TO_MODEL: dict[MessageType, type[CarlosPayloadBase] | None] = {
     MessageType.PING: PingMessage,
     MessageType.PONG: PongMessage,
@@ -264,3 +585,17 @@ MESSAGE_TYPE_TO_MODEL: dict[MessageType, type[CarlosPayloadBase] | None] = {
     MessageType.DRIVER_DATA: DriverDataPayload,
     MessageType.DRIVER_DATA_ACK: DriverDataAckPayload,
 }
+
+MESSAGE_TYPE_TO_CODE: dict[MessageType, int] = {
+    MessageType.PING: 0,
+    MessageType.PONG: 1,
+    MessageType.EDGE_VERSION: 2,
+    MessageType.DEVICE_CONFIG: 3,
+    MessageType.DEVICE_CONFIG_RESPONSE: 4,
+    MessageType.DRIVER_DATA: 5,
+    MessageType.DRIVER_DATA_ACK: 6,
+}
+"""The codes identifying the message types in the binary wire format. The codes
+must never be changed, as they are part of the wire format."""
+
+CODE_TO_MESSAGE_TYPE = {code: type_ for type_, code in MESSAGE_TYPE_TO_CODE.items()}
@@ -1,14 +1,22 @@
 import pytest
 
 from carlos.edge.interface.messages import (
+    MESSAGE_TYPE_TO_CODE,
     MESSAGE_TYPE_TO_MODEL,
     SID_SIZE,
     CarlosMessage,
     CarlosPayload,
     CarlosSchema,
+    CompressedDriverTimeseries,
+    DeviceConfigResponsePayload,
+    DriverDataAckPayload,
+    DriverDataPayload,
+    DriverTimeseries,
     EdgeVersionPayload,
     MessageType,
+    WireFormat,
     generate_staging_id,
+    select_wire_format,
 )
 
 
@@ -19,6 +27,14 @@ def test_all_message_types_have_model(message_type: MessageType):
     assert message_type in MESSAGE_TYPE_TO_MODEL, f"Missing model for {message_type}"
 
 
+@pytest.mark.parametrize("message_type", list(MessageType))
+def test_all_message_types_have_code(message_type: MessageType):
+    """This test ensures that all message types can be sent in the binary format."""
+
+    assert message_type in MESSAGE_TYPE_TO_CODE, f"Missing code for {message_type}"
+    assert len(set(MESSAGE_TYPE_TO_CODE.values())) == len(MESSAGE_TYPE_TO_CODE)
+
+
 class NonUsedPayload(CarlosSchema):
     """A payload that is not used in the message types."""
 
@@ -96,6 +112,229 @@ class TestCarlosMessage:
             CarlosMessage.from_str(transport_layer_payload)
 
 
+class TestBinaryWireFormat:
+    """This test class tests the binary wire format of the CarlosMessage."""
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            pytest.param(
+                CarlosMessage(message_type=MessageType.PING, payload=None),
+                id="message without payload",
+            ),
+            pytest.param(
+                CarlosMessage(
+                    message_type=MessageType.DEVICE_CONFIG_RESPONSE,
+                    payload=DeviceConfigResponsePayload(
+                        timeseries_index={"driver": {"signal": 42}}
+                    ),
+                ),
+                id="json payload",
+            ),
+            pytest.param(
+                CarlosMessage(
+                    message_type=MessageType.DRIVER_DATA_ACK,
+                    payload=DriverDataAckPayload(staging_id="abc123"),
+                ),
+                id="small payload",
+            ),
+            pytest.param(
+                CarlosMessage(
+                    message_type=MessageType.DRIVER_DATA,
+                    payload=DriverDataPayload(
+                        staging_id="abc123",
+                        data={
+                            1: DriverTimeseries(
+                                timestamps_utc=[
+                                    1_700_000_000 + 5 * i for i in range(50)
+                                ],
+                                values=[20.0 + 0.25 * i for i in range(50)],
+                            ),
+                            2: DriverTimeseries(timestamps_utc=[], values=[]),
+                            3: DriverTimeseries(
+                                timestamps_utc=[1_700_000_000], values=[-1.5]
+                            ),
+                            # deltas exceeding 4 bytes and timestamps out of order
+                            4_000_000_000: DriverTimeseries(
+                                timestamps_utc=[0, 2**40, 10, -(2**40)],
+                                values=[0.0, 1.0, 2.0, 3.0],
+                            ),
+                        },
+                    ),
+                ),
+                id="driver data",
+            ),
+        ],
+    )
+    def test_payload_conversion(self, message: CarlosMessage):
+        """This test ensures that the binary conversion functions are compatible."""
+
+        parsed = CarlosMessage.from_bytes(message.build_bytes())
+        assert parsed.message_type == message.message_type
+        assert parsed.payload == message.payload
+
+    def test_driver_data_is_compact(self):
+        """This test ensures that the binary format is smaller than the text format
+        and that the values are transmitted with float32 precision."""
+
+        values = [21.3 + 0.01 * i for i in range(250)]
+        message = CarlosMessage(
+            message_type=MessageType.DRIVER_DATA,
+            payload=DriverDataPayload(
+                data={
+                    42: DriverTimeseries(
+                        timestamps_utc=[1_700_000_000 + 5 * i for i in range(250)],
+                        values=values,
+                    )
+                }
+            ),
+        )
+
+        frame = message.build_bytes()
+        assert len(frame) < len(message.build()) / 2
+
+        parsed = CarlosMessage.from_bytes(frame)
+        assert isinstance(parsed.payload, DriverDataPayload)
+        assert parsed.payload.data[42].values == pytest.approx(values, rel=1e-6)
+
+    def test_driver_data_exceeding_float32(self):
+        """This test ensures that values exceeding the range of float32 are
+        transmitted with float64 precision instead of failing."""
+
+        values = [1.0, -1e300, float("inf"), 3.5e38]
+        message = CarlosMessage(
+            message_type=MessageType.DRIVER_DATA,
+            payload=DriverDataPayload(
+                data={
+                    42: DriverTimeseries(
+                        timestamps_utc=[1_700_000_000 + i for i in range(4)],
+                        values=values,
+                    ),
+                    43: DriverTimeseries(timestamps_utc=[1_700_000_000], values=[1.1]),
+                }
+            ),
+        )
+
+        parsed = CarlosMessage.from_bytes(message.build_bytes())
+        assert isinstance(parsed.payload, DriverDataPayload)
+        assert parsed.payload.data[42].values == values
+        assert parsed.payload.data[43].values == pytest.approx([1.1], rel=1e-6)
+
+    @pytest.mark.parametrize(
+        "frame",
+        [
+            pytest.param(b"", id="empty frame"),
+            pytest.param(b"\xff", id="invalid message type"),
+            pytest.param(bytes((2,)), id="missing payload"),
+            pytest.param(bytes((2,)) + b'{"some_attr": "2.3.1"}', id="wrong format"),
+            pytest.param(bytes((5,)) + b"\x06abc", id="truncated driver data"),
+            pytest.param(
+                CarlosMessage(
+                    message_type=MessageType.DRIVER_DATA,
+                    payload=DriverDataPayload(
+                        data={1: DriverTimeseries(timestamps_utc=[1], values=[1.0])}
+                    ).compress(),
+                ).build_bytes()[:-4],
+                id="truncated compressed driver data",
+            ),
+        ],
+    )
+    def test_from_bytes(self, frame: bytes):
+        """This test ensures that invalid binary frames raise a ValueError."""
+
+        with pytest.raises(ValueError):
+            CarlosMessage.from_bytes(frame)
+
+
+class TestCompressedDriverTimeseries:
+    """This test class tests the Gorilla compressed DriverTimeseries."""
+
+    PAYLOAD = DriverDataPayload(
+        staging_id="abc123",
+        data={
+            1: DriverTimeseries(
+                timestamps_utc=[1_700_000_000 + 5 * i for i in range(250)],
+                values=[21.3 + 0.1 * (i // 25) for i in range(250)],
+            ),
+            2: DriverTimeseries(timestamps_utc=[], values=[]),
+        },
+    )
+
+    @pytest.mark.parametrize("binary", [False, True], ids=["text", "binary"])
+    def test_payload_conversion(self, binary: bool):
+        """This test ensures that the compressed payload survives both wire formats
+        and is restored without loss of precision."""
+
+        message = CarlosMessage(
+            message_type=MessageType.DRIVER_DATA, payload=self.PAYLOAD.compress()
+        )
+
+        if binary:
+            parsed = CarlosMessage.from_bytes(message.build_bytes())
+        else:
+            parsed = CarlosMessage.from_str(message.build())
+
+        assert isinstance(parsed.payload, DriverDataPayload)
+        assert all(
+            isinstance(timeseries, CompressedDriverTimeseries)
+            for timeseries in parsed.payload.data.values()
+        )
+        assert parsed.payload.staging_id == self.PAYLOAD.staging_id
+        assert parsed.payload.decompressed_data() == self.PAYLOAD.data
+
+    def test_compression_ratio(self):
+        """This test ensures that regularly sampled, slowly changing signals are
+        compressed substantially in both wire formats."""
+
+        plain = CarlosMessage(
+            message_type=MessageType.DRIVER_DATA, payload=self.PAYLOAD
+        )
+        compressed = CarlosMessage(
+            message_type=MessageType.DRIVER_DATA, payload=self.PAYLOAD.compress()
+        )
+
+        assert len(compressed.build()) * 10 < len(plain.build())
+        assert len(compressed.build_bytes()) * 5 < len(plain.build_bytes())
+
+    def test_mixed_payload(self):
+        """This test ensures that compressed and plain timeseries can be mixed."""
+
+        payload = DriverDataPayload(
+            data={
+                1: CompressedDriverTimeseries.compress(self.PAYLOAD.data[1]),
+                2: DriverTimeseries(timestamps_utc=[1], values=[2.0]),
+            }
+        )
+
+        assert payload.compress().decompressed_data() == payload.decompressed_data()
+        assert payload.decompressed_data()[1] == self.PAYLOAD.data[1]
+
+    def test_invalid_base64(self):
+        """This test ensures that invalid base64 data is rejected."""
+
+        with pytest.raises(ValueError):
+            CompressedDriverTimeseries.model_validate_json('{"g": "not base64!"}')
+
+
+@pytest.mark.parametrize(
+    "offered, expected",
+    [
+        pytest.param([], None, id="nothing offered"),
+        pytest.param(["unknown"], None, id="unsupported format"),
+        pytest.param(
+            ["unknown", WireFormat.BINARY.value, WireFormat.TEXT.value],
+            WireFormat.BINARY,
+            id="first supported format",
+        ),
+        pytest.param([WireFormat.TEXT.value], WireFormat.TEXT, id="text only"),
+    ],
+)
+def test_select_wire_format(offered: list[str], expected: WireFormat | None):
+    """This test ensures that the preferred supported wire format is selected."""
+
+    assert select_wire_format(offered) == expected
+
+
 def test_generate_staging_id():
     """This test ensures that the staging_id is generated correctly."""
 
@@ -4,7 +4,7 @@ from asyncio import Queue, QueueEmpty, sleep
 
 import pytest
 
-from carlos.edge.interface import CarlosMessage, EdgeProtocol
+from carlos.edge.interface import CarlosMessage, EdgeProtocol, WireFormat
 from carlos.edge.interface.protocol import (
     EdgeConnectionDisconnected,
     EdgeProtocolCallback,
@@ -18,13 +18,16 @@ class EdgeProtocolTestingConnection(EdgeProtocol):
 
     def __init__(
         self,
-        send_queue: Queue[str],
-        receive_queue: Queue[str],
+        send_queue: Queue[str | bytes],
+        receive_queue: Queue[str | bytes],
         on_connect: EdgeProtocolCallback | None = None,
+        wire_format: WireFormat = WireFormat.TEXT,
     ):
 
         super().__init__(on_connect=on_connect)
 
+        self.wire_format = wire_format
+
         self._send_queue = send_queue
         self._receive_queue = receive_queue
 
@@ -55,7 +58,7 @@ class EdgeProtocolTestingConnection(EdgeProtocol):
 
         :param message: The message to send.
         """
-        await self._send_queue.put(message.build())
+        await self._send_queue.put(self.encode(message))
 
     async def receive(self) -> CarlosMessage:
         """Receive data from the other end of the connection.
@@ -71,7 +74,7 @@ class EdgeProtocolTestingConnection(EdgeProtocol):
             except QueueEmpty:
                 await sleep(0.1)
                 continue
-            return CarlosMessage.from_str(message)
+            return self.decode(message)
 
         raise EdgeConnectionDisconnected("Connection was disconnected.")
 
@@ -85,8 +88,8 @@ def fixture_edge_testing_protocol() -> (
     :return: A tuple with the server and client protocol.
     """
 
-    server_queue: Queue[str] = Queue()
-    client_queue: Queue[str] = Queue()
+    server_queue: Queue[str | bytes] = Queue()
+    client_queue: Queue[str | bytes] = Queue()
 
     server = EdgeProtocolTestingConnection(
         send_queue=server_queue, receive_queue=client_queue
@@ -14,12 +14,15 @@ __all__ = [
 
 import inspect
 from abc import ABC, abstractmethod
-from asyncio import sleep
-from typing import Awaitable, Callable, Protocol, runtime_checkable
+from asyncio import CancelledError, Queue, Task, create_task, gather, timeout
+from functools import lru_cache
+from types import MethodType
+from typing import Awaitable, Callable, ClassVar, Protocol, runtime_checkable
 
 from loguru import logger
 
-from .messages import CarlosMessage, MessageType
+from .compression import CompressionStatistics, compress_frame, decompress_frame
+from .messages import CarlosMessage, MessageType, WireFormat
 from .types import DeviceId
 
 
@@ -33,6 +36,15 @@ class EdgeConnectionFailed(Exception):
 
 EdgeProtocolCallback = Callable[["EdgeProtocol"], Awaitable[None]]
 
+MAX_PENDING_MESSAGES = 64
+"""The maximum number of received messages per message type that wait for their
+handler. Once reached, no further messages are received from the connection until
+the handler caught up."""
+
+PENDING_MESSAGES_DRAIN_TIMEOUT = 10.0
+"""The maximum number of seconds to wait for the handlers to process the received
+messages, once the connection has been disconnected."""
+
 
 class EdgeProtocol(ABC):
     """An abstract protocol that defines the necessary operations to be implemented
@@ -41,6 +53,52 @@ class EdgeProtocol(ABC):
     def __init__(self, on_connect: EdgeProtocolCallback | None = None):
         self.on_connect = on_connect
 
+        self.wire_format = WireFormat.TEXT
+        """The format used to encode the outgoing messages. Implementations update
+        it, once the format has been negotiated with the communication partner."""
+
+        self.sent_statistics = CompressionStatistics()
+        """The statistics of the binary frames sent to the communication partner."""
+
+        self.received_statistics = CompressionStatistics()
+        """The statistics of the binary frames received from the communication
+        partner."""
+
+    def encode(self, message: CarlosMessage) -> str | bytes:
+        """Encodes the message in the negotiated wire format.
+
+        :param message: The message to encode.
+        :return: A text frame for the text format, a binary frame otherwise.
+        """
+
+        if self.wire_format == WireFormat.TEXT:
+            return message.build()
+
+        frame = message.build_bytes()
+        wire_frame = frame
+        if self.wire_format == WireFormat.BINARY_DEFLATE:
+            wire_frame = compress_frame(frame)
+
+        self.sent_statistics.record(raw_size=len(frame), wire_size=len(wire_frame))
+        return wire_frame
+
+    def decode(self, frame: str | bytes) -> CarlosMessage:
+        """Decodes a message received from the wire. Text frames are parsed in the
+        text format, binary frames in the binary format. Compressed frames are
+        decompressed.
+
+        :param frame: The received frame.
+        :return: The decoded message.
+        :raises ValueError: If the frame is not a valid message.
+        """
+
+        if isinstance(frame, str):
+            return CarlosMessage.from_str(frame)
+
+        raw_frame = decompress_frame(frame)
+        self.received_statistics.record(raw_size=len(raw_frame), wire_size=len(frame))
+        return CarlosMessage.from_bytes(raw_frame)
+
     @abstractmethod
     async def send(self, message: CarlosMessage) -> None:
         """Send data to the other end of the connection.
@@ -90,8 +148,59 @@ class MessageHandler(Protocol):
         raise NotImplementedError()
 
 
+async def handle_ping(protocol: EdgeProtocol, message: CarlosMessage):
+    """Handles the incoming ping message by responding with a pong."""
+    await protocol.send(CarlosMessage(message_type=MessageType.PONG, payload=None))
+
+
+async def handle_pong(protocol: EdgeProtocol, message: CarlosMessage):
+    """Handles the incoming pong message."""
+    logger.debug("Received pong message.")
+
+
 class EdgeCommunicationHandler:
-    """Handles the communication between the server and the device."""
+    """Handles the communication between the server and the device.
+
+    The handlers of a class are declared in `message_handlers`. They are merged
+    with the handlers of the base classes and validated once, when the class is
+    defined. Methods of the class can be used as handlers, they are bound to each
+    instance."""
+
+    message_handlers: ClassVar[dict[MessageType, Callable]] = {
+        MessageType.PING: handle_ping,
+        MessageType.PONG: handle_pong,
+    }
+    """The handlers of this class. Either functions matching the `MessageHandler`
+    protocol or methods of the class with the same signature."""
+
+    _handler_registry: ClassVar[
+        dict[MessageType, tuple[Callable[..., Awaitable[None]], bool]]
+    ]
+    """The validated handlers of the class and its base classes. Each handler is
+    stored along with whether it must be bound to the instance."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._build_handler_registry()
+
+    @classmethod
+    def _build_handler_registry(cls):
+        """Validates the `message_handlers` of this class and merges them with the
+        handlers of the base classes.
+
+        :raises TypeError: If a handler does not have the correct signature.
+        """
+
+        registry: dict[MessageType, tuple[Callable[..., Awaitable[None]], bool]] = {}
+        for base in reversed(cls.__mro__[1:]):
+            registry.update(getattr(base, "_handler_registry", {}))
+
+        for message_type, handler in cls.__dict__.get("message_handlers", {}).items():
+            validate_handler(message_type=message_type, handler=handler)
+            is_method = "self" in inspect.signature(handler).parameters
+            registry[message_type] = (handler, is_method)
+
+        cls._handler_registry = registry
 
     def __init__(self, protocol: EdgeProtocol, device_id: DeviceId):
         """Initializes the communication handler. The default implementation contains
@@ -102,46 +211,26 @@ class EdgeCommunicationHandler:
         self.protocol = protocol
         self.device_id = device_id
 
-        self._handlers: dict[MessageType, MessageHandler] = {}
+        self._handlers: dict[MessageType, Callable[..., Awaitable[None]]] = {
+            message_type: MethodType(handler, self) if is_method else handler
+            for message_type, (handler, is_method) in self._handler_registry.items()
+        }
         self._stopped = False
 
-        self.register_handlers(
-            {
-                MessageType.PING: handle_ping,
-                MessageType.PONG: handle_pong,
-            }
-        )
-
     def stop(self):
         """Stops the communication handler."""
         self._stopped = True
 
     def register_handlers(self, handlers: dict[MessageType, MessageHandler]):
-        """Registers the given handlers.
+        """Registers additional handlers for this instance only. Prefer declaring
+        the handlers in `message_handlers` of the class.
 
         :param handlers: The handlers to register.
+        :raises TypeError: If a handler does not have the correct signature.
         """
 
-        expected_function_params = dict(
-            inspect.signature(MessageHandler.__call__).parameters
-        )
-        expected_function_params.pop("self", None)
-
         for message_type, handler in handlers.items():
-            # instance checks won't work, so we check the signature of the function
-            # our self
-            handler_params = dict(inspect.signature(handler).parameters)
-            handler_params.pop("self", None)
-
-            # remove default parameters
-            # They are often used to testing purposes and should not be required
-            remove_default_args(handler_params)
-
-            if handler_params != expected_function_params:
-                raise TypeError(
-                    f"Handler {handler} for message type {message_type} "
-                    f"does not have the correct signature."
-                )
+            validate_handler(message_type=message_type, handler=handler)
 
         self._handlers.update(handlers)
 
@@ -156,7 +245,12 @@ class EdgeCommunicationHandler:
         await self.protocol.send(message)
 
     async def listen(self):
-        """Starts listening for incoming messages.
+        """Starts listening for incoming messages. The handlers of different message
+        types run concurrently, messages of the same type are handled in order.
+
+        Errors of the handlers are logged and do not stop listening, see
+        `_process_messages()`. Once the connection is disconnected, the messages
+        received so far are still handled, up to `PENDING_MESSAGES_DRAIN_TIMEOUT`.
 
         :raises EdgeConnectionDisconnected: If the connection is disconnected.
         """
@@ -164,10 +258,47 @@ class EdgeCommunicationHandler:
         if not self.protocol.is_connected:
             await self.protocol.connect()  # pragma: no cover
 
-        while not self._stopped:
-            msg = await self.protocol.receive()
-            await self.handle_message(msg)
-            await sleep(0.1)
+        # Each message type is processed by a dedicated worker. This way slow
+        # handlers do not block messages of other types, while the messages of
+        # each type are still handled in the order they were received.
+        queues: dict[MessageType, Queue[CarlosMessage]] = {}
+        workers: list[Task] = []
+        is_cancelled = False
+        try:
+            while not self._stopped:
+                msg = await self.protocol.receive()
+
+                if (queue := queues.get(msg.message_type)) is None:
+                    queue = Queue(maxsize=MAX_PENDING_MESSAGES)
+                    queues[msg.message_type] = queue
+                    workers.append(create_task(self._process_messages(queue)))
+
+                await queue.put(msg)
+        except CancelledError:
+            is_cancelled = True
+            raise
+        finally:
+            if not is_cancelled:
+                await _drain_queues(queues)
+            for worker in workers:
+                worker.cancel()
+            await gather(*workers, return_exceptions=True)
+
+    async def _process_messages(self, queue: Queue[CarlosMessage]):
+        """Handles the messages of the queue one after another. Errors of the
+        handlers are logged, they do not stop the processing of further messages.
+
+        :param queue: The queue of received messages of a single message type.
+        """
+
+        while True:
+            msg = await queue.get()
+            try:
+                await self.handle_message(msg)
+            except Exception:
+                logger.exception(f"Failed to handle message: {msg.message_type}")
+            finally:
+                queue.task_done()
 
     async def handle_message(self, message: CarlosMessage):
         """Handles the incoming message.
@@ -186,6 +317,59 @@ class EdgeCommunicationHandler:
         )
 
 
+async def _drain_queues(queues: dict[MessageType, Queue[CarlosMessage]]):
+    """Waits until all messages of the queues have been handled, at most
+    `PENDING_MESSAGES_DRAIN_TIMEOUT` seconds.
+
+    :param queues: The queues of received messages by their message type.
+    """
+
+    try:
+        async with timeout(PENDING_MESSAGES_DRAIN_TIMEOUT):
+            await gather(*(queue.join() for queue in queues.values()))
+    except TimeoutError:
+        pending = sum(queue.qsize() for queue in queues.values())
+        logger.warning(f"Dropping {pending} received messages after the timeout.")
+
+
+def validate_handler(message_type: MessageType, handler: Callable):
+    """Ensures that the handler matches the `MessageHandler` protocol.
+
+    :param message_type: The message type the handler is registered for.
+    :param handler: The handler to validate.
+    :raises TypeError: If the handler does not have the correct signature.
+    """
+
+    # bound methods share the validation of their function
+    if not _has_handler_signature(getattr(handler, "__func__", handler)):
+        raise TypeError(
+            f"Handler {handler} for message type {message_type} "
+            f"does not have the correct signature."
+        )
+
+
+@lru_cache(maxsize=1024)
+def _has_handler_signature(handler: Callable) -> bool:
+    """Checks the signature of the handler. The result is cached, as inspecting
+    the signature is expensive."""
+
+    expected_function_params = dict(
+        inspect.signature(MessageHandler.__call__).parameters
+    )
+    expected_function_params.pop("self", None)
+
+    # instance checks won't work, so we check the signature of the function
+    # our self
+    handler_params = dict(inspect.signature(handler).parameters)
+    handler_params.pop("self", None)
+
+    # remove default parameters
+    # They are often used to testing purposes and should not be required
+    remove_default_args(handler_params)
+
+    return handler_params == expected_function_params
+
+
 def remove_default_args(handler_params):
     """Little helper function to remove function arguments with default values.
 
@@ -199,15 +383,8 @@ def remove_default_args(handler_params):
         handler_params.pop(default_param, None)  # pragma: no cover
 
 
-async def handle_ping(protocol: EdgeProtocol, message: CarlosMessage):
-    """Handles the incoming ping message by responding with a pong."""
-    await protocol.send(CarlosMessage(message_type=MessageType.PONG, payload=None))
-
-
-async def handle_pong(protocol: EdgeProtocol, message: CarlosMessage):
-    """Handles the incoming pong message."""
-    logger.debug("Received pong message.")
-
-
 PING = CarlosMessage(message_type=MessageType.PING, payload=None)
 PONG = CarlosMessage(message_type=MessageType.PONG, payload=None)
+
+
+EdgeCommunicationHandler._build_handler_registry()
@@ -14,6 +14,13 @@ from carlos.edge.interface import (
     EdgeCommunicationHandler,
     EdgeProtocol,
     MessageType,
+    WireFormat,
+)
+from carlos.edge.interface.messages import (
+    DriverDataAckPayload,
+    DriverDataPayload,
+    DriverTimeseries,
+    EdgeVersionPayload,
 )
 
 from .plugin_pytest import EdgeProtocolTestingConnection
@@ -152,3 +159,251 @@ class TestEdgeCommunicationHandler:
 
         with pytest.raises(TypeError):
             handler.register_handlers({MessageType.PING: too_many_args})
+
+
+async def test_binary_wire_format():
+    """Ensures that messages are exchanged as binary frames, if the binary wire
+    format is used by the connection."""
+
+    queue: Queue[str | bytes] = Queue()
+    sender = EdgeProtocolTestingConnection(
+        send_queue=queue, receive_queue=Queue(), wire_format=WireFormat.BINARY
+    )
+    receiver = EdgeProtocolTestingConnection(send_queue=Queue(), receive_queue=queue)
+
+    message = CarlosMessage(
+        message_type=MessageType.DRIVER_DATA,
+        payload=DriverDataPayload(
+            data={42: DriverTimeseries(timestamps_utc=[1, 2, 3], values=[1, 2, 3])}
+        ),
+    )
+    await sender.send(message)
+
+    frame = queue.get_nowait()
+    assert isinstance(frame, bytes)
+
+    queue.put_nowait(frame)
+    assert await receiver.receive() == message
+
+
+@pytest.mark.parametrize(
+    "wire_format", [WireFormat.TEXT, WireFormat.BINARY, WireFormat.BINARY_DEFLATE]
+)
+async def test_wire_formats(wire_format: WireFormat):
+    """Ensures that large messages are exchanged in each wire format and that only
+    the deflate format compresses them."""
+
+    queue: Queue[str | bytes] = Queue()
+    sender = EdgeProtocolTestingConnection(
+        send_queue=queue, receive_queue=Queue(), wire_format=wire_format
+    )
+    receiver = EdgeProtocolTestingConnection(send_queue=Queue(), receive_queue=queue)
+
+    message = CarlosMessage(
+        message_type=MessageType.DRIVER_DATA,
+        payload=DriverDataPayload(
+            data={
+                42: DriverTimeseries(
+                    timestamps_utc=list(range(0, 5000, 5)), values=[21.5] * 1000
+                )
+            }
+        ),
+    )
+    await sender.send(message)
+    await sender.send(CarlosMessage(message_type=MessageType.PING, payload=None))
+
+    assert await receiver.receive() == message
+    assert (await receiver.receive()).message_type == MessageType.PING
+
+    if wire_format == WireFormat.TEXT:
+        assert sender.sent_statistics.frames == 0
+        return
+
+    assert sender.sent_statistics.frames == 2
+    assert receiver.received_statistics.frames == 2
+    if wire_format == WireFormat.BINARY_DEFLATE:
+        # the ping is too small to be compressed
+        assert sender.sent_statistics.compressed_frames == 1
+        assert sender.sent_statistics.ratio > 10
+    else:
+        assert sender.sent_statistics.compressed_frames == 0
+        assert sender.sent_statistics.ratio == 1.0
+    assert receiver.received_statistics == sender.sent_statistics
+
+
+def test_decode_text_frame():
+    """Ensures that text frames are understood, regardless of the negotiated wire
+    format."""
+
+    protocol = EdgeProtocolTestingConnection(
+        send_queue=Queue(), receive_queue=Queue(), wire_format=WireFormat.BINARY
+    )
+
+    assert protocol.decode("ping") == CarlosMessage(
+        message_type=MessageType.PING, payload=None
+    )
+
+
+async def test_listen_dispatches_concurrently(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+):
+    """Ensures that a slow handler does not block the messages of other types, that
+    messages of the same type are handled in order and that a failing handler does
+    not stop the processing of further messages."""
+
+    server_connection, client_connection = edge_testing_protocol
+    handler = EdgeCommunicationHandler(protocol=server_connection, device_id=uuid4())
+
+    version_received = asyncio.Event()
+    handled_staging_ids: list[str] = []
+
+    async def handle_edge_version(protocol: EdgeProtocol, message: CarlosMessage):
+        version_received.set()
+
+    async def handle_driver_data_ack(protocol: EdgeProtocol, message: CarlosMessage):
+        payload = DriverDataAckPayload.model_validate(message.payload)
+        if not handled_staging_ids:
+            # blocks until a message of another type has been handled
+            await asyncio.wait_for(version_received.wait(), timeout=5)
+        await asyncio.sleep(random.uniform(0, 0.01))
+        handled_staging_ids.append(payload.staging_id)
+        if payload.staging_id == "fail":
+            raise RuntimeError("Handler failed.")
+
+    handler.register_handlers(
+        {
+            MessageType.EDGE_VERSION: handle_edge_version,
+            MessageType.DRIVER_DATA_ACK: handle_driver_data_ack,
+        }
+    )
+
+    staging_ids = ["fail"] + [f"sid{i:03d}" for i in range(20)]
+    for staging_id in staging_ids:
+        await client_connection.send(
+            CarlosMessage(
+                message_type=MessageType.DRIVER_DATA_ACK,
+                payload=DriverDataAckPayload(staging_id=staging_id),
+            )
+        )
+    await client_connection.send(
+        CarlosMessage(
+            message_type=MessageType.EDGE_VERSION,
+            payload=EdgeVersionPayload(version="1.0.0"),
+        )
+    )
+
+    listen_task = asyncio.create_task(handler.listen())
+    try:
+        async with asyncio.timeout(5):
+            while len(handled_staging_ids) < len(staging_ids):
+                await asyncio.sleep(0.01)
+    finally:
+        server_connection.disconnect()
+        with pytest.raises(EdgeConnectionDisconnected):
+            await listen_task
+
+    assert handled_staging_ids == staging_ids
+
+
+async def test_listen_drains_on_disconnect(
+    edge_testing_protocol: tuple[
+        EdgeProtocolTestingConnection, EdgeProtocolTestingConnection
+    ],
+):
+    """Ensures that the messages received before the connection is disconnected
+    are still handled, and that a failing handler does not end listening, but is
+    logged instead."""
+
+    server_connection, client_connection = edge_testing_protocol
+    handler = EdgeCommunicationHandler(protocol=server_connection, device_id=uuid4())
+
+    first_handled = asyncio.Event()
+    handled_staging_ids: list[str] = []
+
+    async def handle_driver_data_ack(protocol: EdgeProtocol, message: CarlosMessage):
+        payload = DriverDataAckPayload.model_validate(message.payload)
+        first_handled.set()
+        await asyncio.sleep(0.05)
+        handled_staging_ids.append(payload.staging_id)
+        if payload.staging_id == "fail":
+            raise RuntimeError("Handler failed.")
+
+    handler.register_handlers({MessageType.DRIVER_DATA_ACK: handle_driver_data_ack})
+
+    staging_ids = ["fail", "sid1", "sid2", "sid3"]
+    for staging_id in staging_ids:
+        await client_connection.send(
+            CarlosMessage(
+                message_type=MessageType.DRIVER_DATA_ACK,
+                payload=DriverDataAckPayload(staging_id=staging_id),
+            )
+        )
+
+    listen_task = asyncio.create_task(handler.listen())
+    await asyncio.wait_for(first_handled.wait(), timeout=5)
+
+    # all messages have been received, but most of them are still queued
+    while not client_connection._send_queue.empty():
+        await asyncio.sleep(0.01)
+    server_connection.disconnect()
+    with pytest.raises(EdgeConnectionDisconnected):
+        await asyncio.wait_for(listen_task, timeout=5)
+
+    assert handled_staging_ids == staging_ids
+
+
+class TestHandlerRegistry:
+    """Tests the class level registry of the message handlers."""
+
+    def test_subclass_handlers(self, monkeypatch: pytest.MonkeyPatch):
+        """Ensures that the handlers of a subclass are merged with the ones of the
+        base class, that methods are bound to the instance and that the signatures
+        are not inspected again for each instance."""
+
+        async def handle_edge_version(protocol: EdgeProtocol, message: CarlosMessage):
+            pass
+
+        class CustomHandler(EdgeCommunicationHandler):
+
+            async def handle_pong(self, protocol: EdgeProtocol, message: CarlosMessage):
+                pass
+
+            message_handlers = {
+                MessageType.EDGE_VERSION: handle_edge_version,
+                MessageType.PONG: handle_pong,
+            }
+
+        def fail_signature(*args, **kwargs):
+            raise AssertionError("The signature must not be inspected again.")
+
+        monkeypatch.setattr("inspect.signature", fail_signature)
+
+        protocol = EdgeProtocolTestingConnection(
+            send_queue=Queue(), receive_queue=Queue()
+        )
+        handler = CustomHandler(protocol=protocol, device_id=uuid4())
+        other_handler = CustomHandler(protocol=protocol, device_id=uuid4())
+
+        assert handler._handlers[MessageType.PING] is handle_ping
+        assert handler._handlers[MessageType.EDGE_VERSION] is handle_edge_version
+        assert handler._handlers[MessageType.PONG] == handler.handle_pong
+        assert other_handler._handlers[MessageType.PONG] == other_handler.handle_pong
+
+        # the base class is not affected
+        base_handler = EdgeCommunicationHandler(protocol=protocol, device_id=uuid4())
+        assert base_handler._handlers[MessageType.PONG] is handle_pong
+        assert MessageType.EDGE_VERSION not in base_handler._handlers
+
+    def test_invalid_subclass_handler(self):
+        """Ensures that invalid handlers are rejected when the class is defined."""
+
+        with pytest.raises(TypeError):
+
+            class InvalidHandler(EdgeCommunicationHandler):
+
+                async def handle_ping(self, protocol: EdgeProtocol):
+                    pass
+
+                message_handlers = {MessageType.PING: handle_ping}
@@ -0,0 +1,97 @@
+"""Compares the plain and the Gorilla compressed driver data by the size of the
+messages and the time to parse and decompress them. Run it from the root of the
+package:
+
+    python -m tests.benchmark_gorilla
+"""
+
+import math
+import random
+import time
+from typing import Callable
+
+from carlos.edge.interface.messages import (
+    CarlosMessage,
+    DriverDataPayload,
+    DriverTimeseries,
+    MessageType,
+)
+
+SAMPLE_COUNT = 10_000
+"""The number of samples of the timeseries."""
+
+REPEAT = 20
+"""The number of runs per message, the fastest one is reported."""
+
+PROFILES: dict[str, Callable[[random.Random, int], tuple[int, float]]] = {
+    "constant": lambda rng, idx: (1_700_000_000 + 5 * idx, 21.5),
+    "slow steps": lambda rng, idx: (
+        1_700_000_000 + 5 * idx,
+        21.3 + 0.1 * (idx // 25),
+    ),
+    "rounded sensor": lambda rng, idx: (
+        1_700_000_000 + 5 * idx + rng.randint(0, 2),
+        round(20 + math.sin(idx / 50), 1),
+    ),
+    "noisy sensor": lambda rng, idx: (
+        1_700_000_000 + 5 * idx,
+        round(20 + math.sin(idx / 500) + rng.gauss(0, 0.01), 2),
+    ),
+}
+"""The timestamp and value of each sample by the name of the profile."""
+
+
+def _measure(parse: Callable[[], CarlosMessage]) -> float:
+    """Returns the fastest time in seconds to parse the message and to decompress
+    its data."""
+
+    durations = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        payload = parse().payload
+        assert isinstance(payload, DriverDataPayload)
+        payload.decompressed_data()
+        durations.append(time.perf_counter() - start)
+
+    return min(durations)
+
+
+def main():
+    print(
+        f"{'profile':>14} | {'format':>6} | {'plain size':>10} | {'gorilla size':>12}"
+        f" | {'plain parse':>11} | {'gorilla parse':>13}"
+    )
+
+    for name, sample_of in PROFILES.items():
+        rng = random.Random(42)
+        timestamps, values = zip(*(sample_of(rng, idx) for idx in range(SAMPLE_COUNT)))
+        plain = CarlosMessage(
+            message_type=MessageType.DRIVER_DATA,
+            payload=DriverDataPayload(
+                data={
+                    1: DriverTimeseries(
+                        timestamps_utc=list(timestamps), values=list(values)
+                    )
+                }
+            ),
+        )
+        assert isinstance(plain.payload, DriverDataPayload)
+        compressed = plain.model_copy(update={"payload": plain.payload.compress()})
+
+        for wire_format, build, parse in (
+            ("text", CarlosMessage.build, CarlosMessage.from_str),
+            ("binary", CarlosMessage.build_bytes, CarlosMessage.from_bytes),
+        ):
+            plain_frame, compressed_frame = build(plain), build(compressed)
+            plain_duration = _measure(lambda: parse(plain_frame))
+            compressed_duration = _measure(lambda: parse(compressed_frame))
+
+            print(
+                f"{name:>14} | {wire_format:>6} | {len(plain_frame):>10}"
+                f" | {len(compressed_frame):>12} | {plain_duration * 1000:>8.2f} ms"
+                f" | {compressed_duration * 1000:>10.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
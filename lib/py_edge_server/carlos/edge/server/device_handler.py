@@ -1,23 +1,18 @@
 __all__ = ["ServerEdgeCommunicationHandler"]
 
+from contextvars import ContextVar
 from datetime import UTC, datetime
+from typing import ClassVar
 
-from carlos.database.connection import get_async_carlos_db_connection
 from carlos.database.context import RequestContext
-from carlos.database.data.timeseries import add_timeseries
+from carlos.database.data.timeseries import add_timeseries_bulk
 from carlos.database.device import (
-    CarlosDeviceDriverCreate,
-    CarlosDeviceSignalCreate,
-    create_device_driver,
-    create_device_signals,
-    get_device_drivers,
-    get_device_signals,
-    set_device_seen,
+    get_cached_device_timeseries_index,
+    resolve_device_timeseries_index,
 )
 from carlos.edge.interface import (
     CarlosMessage,
     DeviceConfigPayload,
-    DeviceId,
     EdgeCommunicationHandler,
     EdgeProtocol,
     MessageType,
@@ -28,37 +23,46 @@ from carlos.edge.interface.messages import (
     DriverDataPayload,
 )
 
-from carlos.edge.server.constants import CLIENT_NAME
+from carlos.edge.server.last_seen import LAST_SEEN_AGGREGATOR, LastSeenAggregator
+from carlos.edge.server.unit_of_work import MessageUnitOfWork
+
+_UNIT_OF_WORK: ContextVar[MessageUnitOfWork] = ContextVar("unit_of_work")
+"""The unit of work of the message handled by the current task. Messages of
+different types are handled concurrently, hence it can't be stored in the
+handler instance."""
 
 
 class ServerEdgeCommunicationHandler(EdgeCommunicationHandler):
     """Special server side implementation of the EdgeCommunicationHandler."""
 
-    def __init__(self, device_id: DeviceId, protocol: EdgeProtocol):
-        super().__init__(device_id=device_id, protocol=protocol)
-
-        self.register_handlers(
-            {
-                MessageType.DEVICE_CONFIG: self.handle_device_config,
-                MessageType.DRIVER_DATA: self.handle_driver_data,
-            }
-        )
+    last_seen_aggregator: ClassVar[LastSeenAggregator] = LAST_SEEN_AGGREGATOR
+    """Collects the last seen timestamps, which are written to the database
+    periodically instead of with each message."""
 
     async def handle_message(self, message: CarlosMessage):
-        """Handles the incoming message.
+        """Handles the incoming message. All database operations performed while
+        handling the message share a single connection.
 
         :param message: The incoming message.
         """
 
         # make sure that each message from the device marks the device as seen
-        async with get_async_carlos_db_connection(
-            client_name=CLIENT_NAME
-        ) as connection:
-            await set_device_seen(
-                context=RequestContext(connection=connection), device_id=self.device_id
-            )
+        self.last_seen_aggregator.record(device_id=self.device_id)
 
-        await super().handle_message(message)
+        async with MessageUnitOfWork() as unit_of_work:
+            token = _UNIT_OF_WORK.set(unit_of_work)
+            try:
+                await super().handle_message(message)
+            finally:
+                _UNIT_OF_WORK.reset(token)
+
+    async def get_context(self) -> RequestContext:
+        """Returns the database context of the message that is currently handled.
+
+        :raises LookupError: If called outside of `handle_message()`.
+        """
+
+        return await _UNIT_OF_WORK.get().get_context()
 
     async def handle_device_config(
         self, protocol: EdgeProtocol, message: CarlosMessage
@@ -71,93 +75,25 @@ class ServerEdgeCommunicationHandler(EdgeCommunicationHandler):
 
         payload = DeviceConfigPayload.model_validate(message.payload)
 
-        async with get_async_carlos_db_connection(
-            client_name=CLIENT_NAME
-        ) as connection:
-            context = RequestContext(connection=connection)
-
-            await self._upsert_driver_metadata(context, payload)
-
-            response = await self._build_device_config_response(context)
-
-        await self.send(response)
-
-    async def _upsert_driver_metadata(
-        self, context: RequestContext, payload: DeviceConfigPayload
-    ):
-        """This functions inserts any new drivers and signals into the database."""
-
-        known_drivers = await get_device_drivers(
-            context=context, device_id=self.device_id
+        # the device metadata is only updated, if the config changed since the last
+        # connection of the device
+        timeseries_index = await get_cached_device_timeseries_index(
+            context=await self.get_context(),
+            device_id=self.device_id,
+            drivers=payload.drivers,
         )
-        known_driver_index = {
-            driver.driver_identifier: driver for driver in known_drivers
-        }
-        for driver in payload.drivers:
-            if driver.identifier not in known_driver_index:
-                _ = await create_device_driver(
-                    context=context,
-                    device_id=self.device_id,
-                    driver=CarlosDeviceDriverCreate(
-                        display_name=driver.identifier,
-                        is_visible_on_dashboard=True,
-                        driver_identifier=driver.identifier,
-                        direction=driver.direction,
-                        driver_module=driver.driver_module,
-                    ),
-                )
-
-            known_signals = await get_device_signals(
-                context=context,
+        if timeseries_index is None:
+            timeseries_index = await resolve_device_timeseries_index(
+                context=await self.get_context(),
                 device_id=self.device_id,
-                driver_identifier=driver.identifier,
+                drivers=payload.drivers,
             )
-            known_signal_index = {
-                signal.signal_identifier: signal for signal in known_signals
-            }
-
-            signals = []
-            for signal in driver.signals:
-                if signal.signal_identifier not in known_signal_index:
-                    signals.append(
-                        CarlosDeviceSignalCreate(
-                            signal_identifier=signal.signal_identifier,
-                            display_name=signal.signal_identifier,
-                            unit_of_measurement=signal.unit_of_measurement,
-                            is_visible_on_dashboard=True,
-                        )
-                    )
-            if signals:
-                await create_device_signals(
-                    context=context,
-                    device_id=self.device_id,
-                    driver_identifier=driver.identifier,
-                    signals=signals,
-                )
-
-    async def _build_device_config_response(
-        self, context: RequestContext
-    ) -> CarlosMessage:
-        """Builds the DEVICE_CONFIG_RESPONSE message."""
 
-        timeseries_index: dict[str, dict[str, int]] = {}
-        update_drivers = await get_device_drivers(
-            context=context, device_id=self.device_id
-        )
-        for driver_ in update_drivers:
-            updated_signals = await get_device_signals(
-                context=context,
-                device_id=self.device_id,
-                driver_identifier=driver_.driver_identifier,
+        await self.send(
+            CarlosMessage(
+                message_type=MessageType.DEVICE_CONFIG_RESPONSE,
+                payload=DeviceConfigResponsePayload(timeseries_index=timeseries_index),
             )
-            for signal_ in updated_signals:
-                timeseries_index.setdefault(driver_.driver_identifier, {})[
-                    signal_.signal_identifier
-                ] = signal_.timeseries_id
-
-        return CarlosMessage(
-            message_type=MessageType.DEVICE_CONFIG_RESPONSE,
-            payload=DeviceConfigResponsePayload(timeseries_index=timeseries_index),
         )
 
     async def handle_driver_data(
@@ -172,21 +108,20 @@ class ServerEdgeCommunicationHandler(EdgeCommunicationHandler):
         """
 
         driver_data = DriverDataPayload.model_validate(message.payload)
-
-        async with get_async_carlos_db_connection(
-            client_name=CLIENT_NAME
-        ) as connection:
-            context = RequestContext(connection=connection)
-
-            for timeseries_id, driver_timeseries in driver_data.data.items():
-                await add_timeseries(
-                    context=context,
-                    timeseries_id=timeseries_id,
-                    timestamps=convert_timestamps_to_datetime(
-                        driver_timeseries.timestamps_utc
-                    ),
-                    values=driver_timeseries.values,
+        # the device usually sends Gorilla compressed timeseries
+        timeseries_data = driver_data.decompressed_data()
+
+        # the data is committed before it is acknowledged
+        await add_timeseries_bulk(
+            context=await self.get_context(),
+            series={
+                timeseries_id: (
+                    convert_timestamps_to_datetime(driver_timeseries.timestamps_utc),
+                    driver_timeseries.values,
                 )
+                for timeseries_id, driver_timeseries in timeseries_data.items()
+            },
+        )
 
         await self.send(
             CarlosMessage(
@@ -195,6 +130,11 @@ class ServerEdgeCommunicationHandler(EdgeCommunicationHandler):
             )
         )
 
+    message_handlers = {
+        MessageType.DEVICE_CONFIG: handle_device_config,
+        MessageType.DRIVER_DATA: handle_driver_data,
+    }
+
 
 def convert_timestamps_to_datetime(utc_timestamps: list[int]) -> list[datetime]:
     """Converts a list of timestamps to a list of datetime objects.
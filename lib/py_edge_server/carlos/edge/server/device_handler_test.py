@@ -46,12 +46,14 @@ async def test_handle_message(
     """This method tests the effects of the handle_message method."""
 
     ping = CarlosMessage(message_type=MessageType.PING, payload=None)
+    aggregator = device_a_handler.last_seen_aggregator
 
     device_a_before = await get_device(
         context=async_carlos_db_context, device_id=DeviceId.DEVICE_A.value
     )
 
     await device_a_handler.handle_message(ping)
+    await aggregator.flush(context=async_carlos_db_context)
 
     device_a_after = await get_device(
         context=async_carlos_db_context, device_id=DeviceId.DEVICE_A.value
@@ -63,7 +65,19 @@ async def test_handle_message(
         device_a_before.last_seen_at != device_a_after.last_seen_at
     ), "Last seen was not updated."
 
+    # Multiple messages are coalesced until the next flush.
     await device_a_handler.handle_message(ping)
+    await device_a_handler.handle_message(ping)
+    assert aggregator.pending == 1
+
+    device_a_before_flush = await get_device(
+        context=async_carlos_db_context, device_id=DeviceId.DEVICE_A.value
+    )
+    assert (
+        device_a_before_flush.last_seen_at == device_a_after.last_seen_at
+    ), "Last seen must only be updated on flush."
+
+    assert await aggregator.flush(context=async_carlos_db_context) == 1
 
     device_a_after_second = await get_device(
         context=async_carlos_db_context, device_id=DeviceId.DEVICE_A.value
@@ -0,0 +1,117 @@
+"""This module contains the write-behind aggregation of the last seen timestamps of
+the connected devices."""
+
+__all__ = [
+    "LAST_SEEN_AGGREGATOR",
+    "LAST_SEEN_FLUSH_INTERVAL",
+    "LastSeenAggregator",
+]
+
+import asyncio
+from datetime import datetime, timedelta
+
+from carlos.database.connection import get_async_carlos_db_connection
+from carlos.database.context import RequestContext
+from carlos.database.device import set_devices_seen
+from carlos.database.utils import utcnow
+from carlos.edge.interface import DeviceId
+from loguru import logger
+
+from carlos.edge.server.constants import CLIENT_NAME
+
+LAST_SEEN_FLUSH_INTERVAL = timedelta(seconds=5)
+"""The interval in which the recorded last seen timestamps are written to the
+database."""
+
+
+class LastSeenAggregator:
+    """Collects the last seen timestamps of the devices in memory and writes them
+    to the database periodically.
+
+    Any number of messages received from a device within one flush interval
+    result in a single row update. All devices seen within the interval are
+    updated with a single statement."""
+
+    def __init__(self, client_name: str = CLIENT_NAME):
+        """Initializes the aggregator.
+
+        :param client_name: Used to identify the connection to the database.
+        """
+
+        self._client_name = client_name
+        self._pending: dict[DeviceId, datetime] = {}
+
+    @property
+    def pending(self) -> int:
+        """The number of devices whose last seen timestamp awaits the next flush."""
+
+        return len(self._pending)
+
+    def record(self, device_id: DeviceId, seen_at: datetime | None = None):
+        """Records that the device has been seen. Only the latest timestamp of each
+        device is kept until the next flush.
+
+        :param device_id: The device that has been seen.
+        :param seen_at: The time the device has been seen, defaults to now.
+        """
+
+        seen_at = seen_at or utcnow()
+        previous = self._pending.get(device_id)
+        if previous is None or seen_at > previous:
+            self._pending[device_id] = seen_at
+
+    async def flush(self, context: RequestContext | None = None) -> int:
+        """Writes the recorded timestamps to the database. If the update fails, the
+        timestamps are kept for the next flush.
+
+        :param context: Optional context to use, a new connection is created
+            otherwise.
+        :return: The number of updated devices.
+        """
+
+        if not self._pending:
+            return 0
+
+        seen, self._pending = self._pending, {}
+        try:
+            if context is not None:
+                await set_devices_seen(context=context, seen=seen)
+            else:
+                async with get_async_carlos_db_connection(
+                    client_name=self._client_name
+                ) as connection:
+                    await set_devices_seen(
+                        context=RequestContext(connection=connection), seen=seen
+                    )
+        except Exception:
+            # timestamps recorded in the meantime are newer
+            for device_id, seen_at in seen.items():
+                self.record(device_id=device_id, seen_at=seen_at)
+            raise
+
+        return len(seen)
+
+    async def run(self, interval: timedelta = LAST_SEEN_FLUSH_INTERVAL):
+        """Flushes the recorded timestamps periodically until cancelled. The
+        remaining timestamps are flushed on cancellation. A failing final flush is
+        logged, so that it does not interfere with the shutdown.
+
+        :param interval: The interval between two flushes.
+        """
+
+        try:
+            while True:
+                await asyncio.sleep(interval.total_seconds())
+                try:
+                    await self.flush()
+                except Exception:
+                    logger.exception("Failed to update the last seen timestamps.")
+        finally:
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush the last seen timestamps.")
+
+
+LAST_SEEN_AGGREGATOR = LastSeenAggregator()
+"""The aggregator shared by all device connections of the process."""
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+from carlos.database.context import RequestContext
+from carlos.database.device import get_device
+from carlos.database.testing.expectations import DeviceId
+from carlos.database.utils import utcnow
+
+from .last_seen import LastSeenAggregator
+
+
+def test_record():
+    """Ensures that only the latest timestamp of each device is kept."""
+
+    aggregator = LastSeenAggregator()
+    device_id = uuid4()
+    now = utcnow()
+
+    aggregator.record(device_id=device_id, seen_at=now)
+    aggregator.record(device_id=device_id, seen_at=now - timedelta(seconds=1))
+    aggregator.record(device_id=uuid4())
+
+    assert aggregator.pending == 2
+    assert aggregator._pending[device_id] == now
+
+
+async def test_flush(async_carlos_db_context: RequestContext):
+    """Ensures that the recorded timestamps are written with a single flush."""
+
+    aggregator = LastSeenAggregator()
+    assert await aggregator.flush(context=async_carlos_db_context) == 0
+
+    now = utcnow()
+    device_ids = [DeviceId.ONLINE.value, DeviceId.DEVICE_A.value]
+    for device_id in device_ids:
+        aggregator.record(device_id=device_id, seen_at=now)
+
+    assert await aggregator.flush(context=async_carlos_db_context) == 2
+    assert aggregator.pending == 0
+
+    for device_id in device_ids:
+        device = await get_device(context=async_carlos_db_context, device_id=device_id)
+        assert device.last_seen_at >= now
+
+
+async def test_flush_failure():
+    """Ensures that the timestamps are kept, if the update fails."""
+
+    class _BrokenConnection:
+        async def execute(self, *args, **kwargs):
+            raise RuntimeError("Database unavailable.")
+
+    aggregator = LastSeenAggregator()
+    aggregator.record(device_id=uuid4())
+
+    with pytest.raises(RuntimeError):
+        await aggregator.flush(
+            context=RequestContext(connection=_BrokenConnection())  # type: ignore
+        )
+
+    assert aggregator.pending == 1
+
+
+@pytest.mark.parametrize("fail", [False, True], ids=["success", "failure"])
+async def test_run_final_flush(monkeypatch: pytest.MonkeyPatch, fail: bool):
+    """Ensures that the remaining timestamps are flushed on cancellation and that a
+    failing final flush does not escape the task."""
+
+    flushed: list[int] = []
+
+    async def _flush(self: LastSeenAggregator, context=None) -> int:
+        flushed.append(self.pending)
+        if fail:
+            raise RuntimeError("Database unavailable.")
+        self._pending = {}
+        return flushed[-1]
+
+    monkeypatch.setattr(LastSeenAggregator, "flush", _flush)
+
+    aggregator = LastSeenAggregator()
+    aggregator.record(device_id=uuid4())
+
+    task = asyncio.create_task(aggregator.run(interval=timedelta(hours=1)))
+    await asyncio.sleep(0)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert flushed == [1]
+    assert aggregator.pending == (1 if fail else 0)
@@ -0,0 +1,61 @@
+"""This module contains the unit of work that shares a single database connection
+between all operations performed while handling a message."""
+
+__all__ = ["MessageUnitOfWork"]
+
+from contextlib import AsyncExitStack
+from types import TracebackType
+
+from carlos.database.connection import get_async_carlos_db_connection
+from carlos.database.context import RequestContext
+
+from carlos.edge.server.constants import CLIENT_NAME
+
+
+class MessageUnitOfWork:
+    """Provides the database connection used while handling a single message.
+
+    The connection is drawn from the pool on first use only, so messages that
+    don't require the database, e.g. PING, don't occupy a connection. Once the
+    unit of work is exited, the connection is committed, if no error occurred,
+    and returned to the pool."""
+
+    def __init__(self, client_name: str = CLIENT_NAME):
+        """Initializes the unit of work.
+
+        :param client_name: Used to identify the connection to the database.
+        """
+
+        self._client_name = client_name
+        self._exit_stack = AsyncExitStack()
+        self._context: RequestContext | None = None
+
+    @property
+    def is_connected(self) -> bool:
+        """Returns True, if a connection has been acquired."""
+
+        return self._context is not None
+
+    async def get_context(self) -> RequestContext:
+        """Returns the context of this unit of work. The connection is acquired on
+        the first call, subsequent calls return the same context."""
+
+        if self._context is None:
+            connection = await self._exit_stack.enter_async_context(
+                get_async_carlos_db_connection(client_name=self._client_name)
+            )
+            self._context = RequestContext(connection=connection)
+
+        return self._context
+
+    async def __aenter__(self) -> "MessageUnitOfWork":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> bool | None:
+        self._context = None
+        return await self._exit_stack.__aexit__(exc_type, exc_val, exc_tb)
@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import text
+
+from .unit_of_work import MessageUnitOfWork
+
+
+async def test_unit_of_work():
+    """Ensures that the connection is acquired lazily and shared within the unit of
+    work."""
+
+    async with MessageUnitOfWork() as unit_of_work:
+        assert not unit_of_work.is_connected
+
+        context = await unit_of_work.get_context()
+        assert unit_of_work.is_connected
+        assert await unit_of_work.get_context() is context
+
+        assert (await context.connection.execute(text("SELECT 1"))).scalar() == 1
+
+    assert not unit_of_work.is_connected
+    assert context.connection.closed
+
+
+async def test_unit_of_work_error():
+    """Ensures that errors are propagated and the connection is released."""
+
+    with pytest.raises(RuntimeError):
+        async with MessageUnitOfWork() as unit_of_work:
+            context = await unit_of_work.get_context()
+            raise RuntimeError("Handler failed.")
+
+    assert context.connection.closed
@@ -16,6 +16,7 @@ from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.gzip import GZipMiddleware
 
 from .config import CarlosAPISettings
+from .lifespan import lifespan
 from .logging_patch import setup_logging
 
 DOCS_URL = "/docs"
@@ -41,6 +42,7 @@ def create_app(api_settings: CarlosAPISettings | None = None) -> FastAPI:
         docs_url=DOCS_URL if api_settings.API_DOCS_ENABLED else None,
         openapi_url=OPENAPI_URL if api_settings.API_DOCS_ENABLED else None,
         generate_unique_id_function=_generate_openapi_operation_id,
+        lifespan=lifespan,
     )
 
     setup_middlewares(app=app, api_settings=api_settings)
@@ -0,0 +1,83 @@
+"""This module defines the tasks that run alongside the API for its whole lifetime."""
+
+__all__ = ["lifespan"]
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncIterator
+
+from carlos.database.connection import get_async_carlos_db_connection
+from carlos.database.context import RequestContext
+from carlos.database.data.rollup import ROLLUP_REFRESH_INTERVAL, refresh_queued_rollups
+from carlos.database.data.timeseries import prepare_timeseries_partitions
+from carlos.edge.server.last_seen import LAST_SEEN_AGGREGATOR
+from fastapi import FastAPI
+from loguru import logger
+
+PARTITION_MAINTENANCE_INTERVAL = timedelta(hours=6)
+"""The interval in which upcoming partitions of the timeseries table are created."""
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:  # pragma: no cover
+    """Starts the background tasks of the API and stops them on shutdown."""
+
+    partition_maintenance = asyncio.create_task(maintain_timeseries_partitions())
+    rollup_refresh = asyncio.create_task(maintain_timeseries_rollups())
+    last_seen_flush = asyncio.create_task(LAST_SEEN_AGGREGATOR.run())
+
+    yield
+
+    for task in (partition_maintenance, rollup_refresh, last_seen_flush):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception(f"Background task {task.get_name()} failed on shutdown.")
+
+
+async def maintain_timeseries_partitions(
+    interval: timedelta = PARTITION_MAINTENANCE_INTERVAL,
+):  # pragma: no cover
+    """Periodically loads the known partitions of the timeseries table and creates
+    the upcoming ones. This way, inserting data does not need to create partitions
+    on the fly, e.g. at the beginning of a new month."""
+
+    while True:
+        try:
+            async with get_async_carlos_db_connection(
+                client_name="Carlos API"
+            ) as connection:
+                await prepare_timeseries_partitions(
+                    context=RequestContext(connection=connection)
+                )
+        except Exception:
+            logger.exception("Failed to prepare the timeseries partitions.")
+
+        await asyncio.sleep(interval.total_seconds())
+
+
+async def maintain_timeseries_rollups(
+    interval: timedelta = ROLLUP_REFRESH_INTERVAL,
+):  # pragma: no cover
+    """Periodically refreshes the rollups of the timeseries data added in the
+    meantime. The refresh runs outside the ingest transactions, so that concurrent
+    ingests neither wait for nor overwrite each other's aggregates. Concurrent
+    workers of other API processes are serialized by the database."""
+
+    while True:
+        try:
+            async with get_async_carlos_db_connection(
+                client_name="Carlos API"
+            ) as connection:
+                await refresh_queued_rollups(
+                    context=RequestContext(connection=connection)
+                )
+                await connection.commit()
+        except Exception:
+            logger.exception("Failed to refresh the timeseries rollups.")
+
+        await asyncio.sleep(interval.total_seconds())
@@ -1,19 +1,36 @@
 __all__ = ["data_router"]
 
+from datetime import timedelta
+from typing import Annotated
 
+from annotated_types import Gt
 from carlos.database.context import RequestContext
 from carlos.database.data.timeseries import (
     MAX_QUERY_RANGE,
+    Aggregation,
     DatetimeRange,
     TimeseriesData,
     get_timeseries,
 )
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from starlette import status
 
 from carlos.api.depends.context import request_context
 from carlos.api.params.query import datetime_range
-from carlos.api.utils.data_reduction import optimize_timeseries
+from carlos.api.utils.data_reduction import DEFAULT_SPLIT_THRESHOLD, optimize_timeseries
+from carlos.api.utils.downsampling import (
+    MIN_MAX_POINTS,
+    Downsampling,
+    downsample_timeseries,
+)
+from carlos.api.utils.streaming import (
+    ARROW_STREAM_MEDIA_TYPE,
+    MAX_STREAM_QUERY_RANGE,
+    NDJSON_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    stream_timeseries_columnar,
+    stream_timeseries_ndjson,
+)
 
 data_router = APIRouter()
 
@@ -23,13 +40,32 @@ data_router = APIRouter()
     summary="Get timeseries data",
     response_model=list[TimeseriesData],
     responses={
+        status.HTTP_200_OK: {
+            "description": "The timeseries data. If the client accepts "
+            f"`{NDJSON_MEDIA_TYPE}`, the data is streamed as newline delimited JSON "
+            "instead. Each line holds a fragment of a single timeseries and the "
+            f"range may be up to {MAX_STREAM_QUERY_RANGE} in this case. "
+            f"Analytic clients may request `{ARROW_STREAM_MEDIA_TYPE}` or "
+            f"`{PARQUET_MEDIA_TYPE}` to receive the same range as a table of "
+            "`timeseries_id` (int32), `timestamp_utc` (int64 microseconds since the "
+            "unix epoch) and `value` (float32) columns. The samples are not reduced "
+            "for these formats.",
+            "content": {
+                NDJSON_MEDIA_TYPE: {},
+                ARROW_STREAM_MEDIA_TYPE: {},
+                PARQUET_MEDIA_TYPE: {},
+            },
+        },
         status.HTTP_404_NOT_FOUND: {"description": "Timeseries not found."},
         status.HTTP_400_BAD_REQUEST: {
-            "description": f"Range was invalid or more than {MAX_QUERY_RANGE}"
+            "description": f"Range was invalid or more than {MAX_QUERY_RANGE} "
+            f"({MAX_STREAM_QUERY_RANGE} for the streaming formats), or `maxPoints` "
+            "was requested with a streaming format."
         },
     },
 )
 async def get_timeseries_route(
+    request: Request,
     timeseries_id: list[int] = Query(
         ...,
         alias="timeseriesId",
@@ -42,20 +78,105 @@ async def get_timeseries_route(
         "number of samples returned by removing consecutive samples that change less "
         "than 0.5% as they are not visible in the UI any how.",
     ),
+    resolution: Annotated[timedelta, Gt(timedelta(0))] | None = Query(
+        None,
+        description="If given, the samples are aggregated into buckets of the given "
+        "size by the database. Must be an ISO 8601 duration, e.g. PT5M.",
+    ),
+    aggregation: Aggregation = Query(
+        Aggregation.AVG,
+        description="Defines how the samples within a bucket are aggregated. "
+        "Only used if a resolution is given.",
+    ),
+    max_points: int | None = Query(
+        None,
+        alias="maxPoints",
+        ge=MIN_MAX_POINTS,
+        description="If given, each timeseries is reduced to at most this number of "
+        "samples using the selected downsampling algorithm, e.g. the width of the "
+        "chart in pixels. Gaps in the data are marked by additional null values. "
+        "Not supported by the streaming formats, as the whole timeseries is "
+        "required to downsample it.",
+    ),
+    downsampling: Downsampling = Query(
+        Downsampling.LTTB,
+        description="The algorithm used to reduce the samples to `maxPoints`. "
+        "Only used if `maxPoints` is given.",
+    ),
     dt_range: DatetimeRange = Depends(datetime_range),
     context: RequestContext = Depends(request_context),
 ):
     """Returns the timeseries data for the given timeseries identifiers."""
 
-    timeseries = await get_timeseries(
-        context=context, timeseries_ids=timeseries_id, datetime_range=dt_range
+    sample_reduce_threshold = 0.005 if reduce_samples else 0.0
+    # Empty buckets are omitted, so consecutive buckets are always at least one
+    # resolution apart. Only larger distances are actual gaps in the data.
+    split_threshold = DEFAULT_SPLIT_THRESHOLD
+    if resolution is not None:
+        split_threshold = max(split_threshold, 2 * resolution)
+
+    accept = request.headers.get("accept", "")
+    is_streaming = NDJSON_MEDIA_TYPE in accept or any(
+        media_type in accept
+        for media_type in (ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE)
     )
+    if is_streaming and max_points is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="maxPoints is not supported by the streaming formats.",
+        )
+    if (
+        is_streaming
+        and dt_range.end_at_utc - dt_range.start_at_utc > MAX_STREAM_QUERY_RANGE
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Requested time range exceeds the maximum allowed duration of "
+            f"{MAX_STREAM_QUERY_RANGE} for streaming.",
+        )
 
-    sample_reduce_threshold = 0.005 if reduce_samples else 0.0
+    # The connection of the request is released before a streaming body is sent,
+    # hence the streams open a dedicated connection.
+    for columnar_media_type in (ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE):
+        if columnar_media_type in accept:
+            return await stream_timeseries_columnar(
+                timeseries_ids=timeseries_id,
+                datetime_range=dt_range,
+                resolution=resolution,
+                aggregation=aggregation,
+                media_type=columnar_media_type,
+            )
 
-    return [
+    if NDJSON_MEDIA_TYPE in accept:
+        return await stream_timeseries_ndjson(
+            timeseries_ids=timeseries_id,
+            datetime_range=dt_range,
+            resolution=resolution,
+            aggregation=aggregation,
+            sample_reduce_threshold=sample_reduce_threshold,
+            split_threshold=split_threshold,
+        )
+
+    timeseries = await get_timeseries(
+        context=context,
+        timeseries_ids=timeseries_id,
+        datetime_range=dt_range,
+        resolution=resolution,
+        aggregation=aggregation,
+    )
+
+    optimized = [
         optimize_timeseries(
-            timeseries=ts, sample_reduce_threshold=sample_reduce_threshold
+            timeseries=ts,
+            sample_reduce_threshold=sample_reduce_threshold,
+            split_threshold=split_threshold,
         )
         for ts in timeseries
     ]
+    if max_points is None:
+        return optimized
+
+    return [
+        downsample_timeseries(timeseries=ts, max_points=max_points, method=downsampling)
+        for ts in optimized
+    ]
@@ -1,8 +1,15 @@
+import pyarrow as pa
 from carlos.database.data.timeseries import TimeseriesData
 from carlos.database.device import CarlosDeviceSignal
 from pydantic import TypeAdapter
 from starlette.testclient import TestClient
 
+from carlos.api.utils.streaming import (
+    ARROW_STREAM_MEDIA_TYPE,
+    COLUMNAR_SCHEMA,
+    NDJSON_MEDIA_TYPE,
+)
+
 
 async def test_get_timeseries_route(
     client: TestClient,
@@ -23,3 +30,135 @@ async def test_get_timeseries_route(
     data = TypeAdapter(list[TimeseriesData]).validate_json(response.content)
 
     assert len(data) == 2
+
+
+async def test_get_timeseries_route_resolution(
+    client: TestClient,
+    driver_signals: list[CarlosDeviceSignal],
+):
+    """Test the get_timeseries_route with server side aggregation."""
+
+    params = {
+        "timeseriesId": [signal.timeseries_id for signal in driver_signals],
+        "startAtUtc": "2022-01-01T00:00:00Z",
+        "endAtUtc": "2022-01-02T00:00:00Z",
+        "resolution": "PT5M",
+        "aggregation": "max",
+    }
+
+    response = client.get("/data/timeseries", params=params)
+    assert response.status_code == 200
+
+    data = TypeAdapter(list[TimeseriesData]).validate_json(response.content)
+
+    assert len(data) == 2
+
+    # non-positive resolutions are rejected
+    response = client.get("/data/timeseries", params={**params, "resolution": "PT0S"})
+    assert response.status_code == 422
+
+
+async def test_get_timeseries_route_max_points(
+    client: TestClient,
+    driver_signals: list[CarlosDeviceSignal],
+):
+    """Test the get_timeseries_route with visual downsampling."""
+
+    params = {
+        "timeseriesId": [signal.timeseries_id for signal in driver_signals],
+        "startAtUtc": "2022-01-01T00:00:00Z",
+        "endAtUtc": "2022-01-02T00:00:00Z",
+        "reduceSamples": False,
+        "maxPoints": 100,
+    }
+
+    for downsampling in ("lttb", "m4"):
+        response = client.get(
+            "/data/timeseries", params={**params, "downsampling": downsampling}
+        )
+        assert response.status_code == 200
+
+        data = TypeAdapter(list[TimeseriesData]).validate_json(response.content)
+
+        assert len(data) == 2
+        for timeseries in data:
+            samples = [value for value in timeseries.values if value is not None]
+            assert len(samples) <= 100
+
+    # too few points can not be handled by the algorithms
+    response = client.get("/data/timeseries", params={**params, "maxPoints": 3})
+    assert response.status_code == 422
+
+    # the streamed fragments can not be downsampled
+    response = client.get(
+        "/data/timeseries", params=params, headers={"Accept": NDJSON_MEDIA_TYPE}
+    )
+    assert response.status_code == 400
+
+
+async def test_get_timeseries_route_ndjson(
+    client: TestClient,
+    driver_signals: list[CarlosDeviceSignal],
+):
+    """Test the get_timeseries_route streaming newline delimited JSON."""
+
+    response = client.get(
+        "/data/timeseries",
+        params={
+            "timeseriesId": [signal.timeseries_id for signal in driver_signals],
+            "startAtUtc": "2022-01-01T00:00:00Z",
+            "endAtUtc": "2022-03-01T00:00:00Z",
+        },
+        headers={"Accept": NDJSON_MEDIA_TYPE},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == NDJSON_MEDIA_TYPE
+
+    fragments = [
+        TimeseriesData.model_validate_json(line) for line in response.text.splitlines()
+    ]
+
+    assert {fragment.timeseries_id for fragment in fragments} == {
+        signal.timeseries_id for signal in driver_signals
+    }
+
+
+async def test_get_timeseries_route_arrow(
+    client: TestClient,
+    driver_signals: list[CarlosDeviceSignal],
+):
+    """Test the get_timeseries_route returning an Arrow IPC stream."""
+
+    response = client.get(
+        "/data/timeseries",
+        params={
+            "timeseriesId": [signal.timeseries_id for signal in driver_signals],
+            "startAtUtc": "2022-01-01T00:00:00Z",
+            "endAtUtc": "2022-03-01T00:00:00Z",
+        },
+        headers={"Accept": ARROW_STREAM_MEDIA_TYPE},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW_STREAM_MEDIA_TYPE
+
+    table = pa.ipc.open_stream(response.content).read_all()
+
+    assert table.schema == COLUMNAR_SCHEMA
+
+
+async def test_get_timeseries_route_stream_range(
+    client: TestClient,
+    driver_signals: list[CarlosDeviceSignal],
+):
+    """Ensures that the streamed range is limited as well."""
+
+    response = client.get(
+        "/data/timeseries",
+        params={
+            "timeseriesId": [signal.timeseries_id for signal in driver_signals],
+            "startAtUtc": "2020-01-01T00:00:00Z",
+            "endAtUtc": "2022-01-01T00:00:00Z",
+        },
+        headers={"Accept": NDJSON_MEDIA_TYPE},
+    )
+    assert response.status_code == 400
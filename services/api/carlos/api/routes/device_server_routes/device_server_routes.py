@@ -18,6 +18,7 @@ from carlos.edge.server.device_handler import ServerEdgeCommunicationHandler
 from carlos.edge.server.token import issue_token, verify_token
 from fastapi import APIRouter, Depends, Query, Request, Security, WebSocket
 from jwt import InvalidTokenError
+from loguru import logger
 from pydantic.alias_generators import to_camel
 from sqlalchemy.ext.asyncio import AsyncConnection
 from starlette.responses import PlainTextResponse
@@ -109,3 +110,8 @@ async def device_server_websocket(
         ).listen()
     except EdgeConnectionDisconnected:
         DEVICE_CONNECTION_MANAGER.remove(device_id)
+        logger.info(
+            f"Device {device_id} disconnected ({protocol.wire_format.value}). "
+            f"Sent: {protocol.sent_statistics}. "
+            f"Received: {protocol.received_statistics}."
+        )
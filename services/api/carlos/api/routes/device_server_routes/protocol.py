@@ -4,9 +4,11 @@ from carlos.edge.interface import (
     CarlosMessage,
     EdgeConnectionDisconnected,
     EdgeProtocol,
+    WireFormat,
 )
+from carlos.edge.interface.messages import select_wire_format
 from carlos.edge.interface.protocol import EdgeProtocolCallback
-from starlette.websockets import WebSocket, WebSocketDisconnect, WebSocketState
+from starlette.websockets import WebSocket, WebSocketState
 
 
 class WebsocketProtocol(EdgeProtocol):
@@ -26,7 +28,11 @@ class WebsocketProtocol(EdgeProtocol):
         :param message: The message to send.
         :raises EdgeConnectionDisconnected: If the connection is disconnected.
         """
-        await self._websocket.send_text(message.build())
+        frame = self.encode(message)
+        if isinstance(frame, bytes):
+            await self._websocket.send_bytes(frame)
+        else:
+            await self._websocket.send_text(frame)
 
     async def receive(self) -> CarlosMessage:
         """Receive data from the other end of the connection.
@@ -34,14 +40,18 @@ class WebsocketProtocol(EdgeProtocol):
         :return: The received message.
         :raises EdgeConnectionDisconnected: If the connection is disconnected.
         """
-        try:
-            raw_message = await self._websocket.receive_text()
-        except WebSocketDisconnect as ex:
+        raw_message = await self._websocket.receive()
+        if raw_message["type"] == "websocket.disconnect":
             raise EdgeConnectionDisconnected(
-                f"Connection was closed by the device (code: {ex.code}): {ex.reason}"
-            ) from ex
+                f"Connection was closed by the device (code: {raw_message.get('code')}):"
+                f" {raw_message.get('reason')}"
+            )
 
-        return CarlosMessage.from_str(raw_message)  # pragma: no cover
+        # binary frames are only sent by devices that negotiated the binary format
+        frame = raw_message.get("text")
+        if frame is None:
+            frame = raw_message["bytes"]
+        return self.decode(frame)  # pragma: no cover
 
     @property
     def is_connected(self) -> bool:
@@ -51,8 +61,16 @@ class WebsocketProtocol(EdgeProtocol):
     async def connect(self):
         """Connects to the server.
 
+        The wire format is negotiated via the websocket subprotocols offered by the
+        device. Devices that do not offer any format use the text format.
+
         :raises EdgeConnectionFailed: If the connection attempt fails."""
-        await self._websocket.accept()
+
+        wire_format = select_wire_format(self._websocket.scope.get("subprotocols", []))
+        await self._websocket.accept(
+            subprotocol=wire_format.value if wire_format else None
+        )
+        self.wire_format = wire_format or WireFormat.TEXT
 
         if self.on_connect and self.is_connected:
             await self.on_connect(self)
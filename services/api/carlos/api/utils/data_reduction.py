@@ -1,11 +1,21 @@
 __all__ = ["optimize_timeseries"]
 from datetime import timedelta
 
+import numpy as np
 from carlos.database.data.timeseries import TimeseriesData
 
 DEFAULT_SPLIT_THRESHOLD = timedelta(minutes=15)
 
 
+_SCALAR_PROBE = 8
+"""The number of dropped samples in a row checked one by one, before searching for
+the next changed sample in bulk."""
+
+_SEARCH_WINDOW = 64
+"""The number of samples examined at once when searching for the next changed
+sample. The window grows with each unsuccessful step."""
+
+
 def optimize_timeseries(
     timeseries: TimeseriesData,
     sample_reduce_threshold: float = 0.01,
@@ -15,49 +25,209 @@ def optimize_timeseries(
     injecting None values into data gaps larger than the split_threshold.
     It further more allows to remove consecutive samples if the absolute relative
     change to last sample is less than sample_reduce_threshold.
+
+    The data gaps and the changes in between consecutive samples are computed in
+    bulk. Whether a sample is kept depends on the last kept sample, which is
+    tracked in a sequential pass. It skips the runs of kept samples and searches
+    for the end of a plateau in bulk.
     """
 
-    if len(timeseries.values) < 2:
+    ts_len = len(timeseries.values)
+    if ts_len < 2:
         return timeseries
 
     sample_reduce_threshold = abs(sample_reduce_threshold)
     split_threshold = abs(split_threshold)
 
-    # we always need the first value
-    ts_len = len(timeseries.values)
-    timestamps = [timeseries.timestamps[0]]
-    values = [timeseries.values[0]]
-    prev_ts = timeseries.timestamps[0]
-    last_added_idx = 0
-    for idx, (ts, val) in enumerate(
-        zip(timeseries.timestamps[1:], timeseries.values[1:])
-    ):
-        delta = ts - prev_ts
-        if delta > split_threshold:
-            timestamps.append(prev_ts + delta / 2)
-            values.append(None)
-
-        if (
-            is_value_changed(
-                value=val, previous_value=values[-1], threshold=sample_reduce_threshold
-            )
-            or idx + 1 == ts_len
+    src_timestamps = np.fromiter(timeseries.timestamps, dtype=object, count=ts_len)
+    src_values = np.fromiter(timeseries.values, dtype=object, count=ts_len)
+
+    deltas = np.diff(src_timestamps)
+    is_gap = np.zeros(ts_len, dtype=bool)
+    is_gap[1:] = deltas > split_threshold
+
+    # A 0 threshold means that all samples are kept
+    if sample_reduce_threshold <= 0.0:
+        kept_indices = np.arange(ts_len)
+    else:
+        kept_indices = _find_kept_samples(
+            values=timeseries.values, is_gap=is_gap, threshold=sample_reduce_threshold
+        )
+
+    # The None values are placed in the middle of each gap, i.e. in front of the
+    # first sample after the gap.
+    gap_indices = np.flatnonzero(is_gap)
+    kept_positions = np.arange(len(kept_indices)) + np.searchsorted(
+        gap_indices, kept_indices, side="right"
+    )
+    gap_positions = np.arange(len(gap_indices)) + np.searchsorted(
+        kept_indices, gap_indices, side="left"
+    )
+
+    timestamps = np.empty(len(kept_indices) + len(gap_indices), dtype=object)
+    timestamps[kept_positions] = src_timestamps[kept_indices]
+    timestamps[gap_positions] = (
+        src_timestamps[gap_indices - 1] + deltas[gap_indices - 1] / 2
+    )
+    values = np.full(len(timestamps), None, dtype=object)
+    values[kept_positions] = src_values[kept_indices]
+
+    # all samples have been validated already
+    return TimeseriesData.model_construct(
+        timeseries_id=timeseries.timeseries_id,
+        timestamps=timestamps.tolist(),
+        values=values.tolist(),
+    )
+
+
+# infinite values result in NaN when computing the relative change
+@np.errstate(invalid="ignore")
+def _find_kept_samples(
+    values: list[float | None], is_gap: np.ndarray, threshold: float
+) -> np.ndarray:
+    """Returns the indices of the samples that are kept by `optimize_timeseries()`.
+
+    :param values: The values of the timeseries.
+    :param is_gap: Whether there is a data gap in front of each sample.
+    :param threshold: The relative change a sample needs to be kept, larger than 0.
+    :return: The sorted indices of the kept samples, including the right edges of
+        the plateaus.
+    """
+
+    ts_len = len(values)
+
+    # None is converted to NaN, hence the real NaN values need to be told apart
+    data = np.array(values, dtype=np.float64)
+    is_none = np.isnan(data)
+    for nan_idx in np.flatnonzero(is_none).tolist():
+        is_none[nan_idx] = values[nan_idx] is None
+
+    # If the previous sample has been kept, the sample is kept if it changed
+    # compared to the previous one and there is no gap in between.
+    follows_kept = np.zeros(ts_len, dtype=bool)
+    follows_kept[1:] = ~is_gap[1:] & _changed_mask(
+        value=data[1:],
+        value_is_none=is_none[1:],
+        previous_value=data[:-1],
+        previous_is_none=is_none[:-1],
+        threshold=threshold,
+    )
+    # the first sample after each run of kept samples
+    run_breaks = np.where(follows_kept, ts_len, np.arange(ts_len))
+    run_ends = [*np.minimum.accumulate(run_breaks[::-1])[::-1][1:].tolist(), ts_len]
+    gaps = is_gap.tolist()
+
+    # the kept samples are collected as runs, we always need the first value
+    run_starts = [0]
+    run_stops = [1]
+    previous_value = values[0]
+    # keeps the loop offset of the original implementation, the right edge of a
+    # plateau directly after the first sample is omitted
+    last_kept_idx = 1
+    idx = 1
+    while idx < ts_len:
+        if gaps[idx]:
+            previous_value = None
+
+        value = values[idx]
+        if not is_value_changed(
+            value=value, previous_value=previous_value, threshold=threshold
         ):
-            # if we skipped at least one datapoint, we need to add the right edge
-            # of the
-            if idx - last_added_idx > 1 and values[-1] is not None:
-                # we use idx instead of idx - 1, we would need to use (idx - 1 + 1)
-                # due to the loop offset
-                timestamps.append(timeseries.timestamps[idx])
-                values.append(timeseries.values[idx])
-            timestamps.append(ts)
-            values.append(val)
-            last_added_idx = idx
-
-        prev_ts = ts
-
-    return TimeseriesData(
-        timeseries_id=timeseries.timeseries_id, timestamps=timestamps, values=values
+            idx += 1
+            if idx - last_kept_idx > _SCALAR_PROBE:
+                idx = _find_next_change(
+                    start=idx,
+                    data=data,
+                    is_none=is_none,
+                    is_gap=is_gap,
+                    previous_value=previous_value,
+                    threshold=threshold,
+                )
+            continue
+
+        # if we skipped at least one datapoint, we need to add the right edge of
+        # the plateau
+        if idx - last_kept_idx > 1 and previous_value is not None:
+            run_starts.append(idx - 1)
+        else:
+            run_starts.append(idx)
+
+        last_kept_idx = run_ends[idx] - 1
+        run_stops.append(last_kept_idx + 1)
+        previous_value = values[last_kept_idx]
+        idx = last_kept_idx + 1
+        # the run ends with a gap or a sample that did not change compared to the
+        # last kept one
+        if idx < ts_len and not gaps[idx]:
+            idx += 1
+
+    runs = np.bincount(run_starts, minlength=ts_len + 1) - np.bincount(
+        run_stops, minlength=ts_len + 1
+    )
+    return np.flatnonzero(np.cumsum(runs[:-1]))
+
+
+def _find_next_change(
+    start: int,
+    data: np.ndarray,
+    is_none: np.ndarray,
+    is_gap: np.ndarray,
+    previous_value: float | None,
+    threshold: float,
+) -> int:
+    """Searches the first sample, which follows a data gap or changed compared to
+    the last kept sample.
+
+    :param start: The index to start the search at.
+    :param data: The values of the timeseries, None values are NaN.
+    :param is_none: Whether each value is None.
+    :param is_gap: Whether there is a data gap in front of each sample.
+    :param previous_value: The value of the last kept sample.
+    :param threshold: The relative change a sample needs to be kept.
+    :return: The index of the sample, or the length of the timeseries.
+    """
+
+    ts_len = len(data)
+    window = _SEARCH_WINDOW
+    while start < ts_len:
+        stop = min(start + window, ts_len)
+        candidates = np.flatnonzero(
+            is_gap[start:stop]
+            | _changed_mask(
+                value=data[start:stop],
+                value_is_none=is_none[start:stop],
+                previous_value=np.nan if previous_value is None else previous_value,
+                previous_is_none=previous_value is None,
+                threshold=threshold,
+            )
+        )
+        if len(candidates):
+            return start + int(candidates[0])
+
+        start = stop
+        window *= 2
+
+    return ts_len
+
+
+def _changed_mask(
+    value: np.ndarray,
+    value_is_none: np.ndarray,
+    previous_value: np.ndarray | float,
+    previous_is_none: np.ndarray | bool,
+    threshold: float,
+) -> np.ndarray:
+    """The vectorized version of `is_value_changed()` for a threshold larger than
+    0. None values are expected to be NaN in the data and flagged in the
+    corresponding mask."""
+
+    changed = (value != previous_value) & (
+        (value == 0.0)
+        | (previous_value == 0.0)
+        | (np.abs(previous_value - value) > threshold * previous_value)
+    )
+    return np.where(
+        value_is_none | previous_is_none, value_is_none != previous_is_none, changed
     )
 
 
@@ -1,3 +1,4 @@
+import math
 from datetime import UTC, datetime, timedelta
 
 import pytest
@@ -42,7 +43,7 @@ def test_is_value_changed(
     )
 
 
-def ts(offset: int) -> datetime:
+def ts(offset: float) -> datetime:
     """Little helper to reduce the boilerplate to generate test datetimes."""
     return datetime(2024, 1, 1, tzinfo=UTC) + timedelta(seconds=offset)
 
@@ -114,3 +115,98 @@ def test_optimize_timeseries(
 ):
 
     assert optimize_timeseries(ts_in, split_threshold=split_threshold) == ts_expected
+
+
+def _timeseries(offsets: list[float], values: list[float | None]) -> TimeseriesData:
+    """Little helper to build a timeseries from the offsets of the samples."""
+
+    return TimeseriesData(
+        timeseries_id=42, timestamps=[ts(offset) for offset in offsets], values=values
+    )
+
+
+_PLATEAU = [100.0 + 0.1 * math.sin(idx) for idx in range(399)]
+"""A plateau exceeding the samples that are checked one by one."""
+
+
+@pytest.mark.parametrize(
+    "ts_in, sample_reduce_threshold, split_threshold, ts_expected",
+    [
+        pytest.param(
+            _timeseries([0, 1, 2, 3, 4, 5], [10.0, 10.05, 10.08, 10.09, 10.5, 10.5]),
+            0.01,
+            DEFAULT_SPLIT_THRESHOLD,
+            # compared to the last kept sample, not the previous one
+            _timeseries([0, 3, 4], [10.0, 10.09, 10.5]),
+            id="plateau within threshold",
+        ),
+        pytest.param(
+            _timeseries(list(range(400)), [*_PLATEAU, 110.0]),
+            0.01,
+            DEFAULT_SPLIT_THRESHOLD,
+            _timeseries([0, 398, 399], [100.0, _PLATEAU[-1], 110.0]),
+            id="long plateau",
+        ),
+        pytest.param(
+            _timeseries([0, 1, 2, 3, 100, 101], [1.0, 1.0, 1.0, 1.0, 1.0, 2.0]),
+            0.01,
+            timedelta(seconds=30),
+            # the right edge of the plateau is omitted in front of a gap
+            _timeseries([0, 51.5, 100, 101], [1.0, None, 1.0, 2.0]),
+            id="gap after plateau",
+        ),
+        pytest.param(
+            _timeseries(
+                [0, 1, 2, 3, 4, 100, 101, 102],
+                [1.0, None, None, 2.0, 2.0, None, None, 3.0],
+            ),
+            0.01,
+            timedelta(seconds=30),
+            _timeseries([0, 1, 3, 52, 102], [1.0, None, 2.0, None, 3.0]),
+            id="None values",
+        ),
+        pytest.param(
+            _timeseries(
+                [0, 1, 2, 3, 4, 5, 6, 7],
+                [1.0, math.nan, 2.0, None, math.inf, math.inf, 5.0, -math.inf],
+            ),
+            0.01,
+            DEFAULT_SPLIT_THRESHOLD,
+            _timeseries([0, 2, 3, 4], [1.0, 2.0, None, math.inf]),
+            id="non finite values",
+        ),
+        pytest.param(
+            _timeseries(
+                [0, 1, 2, 3, 4, 5, 6], [0.0, 0.0, -1.0, -1.001, -2.0, 0.0, 0.001]
+            ),
+            0.01,
+            DEFAULT_SPLIT_THRESHOLD,
+            # the relative change of negative values is always exceeded
+            _timeseries([0, 2, 3, 4, 5, 6], [0.0, -1.0, -1.001, -2.0, 0.0, 0.001]),
+            id="zero and negative values",
+        ),
+        pytest.param(
+            _timeseries([0, 1, 100, 101], [1.0, 1.0, 1.0, None]),
+            0.0,
+            timedelta(seconds=30),
+            _timeseries([0, 1, 50.5, 100, 101], [1.0, 1.0, None, 1.0, None]),
+            id="zero threshold",
+        ),
+    ],
+)
+def test_optimize_timeseries_edge_cases(
+    ts_in: TimeseriesData,
+    sample_reduce_threshold: float,
+    split_threshold: timedelta,
+    ts_expected: TimeseriesData,
+):
+    """Pins the results of the original sample by sample implementation."""
+
+    assert (
+        optimize_timeseries(
+            ts_in,
+            sample_reduce_threshold=sample_reduce_threshold,
+            split_threshold=split_threshold,
+        )
+        == ts_expected
+    )
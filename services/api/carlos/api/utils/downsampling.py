@@ -0,0 +1,173 @@
+"""This module contains the visual downsampling algorithms. They reduce a timeseries
+to a bounded number of samples, while preserving its visual appearance."""
+
+__all__ = ["Downsampling", "downsample_timeseries"]
+
+from datetime import datetime
+from enum import Enum
+
+import numpy as np
+from carlos.database.data.timeseries import TimeseriesData
+
+MIN_MAX_POINTS = 4
+"""The smallest number of points supported by all downsampling algorithms."""
+
+
+class Downsampling(str, Enum):
+    """The available visual downsampling algorithms."""
+
+    LTTB = "lttb"
+    """Largest-Triangle-Three-Buckets: Selects the sample of each bucket that forms
+    the largest triangle with the previously selected sample and the average of
+    the next bucket. Gives a smooth visual representation of the shape."""
+
+    M4 = "m4"
+    """Selects the first, last, smallest and largest sample of each time bucket.
+    Preserves all extrema, which makes it ideal for line charts with a bucket
+    per pixel column."""
+
+
+def downsample_timeseries(
+    timeseries: TimeseriesData,
+    max_points: int,
+    method: Downsampling = Downsampling.LTTB,
+) -> TimeseriesData:
+    """Reduces the timeseries to at most `max_points` samples using the given
+    algorithm.
+
+    None and non-finite values mark gaps in the data. They are not considered by
+    the algorithms, but a single None value is kept in between the selected
+    samples for each gap, so the gaps remain visible.
+
+    :param timeseries: The timeseries to downsample.
+    :param max_points: The maximum number of samples to keep, excluding the None
+        values marking gaps.
+    :param method: The downsampling algorithm to use.
+    :return: The downsampled timeseries.
+    :raises ValueError: If `max_points` is smaller than `MIN_MAX_POINTS`.
+    """
+
+    if max_points < MIN_MAX_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_MAX_POINTS}.")
+
+    if len(timeseries.values) <= max_points:
+        return timeseries
+
+    data = np.array(timeseries.values, dtype=np.float64)
+    valid_indices = np.flatnonzero(np.isfinite(data))
+    if len(valid_indices) > max_points:
+        x = _timestamps_to_seconds(
+            [timeseries.timestamps[idx] for idx in valid_indices]
+        )
+        y = data[valid_indices]
+        if method == Downsampling.M4:
+            selected = _m4_indices(x=x, y=y, max_points=max_points)
+        else:
+            selected = _lttb_indices(x=x, y=y, max_points=max_points)
+        valid_indices = valid_indices[selected]
+
+    return _with_gap_markers(
+        timeseries=timeseries, data=data, selected_indices=valid_indices
+    )
+
+
+def _timestamps_to_seconds(timestamps: list[datetime]) -> np.ndarray:
+    """Converts the timestamps to seconds relative to the first timestamp."""
+
+    origin = timestamps[0]
+    return np.fromiter(
+        ((timestamp - origin).total_seconds() for timestamp in timestamps),
+        dtype=np.float64,
+        count=len(timestamps),
+    )
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Returns the indices of the samples selected by the Largest-Triangle-Three-
+    Buckets algorithm. The first and last sample are always selected."""
+
+    # The first and last sample form buckets of their own. The remaining samples
+    # are split into buckets of (almost) equal size.
+    every = (len(x) - 2) / (max_points - 2)
+    bounds = np.floor(np.arange(max_points - 1) * every).astype(np.intp) + 1
+    bounds[-1] = len(x) - 1
+    starts, stops = bounds[:-1], bounds[1:]
+
+    # The average point of each bucket, followed by the last sample
+    counts = stops - starts
+    avg_x = np.append(np.add.reduceat(x[:-1], starts) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], starts) / counts, y[-1])
+
+    selected = np.empty(max_points, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = len(x) - 1
+    previous = 0
+    for bucket, (start, stop) in enumerate(zip(starts, stops)):
+        # The doubled area of the triangles formed by the previously selected
+        # sample, the candidates and the average point of the next bucket.
+        next_x, next_y = avg_x[bucket + 1], avg_y[bucket + 1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def _m4_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Returns the indices of the first, last, smallest and largest sample of
+    each time bucket. The time range is split into `max_points // 4` buckets of
+    equal duration."""
+
+    bucket_count = max_points // 4
+    span = x[-1] - x[0]
+    buckets = np.minimum(
+        ((x - x[0]) / span * bucket_count).astype(np.intp), bucket_count - 1
+    )
+
+    # the timestamps are sorted, hence each bucket is a contiguous range
+    starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+    stops = np.append(starts[1:], len(x))
+
+    # sorted by value within each bucket, the first and last index of each
+    # bucket point to the smallest and largest value
+    by_value = np.lexsort((y, buckets))
+
+    return np.unique(
+        np.concatenate((starts, stops - 1, by_value[starts], by_value[stops - 1]))
+    )
+
+
+def _with_gap_markers(
+    timeseries: TimeseriesData, data: np.ndarray, selected_indices: np.ndarray
+) -> TimeseriesData:
+    """Builds the timeseries of the selected samples. A single None value is
+    inserted in between 2 selected samples, if there is a gap marker in between
+    them in the original timeseries."""
+
+    marker_indices = np.flatnonzero(~np.isfinite(data))
+    # The markers in between 2 selected samples form a contiguous range of the
+    # marker indices. The first marker of each non-empty range is kept.
+    boundaries = np.concatenate(
+        (
+            [0],
+            np.searchsorted(marker_indices, selected_indices),
+            [len(marker_indices)],
+        )
+    )
+    has_gap = np.diff(boundaries) > 0
+    kept_markers = marker_indices[boundaries[:-1][has_gap]]
+
+    timestamps = []
+    values: list[float | None] = []
+    is_marker = set(kept_markers.tolist())
+    for idx in np.union1d(selected_indices, kept_markers).tolist():
+        timestamps.append(timeseries.timestamps[idx])
+        values.append(None if idx in is_marker else timeseries.values[idx])
+
+    # all samples have been validated already
+    return TimeseriesData.model_construct(
+        timeseries_id=timeseries.timeseries_id, timestamps=timestamps, values=values
+    )
@@ -0,0 +1,130 @@
+import math
+import random
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from carlos.database.data.timeseries import TimeseriesData
+
+from carlos.api.utils.downsampling import (
+    MIN_MAX_POINTS,
+    Downsampling,
+    downsample_timeseries,
+)
+
+
+def ts(offset: int) -> datetime:
+    """Little helper to reduce the boilerplate to generate test datetimes."""
+    return datetime(2024, 1, 1, tzinfo=UTC) + timedelta(seconds=offset)
+
+
+def _timeseries(values: list[float | None]) -> TimeseriesData:
+    """Creates a timeseries with one sample per second."""
+
+    return TimeseriesData(
+        timeseries_id=42,
+        timestamps=[ts(idx) for idx in range(len(values))],
+        values=values,
+    )
+
+
+def _lttb_reference(values: list[float], max_points: int) -> list[int]:
+    """A straight forward implementation of the Largest-Triangle-Three-Buckets
+    algorithm for samples that are one second apart."""
+
+    every = (len(values) - 2) / (max_points - 2)
+    selected = [0]
+    for bucket in range(max_points - 2):
+        start = int(bucket * every) + 1
+        stop = int((bucket + 1) * every) + 1
+        next_stop = min(int((bucket + 2) * every) + 1, len(values))
+        avg_x = sum(range(stop, next_stop)) / (next_stop - stop)
+        avg_y = sum(values[stop:next_stop]) / (next_stop - stop)
+
+        previous = selected[-1]
+        areas = [
+            abs(
+                (previous - avg_x) * (values[idx] - values[previous])
+                - (previous - idx) * (avg_y - values[previous])
+            )
+            for idx in range(start, stop)
+        ]
+        selected.append(start + areas.index(max(areas)))
+
+    return selected + [len(values) - 1]
+
+
+@pytest.mark.parametrize("max_points", [4, 10, 102])
+def test_lttb_matches_reference(max_points: int):
+    """Ensures that the vectorized LTTB selects the same samples as the straight
+    forward implementation."""
+
+    rng = random.Random(max_points)
+    # buckets of equal size avoid rounding differences of the bucket boundaries
+    values = [rng.gauss(0.0, 1.0) for _ in range((max_points - 2) * 7 + 2)]
+
+    result = downsample_timeseries(
+        _timeseries(values), max_points=max_points, method=Downsampling.LTTB
+    )
+
+    expected = _lttb_reference(values, max_points)
+    assert result.timestamps == [ts(idx) for idx in expected]
+    assert result.values == [values[idx] for idx in expected]
+
+
+def test_m4_keeps_extrema():
+    """Ensures that M4 keeps the first, last, smallest and largest sample of each
+    bucket."""
+
+    values = [float(idx % 10) for idx in range(100)]
+    values[13] = 100.0
+    values[77] = -100.0
+
+    result = downsample_timeseries(
+        _timeseries(values), max_points=40, method=Downsampling.M4
+    )
+
+    assert len(result.values) <= 40
+    assert result.timestamps == sorted(result.timestamps)
+    assert result.timestamps[0] == ts(0)
+    assert result.timestamps[-1] == ts(99)
+    assert ts(13) in result.timestamps
+    assert ts(77) in result.timestamps
+    assert max(result.values) == 100.0
+    assert min(result.values) == -100.0
+
+
+@pytest.mark.parametrize("method", list(Downsampling))
+def test_downsample_timeseries_bounded(method: Downsampling):
+    """Ensures that the number of samples is bounded, while gaps are preserved."""
+
+    rng = random.Random(42)
+    values: list[float | None] = [rng.gauss(0.0, 1.0) for _ in range(10_000)]
+    # a gap, followed by a NaN value that is also treated as gap
+    values[5000:5100] = [None] * 100
+    values[7000] = math.nan
+
+    result = downsample_timeseries(_timeseries(values), max_points=500, method=method)
+
+    samples = [value for value in result.values if value is not None]
+    assert len(samples) <= 500
+    assert result.values.count(None) == 2
+    assert result.timestamps == sorted(result.timestamps)
+    # the gaps are located in between the surrounding samples
+    first_gap, second_gap = [
+        timestamp
+        for timestamp, value in zip(result.timestamps, result.values)
+        if value is None
+    ]
+    assert first_gap == ts(5000)
+    assert second_gap == ts(7000)
+
+
+def test_downsample_timeseries_small():
+    """Ensures that small timeseries are returned unchanged."""
+
+    timeseries = _timeseries([1.0, None, 3.0])
+
+    assert downsample_timeseries(timeseries, max_points=MIN_MAX_POINTS) is timeseries
+
+    with pytest.raises(ValueError):
+        downsample_timeseries(timeseries, max_points=MIN_MAX_POINTS - 1)
@@ -0,0 +1,221 @@
+"""This module contains the helpers to stream timeseries data to the client."""
+
+__all__ = [
+    "ARROW_STREAM_MEDIA_TYPE",
+    "COLUMNAR_SCHEMA",
+    "MAX_STREAM_QUERY_RANGE",
+    "NDJSON_MEDIA_TYPE",
+    "PARQUET_MEDIA_TYPE",
+    "stream_timeseries_columnar",
+    "stream_timeseries_ndjson",
+]
+
+import io
+from datetime import timedelta
+from typing import AsyncGenerator, AsyncIterator, Collection, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from carlos.database.connection import get_async_carlos_db_connection
+from carlos.database.context import RequestContext
+from carlos.database.data.timeseries import (
+    Aggregation,
+    DatetimeRange,
+    TimeseriesData,
+    stream_timeseries,
+    stream_timeseries_rows,
+)
+from sqlalchemy import Row
+from starlette.responses import StreamingResponse
+
+from carlos.api.utils.data_reduction import optimize_timeseries
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+"""The media type of newline delimited JSON. Each line holds a single JSON object."""
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+"""The media type of the Apache Arrow IPC streaming format."""
+
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+"""The media type of Apache Parquet files."""
+
+MAX_STREAM_QUERY_RANGE = timedelta(days=366)
+"""The maximum range that can be streamed with a single request. The streams do
+not hold the data in memory, but a single request should still not keep a database
+connection busy for hours."""
+
+COLUMNAR_SCHEMA = pa.schema(
+    [
+        pa.field("timeseries_id", pa.int32(), nullable=False),
+        pa.field("timestamp_utc", pa.int64(), nullable=False),
+        pa.field("value", pa.float32()),
+    ],
+    metadata={"timestamp_utc": "Microseconds since the unix epoch."},
+)
+"""The schema of the columnar response formats. Each row holds a single sample."""
+
+
+async def stream_timeseries_ndjson(
+    timeseries_ids: Collection[int],
+    datetime_range: DatetimeRange,
+    resolution: timedelta | None,
+    aggregation: Aggregation,
+    sample_reduce_threshold: float,
+    split_threshold: timedelta,
+) -> StreamingResponse:
+    """Returns a response that streams the timeseries data as newline delimited
+    JSON. Each line holds a fragment of a single timeseries as serialized
+    TimeseriesData. See `stream_timeseries()` for details about the fragments.
+    The fragments are not downsampled, as the bounds of the downsampling buckets
+    depend on the whole timeseries.
+
+    The first fragment is fetched before the response is returned. This ensures
+    that invalid requests fail before the response has been started.
+    """
+
+    fragments = _optimized_fragments(
+        timeseries_ids=timeseries_ids,
+        datetime_range=datetime_range,
+        resolution=resolution,
+        aggregation=aggregation,
+        sample_reduce_threshold=sample_reduce_threshold,
+        split_threshold=split_threshold,
+    )
+    first_fragment = await anext(fragments)
+
+    async def _body() -> AsyncIterator[bytes]:
+        try:
+            yield _encode_line(first_fragment)
+            async for fragment in fragments:
+                yield _encode_line(fragment)
+        finally:
+            await fragments.aclose()
+
+    return StreamingResponse(_body(), media_type=NDJSON_MEDIA_TYPE)
+
+
+async def _optimized_fragments(
+    timeseries_ids: Collection[int],
+    datetime_range: DatetimeRange,
+    resolution: timedelta | None,
+    aggregation: Aggregation,
+    sample_reduce_threshold: float,
+    split_threshold: timedelta,
+) -> AsyncGenerator[TimeseriesData, None]:
+    """Streams the optimized timeseries fragments from the database."""
+
+    # The connection of the request is already closed once the response body is
+    # sent, hence the stream requires a dedicated connection.
+    async with get_async_carlos_db_connection(client_name="Carlos API") as connection:
+        async for fragment in stream_timeseries(
+            context=RequestContext(connection=connection),
+            timeseries_ids=timeseries_ids,
+            datetime_range=datetime_range,
+            resolution=resolution,
+            aggregation=aggregation,
+        ):
+            yield optimize_timeseries(
+                timeseries=fragment,
+                sample_reduce_threshold=sample_reduce_threshold,
+                split_threshold=split_threshold,
+            )
+
+
+def _encode_line(fragment: TimeseriesData) -> bytes:
+    """Serializes the fragment to a single line of JSON."""
+
+    return fragment.model_dump_json(by_alias=True).encode() + b"\n"
+
+
+async def stream_timeseries_columnar(
+    timeseries_ids: Collection[int],
+    datetime_range: DatetimeRange,
+    resolution: timedelta | None,
+    aggregation: Aggregation,
+    media_type: str,
+) -> StreamingResponse:
+    """Returns a response that streams the timeseries data in a columnar format,
+    using the `COLUMNAR_SCHEMA`. The record batches are built directly from the
+    rows returned by the database.
+
+    The first batch is fetched before the response is returned. This ensures
+    that invalid requests fail before the response has been started.
+
+    :param media_type: Either `ARROW_STREAM_MEDIA_TYPE` or `PARQUET_MEDIA_TYPE`.
+    """
+
+    batches = _record_batches(
+        timeseries_ids=timeseries_ids,
+        datetime_range=datetime_range,
+        resolution=resolution,
+        aggregation=aggregation,
+    )
+    try:
+        first_batch: pa.RecordBatch | None = await anext(batches)
+    except StopAsyncIteration:
+        first_batch = None
+
+    async def _body() -> AsyncIterator[bytes]:
+        buffer = io.BytesIO()
+        if media_type == PARQUET_MEDIA_TYPE:
+            writer = pq.ParquetWriter(buffer, COLUMNAR_SCHEMA)
+        else:
+            writer = pa.ipc.new_stream(buffer, COLUMNAR_SCHEMA)
+
+        try:
+            if first_batch is not None:
+                writer.write_batch(first_batch)
+                yield _drain(buffer)
+            async for batch in batches:
+                writer.write_batch(batch)
+                yield _drain(buffer)
+        finally:
+            await batches.aclose()
+            writer.close()
+
+        yield _drain(buffer)
+
+    return StreamingResponse(_body(), media_type=media_type)
+
+
+async def _record_batches(
+    timeseries_ids: Collection[int],
+    datetime_range: DatetimeRange,
+    resolution: timedelta | None,
+    aggregation: Aggregation,
+) -> AsyncGenerator[pa.RecordBatch, None]:
+    """Streams the timeseries data from the database as record batches."""
+
+    # See _optimized_fragments() why a dedicated connection is required.
+    async with get_async_carlos_db_connection(client_name="Carlos API") as connection:
+        async for rows in stream_timeseries_rows(
+            context=RequestContext(connection=connection),
+            timeseries_ids=timeseries_ids,
+            datetime_range=datetime_range,
+            resolution=resolution,
+            aggregation=aggregation,
+        ):
+            yield _rows_to_record_batch(rows)
+
+
+def _rows_to_record_batch(rows: Sequence[Row]) -> pa.RecordBatch:
+    """Converts the (timeseries_id, timestamp, value) rows to a record batch."""
+
+    timeseries_ids, timestamps, values = zip(*rows)
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(timeseries_ids, type=pa.int32()),
+            pa.array(timestamps, type=pa.timestamp("us", tz="UTC")).cast(pa.int64()),
+            pa.array(values, type=pa.float64()).cast(pa.float32()),
+        ],
+        schema=COLUMNAR_SCHEMA,
+    )
+
+
+def _drain(buffer: io.BytesIO) -> bytes:
+    """Returns the content written to the buffer so far and empties the buffer."""
+
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
@@ -0,0 +1,28 @@
+from datetime import UTC, datetime, timedelta
+
+import pyarrow as pa
+
+from .streaming import COLUMNAR_SCHEMA, _rows_to_record_batch
+
+
+def test_rows_to_record_batch():
+    """Ensures that the rows are converted to the columnar schema."""
+
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    rows = [
+        (1, start, 1.5),
+        (1, start + timedelta(microseconds=1), None),
+        (2, start + timedelta(seconds=1), -3.25),
+    ]
+
+    batch = _rows_to_record_batch(rows)
+
+    assert batch.schema == COLUMNAR_SCHEMA
+    assert batch.column("timeseries_id").to_pylist() == [1, 1, 2]
+    assert batch.column("timestamp_utc").to_pylist() == [
+        1_704_067_200_000_000,
+        1_704_067_200_000_001,
+        1_704_067_201_000_000,
+    ]
+    assert batch.column("value").type == pa.float32()
+    assert batch.column("value").to_pylist() == [1.5, None, -3.25]
@@ -0,0 +1,122 @@
+"""Compares the time to optimize large timeseries for the display in the frontend
+with the previous sample by sample implementation. Run it from the root of the
+package:
+
+    python -m tests.benchmark_data_reduction
+"""
+
+import random
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Callable
+
+from carlos.database.data.timeseries import TimeseriesData
+
+from carlos.api.utils.data_reduction import (
+    DEFAULT_SPLIT_THRESHOLD,
+    is_value_changed,
+    optimize_timeseries,
+)
+
+SAMPLE_COUNT = 200_000
+"""The number of samples of each timeseries."""
+
+REPEAT = 5
+"""The number of runs per timeseries, the fastest one is reported."""
+
+PROFILES: dict[str, Callable[[random.Random, int], float | None]] = {
+    "noisy sensor": lambda rng, idx: rng.gauss(20.0, 1.0),
+    "slow drift": lambda rng, idx: 20.0 + idx / 10_000 + rng.gauss(0.0, 0.01),
+    "steps": lambda rng, idx: float(idx // 1000),
+    "flat": lambda rng, idx: float(round(rng.gauss(20.0, 0.1))),
+    "sparse": lambda rng, idx: None if idx % 500 < 100 else rng.gauss(20.0, 1.0),
+}
+"""The value of each sample by the name of the profile."""
+
+
+def optimize_timeseries_baseline(
+    timeseries: TimeseriesData,
+    sample_reduce_threshold: float = 0.01,
+    split_threshold: timedelta = DEFAULT_SPLIT_THRESHOLD,
+) -> TimeseriesData:
+    """The previous sample by sample implementation of `optimize_timeseries()`."""
+
+    if len(timeseries.values) < 2:
+        return timeseries
+
+    sample_reduce_threshold = abs(sample_reduce_threshold)
+    split_threshold = abs(split_threshold)
+
+    timestamps = [timeseries.timestamps[0]]
+    values = [timeseries.values[0]]
+    prev_ts = timeseries.timestamps[0]
+    last_added_idx = 0
+    for idx, (ts, val) in enumerate(
+        zip(timeseries.timestamps[1:], timeseries.values[1:])
+    ):
+        delta = ts - prev_ts
+        if delta > split_threshold:
+            timestamps.append(prev_ts + delta / 2)
+            values.append(None)
+
+        if is_value_changed(
+            value=val, previous_value=values[-1], threshold=sample_reduce_threshold
+        ):
+            if idx - last_added_idx > 1 and values[-1] is not None:
+                timestamps.append(timeseries.timestamps[idx])
+                values.append(timeseries.values[idx])
+            timestamps.append(ts)
+            values.append(val)
+            last_added_idx = idx
+
+        prev_ts = ts
+
+    return TimeseriesData.model_construct(
+        timeseries_id=timeseries.timeseries_id, timestamps=timestamps, values=values
+    )
+
+
+def _measure(
+    optimize: Callable[[TimeseriesData], TimeseriesData], timeseries: TimeseriesData
+) -> tuple[float, TimeseriesData]:
+    """Returns the fastest duration in seconds and the optimized timeseries."""
+
+    durations = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        optimized = optimize(timeseries)
+        durations.append(time.perf_counter() - start)
+
+    return min(durations), optimized
+
+
+def main():
+    print(
+        f"{'profile':>12} | {'baseline':>11} | {'optimized':>11} | {'speedup':>7}"
+        f" | {'kept samples':>12}"
+    )
+
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    for name, value_of in PROFILES.items():
+        rng = random.Random(42)
+        timeseries = TimeseriesData(
+            timeseries_id=42,
+            # every 1000th sample follows a data gap
+            timestamps=[
+                start + timedelta(seconds=idx + 3600 * (idx // 1000))
+                for idx in range(SAMPLE_COUNT)
+            ],
+            values=[value_of(rng, idx) for idx in range(SAMPLE_COUNT)],
+        )
+        baseline, expected = _measure(optimize_timeseries_baseline, timeseries)
+        duration, optimized = _measure(optimize_timeseries, timeseries)
+        assert optimized == expected, f"Results differ for {name}."
+
+        print(
+            f"{name:>12} | {baseline * 1000:>8.1f} ms | {duration * 1000:>8.1f} ms"
+            f" | {baseline / duration:>6.1f}x | {len(optimized.values):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from __future__ import print_function, unicode_literals
 
+from enum import Enum
 from typing import Annotated, Optional, TypeVar
 
 import typer
@@ -36,7 +37,12 @@ def ask_pydantic_model(model: type[Model]) -> Model:
     for name, field in model.model_fields.items():
         prompt_kwargs = {}
         if not isinstance(field.default, PydanticUndefinedType):
-            prompt_kwargs["default"] = field.default  # pragma: no cover
+            # enums are entered by their value
+            prompt_kwargs["default"] = (
+                field.default.value
+                if isinstance(field.default, Enum)
+                else field.default  # pragma: no cover
+            )
 
         question = (field.description or name).strip().rstrip(".")
 
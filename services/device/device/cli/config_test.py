@@ -29,6 +29,8 @@ def test_create_show(tmp_path):
                     "client_id",  # ConnectionSettings.auth0.client_id
                     "client_secret",  # ConnectionSettings.auth0.client_secret
                     "audience",  # ConnectionSettings.auth0.audience
+                    "",  # ConnectionSettings.wire_format (default)
+                    "",  # ConnectionSettings.blackbox_backend (default)
                     "",  # empty string required to finish the input
                 ]
             ),
@@ -1,8 +1,10 @@
 from pathlib import Path
 
 from carlos.edge.device.config import read_config_file, write_config_file
+from carlos.edge.device.storage.blackbox import BlackboxBackend
 from carlos.edge.interface import (
     DeviceId,
+    WireFormat,
     get_websocket_endpoint,
     get_websocket_token_endpoint,
 )
@@ -48,6 +50,31 @@ class ConnectionSettings(BaseSettings):
         description="The settings required to authenticate with Auth0.",
     )
 
+    wire_format: WireFormat = Field(
+        WireFormat.BINARY_DEFLATE,
+        description="The preferred wire format of the messages. The text format is "
+        "used, if the server does not support it.",
+    )
+
+    blackbox_backend: BlackboxBackend = Field(
+        BlackboxBackend.ROWS,
+        description="The storage backend of the blackbox, which holds the data "
+        "until it has been sent to the server. The chunked backend packs the "
+        "samples of each signal into chunks of up to 256 samples or one hour. It "
+        "records each reading faster and needs about half the storage. The "
+        "samples are uploaded per chunk, hence a single batch may exceed the "
+        "batch size. Existing data is not migrated when switching the backend, "
+        "it is uploaded from the previous storage until that is empty.",
+    )
+
+    @property
+    def offered_wire_formats(self) -> list[WireFormat]:
+        """Returns the wire formats offered to the server, ordered by preference."""
+
+        # the formats are ordered from the most basic to the most capable one
+        formats = list(WireFormat)
+        return formats[: formats.index(self.wire_format) + 1][::-1]
+
     def get_websocket_uri(self, device_id: DeviceId, token: str | None = None) -> str:
         """Returns the URI of the websocket.
 
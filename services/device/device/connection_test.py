@@ -6,7 +6,7 @@ from uuid import uuid4
 
 import pytest
 from carlos.edge.device.config import write_config_file
-from carlos.edge.interface import DeviceId
+from carlos.edge.interface import DeviceId, WireFormat
 from devtools.context_manager import TemporaryWorkingDirectory
 
 from .connection import Auth0Settings, ConnectionSettings, read_connection_settings
@@ -91,6 +91,22 @@ class TestConnectionSettings:
         assert domain in uri, "Domain was not in the URI."
         assert str(random_device_id) in uri, "Device ID was not in the URI."
 
+    def test_offered_wire_formats(self, settings: ConnectionSettings):
+        """This function ensures that the text format is always offered as
+        fallback."""
+
+        assert settings.offered_wire_formats == [
+            WireFormat.BINARY_DEFLATE,
+            WireFormat.BINARY,
+            WireFormat.TEXT,
+        ]
+
+        binary = settings.model_copy(update={"wire_format": WireFormat.BINARY})
+        assert binary.offered_wire_formats == [WireFormat.BINARY, WireFormat.TEXT]
+
+        text_only = settings.model_copy(update={"wire_format": WireFormat.TEXT})
+        assert text_only.offered_wire_formats == [WireFormat.TEXT]
+
 
 def test_read_connection_settings(tmp_path: Path):
     """This function ensures that the connection settings can be read."""
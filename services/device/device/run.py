@@ -33,6 +33,7 @@ async def main():  # pragma: no cover
     runtime = DeviceRuntime(
         device_id=device_connection.device_id,
         protocol=protocol,
+        blackbox_backend=device_connection.blackbox_backend,
     )
     await runtime.run()
 
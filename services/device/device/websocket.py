@@ -2,6 +2,7 @@
 
 __all__ = [
     "DeviceWebsocketClient",
+    "select_transport_compression",
 ]
 
 from datetime import datetime, timedelta
@@ -14,7 +15,8 @@ from carlos.edge.device.storage.api_token import (
     write_api_token,
 )
 from carlos.edge.device.storage.connection import get_storage_engine
-from carlos.edge.interface import CarlosMessage, EdgeProtocol
+from carlos.edge.interface import CarlosMessage, EdgeProtocol, WireFormat
+from carlos.edge.interface.messages import select_wire_format
 from carlos.edge.interface.protocol import (
     EdgeConnectionDisconnected,
     EdgeProtocolCallback,
@@ -46,6 +48,8 @@ class DeviceWebsocketClient(EdgeProtocol):  # pragma: no cover
 
         self._api_token_store: ApiToken | None = None
 
+        self._previous_wire_format: WireFormat | None = None
+
     @property
     def is_connected(self) -> bool:
         """Returns True if the connection is connected."""
@@ -64,10 +68,20 @@ class DeviceWebsocketClient(EdgeProtocol):  # pragma: no cover
             func=self._do_connect, expected_exceptions=(Exception,)
         )
 
+        # servers that do not support any of the offered formats select none
+        negotiated = self._connection.subprotocol
+        self.wire_format = (
+            select_wire_format([negotiated]) if negotiated else None
+        ) or WireFormat.TEXT
+        self._previous_wire_format = self.wire_format
+
         if self.on_connect:
             await self.on_connect(self)
 
-        logger.info(f"Connected to the server: {self._settings.server_url}")
+        logger.info(
+            f"Connected to the server: {self._settings.server_url} "
+            f"(wire format: {self.wire_format.value})"
+        )
 
     async def _do_connect(self) -> websockets.WebSocketClientProtocol:
         """Internal method to perform the connection to the websocket."""
@@ -82,7 +96,14 @@ class DeviceWebsocketClient(EdgeProtocol):  # pragma: no cover
             device_id=self._settings.device_id, token=token
         )
 
-        return await websockets.connect(websocket_uri)
+        return await websockets.connect(
+            websocket_uri,
+            compression=select_transport_compression(self._previous_wire_format),
+            subprotocols=[
+                websockets.Subprotocol(wire_format.value)
+                for wire_format in self._settings.offered_wire_formats
+            ],
+        )
 
     async def get_websocket_token(self, client: AsyncClient, auth0_token: str) -> str:
         """Fetches a new websocket token from the API.
@@ -149,6 +170,11 @@ class DeviceWebsocketClient(EdgeProtocol):  # pragma: no cover
             await self._connection.close()
             self._connection = None
 
+            logger.info(
+                f"Disconnected. Sent: {self.sent_statistics}. "
+                f"Received: {self.received_statistics}."
+            )
+
     async def send(self, message: CarlosMessage) -> None:
         """Send data to the other end of the connection.
 
@@ -160,7 +186,7 @@ class DeviceWebsocketClient(EdgeProtocol):  # pragma: no cover
             raise EdgeConnectionDisconnected("The connection is not connected.")
 
         # we can guarantee that the connection is not None
-        await self._connection.send(message.build())  # type: ignore[union-attr]
+        await self._connection.send(self.encode(message))  # type: ignore[union-attr]
 
     async def receive(self) -> CarlosMessage:
         """Receive data from the other end of the connection.
@@ -178,7 +204,23 @@ class DeviceWebsocketClient(EdgeProtocol):  # pragma: no cover
         except websockets.ConnectionClosed as ex:
             raise EdgeConnectionDisconnected() from ex
 
-        if isinstance(message, bytes):
-            message = message.decode()
+        return self.decode(message)
+
+
+def select_transport_compression(
+    previous_wire_format: WireFormat | None,
+) -> str | None:
+    """Selects the compression offered on the transport layer. Compressing the frames
+    on the transport layer is redundant, if the messages are compressed by the
+    wire format itself. The wire format is only negotiated while connecting,
+    hence the one of the previous connection is used. As long as it is unknown,
+    deflate is offered and the server may decline it.
+
+    :param previous_wire_format: The wire format negotiated by the previous
+        connection, if any.
+    :return: The compression to offer, or None to disable it.
+    """
 
-        return CarlosMessage.from_str(message)
+    if previous_wire_format == WireFormat.BINARY_DEFLATE:
+        return None
+    return "deflate"
@@ -0,0 +1,22 @@
+import pytest
+from carlos.edge.interface import WireFormat
+
+from .websocket import select_transport_compression
+
+
+@pytest.mark.parametrize(
+    "previous_wire_format, expected",
+    [
+        pytest.param(None, "deflate", id="first connection"),
+        pytest.param(WireFormat.TEXT, "deflate", id="text"),
+        pytest.param(WireFormat.BINARY, "deflate", id="binary"),
+        pytest.param(WireFormat.BINARY_DEFLATE, None, id="binary deflate"),
+    ],
+)
+def test_select_transport_compression(
+    previous_wire_format: WireFormat | None, expected: str | None
+):
+    """Ensures that deflate is only disabled, if the frames are compressed by the
+    negotiated wire format already."""
+
+    assert select_transport_compression(previous_wire_format) == expected
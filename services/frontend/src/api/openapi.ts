@@ -196,6 +196,12 @@ export interface paths {
 export type webhooks = Record<string, never>;
 export interface components {
     schemas: {
+        /**
+         * Aggregation
+         * @description Defines how the samples within a time bucket are aggregated.
+         * @enum {string}
+         */
+        Aggregation: "min" | "max" | "avg" | "first" | "last";
         /**
          * CarlosDevice
          * @description Represents an existing device.
@@ -372,6 +378,12 @@ export interface components {
              */
             description?: string | null;
         };
+        /**
+         * Downsampling
+         * @description The available visual downsampling algorithms.
+         * @enum {string}
+         */
+        Downsampling: "lttb" | "m4";
         /**
          * DriverDirection
          * @description Enum for the direction of the IO.
@@ -475,6 +487,14 @@ export interface operations {
                 timeseriesId: number[];
                 /** @description Activated by default. This function will try to reduce the number of samples returned by removing consecutive samples that change less than 0.5% as they are not visible in the UI any how. */
                 reduceSamples?: boolean;
+                /** @description If given, the samples are aggregated into buckets of the given size by the database. Must be an ISO 8601 duration, e.g. PT5M. */
+                resolution?: string | null;
+                /** @description Defines how the samples within a bucket are aggregated. Only used if a resolution is given. */
+                aggregation?: components["schemas"]["Aggregation"];
+                /** @description If given, each timeseries is reduced to at most this number of samples using the selected downsampling algorithm, e.g. the width of the chart in pixels. Gaps in the data are marked by additional null values. When streaming, each fragment is downsampled individually. */
+                maxPoints?: number | null;
+                /** @description The algorithm used to reduce the samples to `maxPoints`. Only used if `maxPoints` is given. */
+                downsampling?: components["schemas"]["Downsampling"];
                 /** @description The start of range. Must be timezone aware. */
                 startAtUtc: string;
                 /** @description The end of the range. Must be timezone aware. */
@@ -486,13 +506,16 @@ export interface operations {
         };
         requestBody?: never;
         responses: {
-            /** @description Successful Response */
+            /** @description The timeseries data. If the client accepts `application/x-ndjson`, the data is streamed as newline delimited JSON instead. Each line holds a fragment of a single timeseries and the range is not limited in this case. Analytic clients may request `application/vnd.apache.arrow.stream` or `application/vnd.apache.parquet` to receive the unlimited range as a table of `timeseries_id` (int32), `timestamp_utc` (int64 microseconds since the unix epoch) and `value` (float32) columns. The samples are not reduced for these formats. */
             200: {
                 headers: {
                     [name: string]: unknown;
                 };
                 content: {
                     "application/json": components["schemas"]["TimeseriesData"][];
+                    "application/x-ndjson": unknown;
+                    "application/vnd.apache.arrow.stream": unknown;
+                    "application/vnd.apache.parquet": unknown;
                 };
             };
             /** @description Range was invalid or more than 30 days, 0:00:00 */